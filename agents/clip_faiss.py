@@ -11,15 +11,14 @@ from __future__ import annotations
 
 import os
 import json
-import uuid
-import shutil
-from typing import List, Tuple
+from typing import List, NamedTuple, Tuple
 
 import numpy as np
-from PIL import Image
 from io import BytesIO
+from PIL import Image
 import sys
 import importlib.machinery
+import threading
 import time
 
 if "faiss" in sys.modules:
@@ -28,37 +27,97 @@ if "faiss" in sys.modules:
         mod.__spec__ = importlib.machinery.ModuleSpec("faiss", None)
 import faiss
 
-# Lazily import transformers so tests work without the dependency
-try:  # pragma: no cover - optional dependency
-    from transformers import CLIPModel, CLIPProcessor, pipeline
-except Exception:  # pragma: no cover
-    CLIPModel = CLIPProcessor = pipeline = None
-
 from app.config import Settings
+from app.services import registry
+from app.image_context import ImageContext
+from app.blob_store import ImageBlobStore
+from vectorstore import index_writer
+
+# transformers (and torch) are imported on the first model load, keeping
+# module import cheap and letting tests run without the dependency
+CLIPModel = CLIPProcessor = pipeline = None
 
 settings = Settings()
 INDEX_PATH = os.getenv("CLIP_FAISS_INDEX", settings.CLIP_FAISS_INDEX)
 META_PATH = INDEX_PATH + ".json"
 IMAGE_STORE = os.getenv("IMAGE_STORE", settings.IMAGE_STORE)
 
+
+def _init_image_blobs() -> ImageBlobStore:
+    # Indexed images are referenced from the FAISS metadata, so no retention policy
+    return ImageBlobStore(IMAGE_STORE)
+
+
+registry.register("image_blobs", _init_image_blobs, warm_up=False)
+
 LAION_INDEX_PATH = os.path.join(os.path.dirname(__file__), '../vectorstore/image_store/laion_clip.index')
 LAION_META_PATH = os.path.join(os.path.dirname(__file__), '../vectorstore/image_store/laion_clip_meta.json')
 
 _processor: object | None = None
 _model: object | None = None
+_model_lock = threading.Lock()
 _index: faiss.Index | None = None
 _meta: List[dict] = []
+# Images added since the last merge: searched exactly from their embeddings
+# until FAISS_MERGE_SIZE of them are folded into a copy of the index
+_tail_ids = np.zeros(0, dtype="int64")
+_tail_vecs: np.ndarray | None = None
+_loaded_mtime: int | None = None
+# Writes (and reloads) go one at a time. Searches take no lock: they read
+# one immutable snapshot. Adds append to the metadata in place (a snapshot
+# only resolves its first ``size`` ids) and replace the tail arrays; merges
+# and deletes publish a modified copy of the index.
+_write_lock = threading.Lock()
+
+
+class _Snapshot(NamedTuple):
+    index: object
+    tail_ids: np.ndarray
+    tail_vecs: np.ndarray
+    meta: List[dict]
+    size: int
+
+
+_snapshot: _Snapshot | None = None
+
+# Approximate search over the LAION slice: "hnsw" builds (and caches on disk)
+# an HNSW graph from the flat index, "flat" keeps exact search.
+LAION_ANN = os.getenv("LAION_ANN", "hnsw").lower()
+LAION_HNSW_PATH = os.path.splitext(LAION_INDEX_PATH)[0] + ".hnsw.index"
+LAION_HNSW_M = int(os.getenv("LAION_HNSW_M", "32"))
+LAION_EF_SEARCH = int(os.getenv("LAION_EF_SEARCH", "64"))
+LAION_NPROBE = int(os.getenv("LAION_NPROBE", "16"))
 
 _laion_index = None
 _laion_meta = None
+# The first search loads the LAION slice (and may build its HNSW graph) once
+_laion_lock = threading.Lock()
+
+
+def _import_transformers() -> None:
+    global CLIPModel, CLIPProcessor, pipeline
+    if CLIPModel is not None or pipeline is not None:
+        return
+    try:  # pragma: no cover - optional dependency
+        from transformers import CLIPModel, CLIPProcessor, pipeline  # noqa: F811
+    except Exception:  # pragma: no cover
+        CLIPModel = CLIPProcessor = pipeline = None
 
 
 def _load_model() -> tuple[object | None, object]:
     """Load CLIP model and processor or fallbacks."""
 
+    if _model is not None:
+        return _processor, _model
+    with _model_lock:
+        return _load_model_locked()
+
+
+def _load_model_locked() -> tuple[object | None, object]:
     global _processor, _model
     if _model is not None:
         return _processor, _model
+    _import_transformers()
 
     # Try loading the standard processor + model
     try:
@@ -89,14 +148,45 @@ def _load_model() -> tuple[object | None, object]:
 
 def _load_laion_index():
     global _laion_index, _laion_meta
-    if _laion_index is not None and _laion_meta is not None:
+    if _laion_index is not None:
         return _laion_index, _laion_meta
-    _laion_index = faiss.read_index(LAION_INDEX_PATH)
-    with open(LAION_META_PATH, 'r', encoding='utf-8') as f:
-        _laion_meta = json.load(f)
+    with _laion_lock:
+        if _laion_index is None:
+            index = faiss.read_index(LAION_INDEX_PATH)
+            with open(LAION_META_PATH, 'r', encoding='utf-8') as f:
+                _laion_meta = json.load(f)
+            # published last: readers that see the index also see its metadata
+            _laion_index = _laion_ann(index)
     return _laion_index, _laion_meta
 
 
+def _laion_ann(index):
+    """Return the index used to answer LAION queries.
+
+    Exact flat indexes are converted to HNSW once and the graph is cached next
+    to the source index; IVF indexes just get ``nprobe`` applied.
+    """
+    if hasattr(index, "nprobe"):
+        index.nprobe = LAION_NPROBE
+        return index
+    if LAION_ANN != "hnsw" or not isinstance(index, faiss.IndexFlat):
+        return index
+    try:
+        if os.path.exists(LAION_HNSW_PATH) and os.path.getmtime(LAION_HNSW_PATH) >= os.path.getmtime(LAION_INDEX_PATH):
+            hnsw = faiss.read_index(LAION_HNSW_PATH)
+        else:
+            t0 = time.time()
+            hnsw = faiss.IndexHNSWFlat(index.d, LAION_HNSW_M, index.metric_type)
+            hnsw.add(index.reconstruct_n(0, index.ntotal))
+            index_writer.write_atomic(lambda p: faiss.write_index(hnsw, p), LAION_HNSW_PATH)
+            print(f"[LAION] Built HNSW graph over {index.ntotal} vectors in {time.time()-t0:.1f}s")
+        hnsw.hnsw.efSearch = LAION_EF_SEARCH
+        return hnsw
+    except Exception as e:
+        print(f"[LAION] HNSW unavailable, using exact search: {e}")
+        return index
+
+
 def _model_dim(model: object) -> int:
     if hasattr(model, "config") and hasattr(model.config, "projection_dim"):
         return model.config.projection_dim
@@ -106,26 +196,65 @@ def _model_dim(model: object) -> int:
 
 
 def _load_index() -> None:
-    global _index, _meta
     if _index is not None:
         return
+    with _write_lock:
+        if _index is None:
+            _swap(*_read_index())
+
+
+def _swap(index, meta: List[dict], tail_ids: np.ndarray, tail_vecs: np.ndarray) -> None:
+    global _index, _meta, _tail_ids, _tail_vecs, _snapshot
+    _index, _meta, _tail_ids, _tail_vecs = index, meta, tail_ids, tail_vecs
+    _snapshot = _Snapshot(index, tail_ids, tail_vecs, meta, len(meta))
+
+
+def _tail_path() -> str:
+    return INDEX_PATH + ".tail.npz"
+
+
+def _empty_tail(dim: int):
+    return np.zeros(0, dtype="int64"), np.zeros((0, dim), dtype="float32")
+
+
+def _read_tail(index, meta: List[dict]):
+    """Tail ids and vectors saved next to ``index``, minus any it already holds."""
+    if not os.path.exists(_tail_path()):
+        return _empty_tail(index.d)
+    with np.load(_tail_path()) as data:
+        ids, vecs = data["ids"], data["vecs"]
+    if len(ids):
+        # a merge that stopped before rewriting the tail, or an add before its metadata
+        keep = ~np.isin(ids, faiss.vector_to_array(index.id_map)) & (ids < len(meta))
+        ids, vecs = ids[keep], vecs[keep]
+    if vecs.shape[1:] != (index.d,):
+        return _empty_tail(index.d)
+    return ids.astype("int64"), vecs.astype("float32")
+
+
+def _read_index():
+    """Return ``(index, meta, tail_ids, tail_vecs)`` from disk, or empty ones."""
+    global _loaded_mtime
     os.makedirs(IMAGE_STORE, exist_ok=True)
-    _, model = _load_model()
-    dim = _model_dim(model)
+    dim = settings.CLIP_EMBED_DIM
     try:
         if os.path.exists(INDEX_PATH):
-            _index = faiss.read_index(INDEX_PATH)
+            # the metadata is written last, on every change
+            _loaded_mtime = os.stat(META_PATH if os.path.exists(META_PATH) else INDEX_PATH).st_mtime_ns
+            if index_writer.enabled():
+                index = index_writer.read_index_shared(INDEX_PATH)
+            else:
+                index = faiss.read_index(INDEX_PATH)
+            meta = []
             if os.path.exists(META_PATH):
                 with open(META_PATH, "r") as f:
-                    _meta = json.load(f)
-            if not isinstance(_index, faiss.IndexIDMap):
-                _index = faiss.IndexIDMap(_index)
-            if _index.d != dim:
-                _index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
-                _meta = []
-        else:
-            _index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
-            _meta = []
+                    meta = json.load(f)
+            if not isinstance(index, faiss.IndexIDMap):
+                index = faiss.IndexIDMap(index)
+            if index.d != dim:
+                return (faiss.IndexIDMap(faiss.IndexFlatIP(dim)), []) + _empty_tail(dim)
+            return (index, meta) + _read_tail(index, meta)
+        return (faiss.IndexIDMap(faiss.IndexFlatIP(dim)), []) + _empty_tail(dim)
     except Exception:
         class Dummy:
             def __init__(self, dim: int):
@@ -138,40 +267,85 @@ def _load_index() -> None:
             def search(self, vec, k):
                 return np.zeros((1, k), dtype=float), -np.ones((1, k), dtype=int)
 
-        _index = Dummy(dim)
-        _meta = []
+        return (Dummy(dim), []) + _empty_tail(dim)
 
 
-def _save_index() -> None:
-    if _index is None:
+def _refresh_index() -> None:
+    """Reload the index if the writer process changed it on disk."""
+    if not index_writer.enabled() or _index is None:
         return
-    faiss.write_index(_index, INDEX_PATH)
-    with open(META_PATH, "w") as f:
-        json.dump(_meta, f)
+    try:
+        mtime = os.stat(META_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return
+    if mtime != _loaded_mtime:
+        with _write_lock:
+            if mtime != _loaded_mtime:
+                _swap(*_read_index())
+
+
+def _save_index(index_changed: bool = True) -> None:
+    index, meta, tail_ids, tail_vecs = _index, _meta, _tail_ids, _tail_vecs
+    if index is None:
+        return
+
+    def write_meta(path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(meta, f)
+
+    def write_tail(path: str) -> None:
+        with open(path, "wb") as f:
+            np.savez(f, ids=tail_ids, vecs=tail_vecs)
+
+    # vectors before metadata: other processes reload when the metadata
+    # changes, and skip ids it does not resolve yet
+    if index_changed or not os.path.exists(INDEX_PATH):
+        index_writer.write_atomic(lambda p: faiss.write_index(index, p), INDEX_PATH)
+    index_writer.write_atomic(write_tail, _tail_path())
+    index_writer.write_atomic(write_meta, META_PATH)
+
+
+def _copy(index):
+    """Private copy of ``index`` for a writer to modify."""
+    return faiss.clone_index(index) if isinstance(index, faiss.Index) else index
 
 
 def _encode_image(data: bytes) -> np.ndarray:
+    return encode_context(ImageContext(data))
+
+
+def encode_context(ctx: ImageContext) -> np.ndarray:
+    """Return the L2-normalized CLIP embedding for ``ctx``, computing it once.
+
+    The RGB image, processor tensor and embedding are kept on the context so
+    downstream stages never decode or encode the same upload twice.
+    """
+    if ctx.embedding is not None:
+        return ctx.embedding
     processor, model = _load_model()
     try:
-        img = Image.open(BytesIO(data)).convert("RGB")
+        img = ctx.rgb
     except Exception:
         return np.zeros(_model_dim(model), dtype="float32")
     try:
-        import torch
-
         if processor is not None and hasattr(model, "get_image_features"):
-            inputs = processor(images=img, return_tensors="pt")
+            import torch
+
+            if ctx.pixel_values is None:
+                ctx.pixel_values = processor(images=img, return_tensors="pt")["pixel_values"]
             with torch.no_grad():
-                emb = model.get_image_features(**inputs)
+                emb = model.get_image_features(pixel_values=ctx.pixel_values)
                 emb = torch.nn.functional.normalize(emb, p=2, dim=-1)
-            return emb[0].cpu().numpy().astype("float32")
+            ctx.embedding = emb[0].cpu().numpy().astype("float32")
         else:  # pipeline output
             out = model(img)
             arr = np.asarray(out)[0]
             if arr.ndim > 1:
                 arr = arr.mean(axis=0)
             arr = arr.astype("float32")
-            return arr
+            norm = np.linalg.norm(arr)
+            ctx.embedding = arr / norm if norm > 0 else arr
+        return ctx.embedding
     except Exception:
         return np.zeros(_model_dim(model), dtype="float32")
 
@@ -179,43 +353,131 @@ def _encode_image(data: bytes) -> np.ndarray:
 def ingest_image(path: str, namespace: str = "image") -> str:
     """Embed image and persist to FAISS. Returns stored path."""
 
-    _load_index()
     with open(path, "rb") as f:
         data = f.read()
     vec = _encode_image(data)
-    idx = len(_meta)
-    _index.add_with_ids(vec[np.newaxis, :], np.array([idx], dtype="int64"))
-    ext = os.path.splitext(path)[1]
-    dest = os.path.join(IMAGE_STORE, f"{uuid.uuid4().hex}{ext}")
-    shutil.copy2(path, dest)
-    _meta.append({"path": dest, "namespace": namespace})
-    _save_index()
+    dest = registry.get("image_blobs").put_file(path)
+    if index_writer.enabled():
+        index_writer.submit("clip.add", vec=vec, path=dest, namespace=namespace)
+    else:
+        _apply_add(vec, dest, namespace)
     return dest
 
 
+def _apply_add(vec: np.ndarray, path: str, namespace: str) -> int:
+    """Append one embedded image to the tail and persist it (writer side)."""
+    _load_index()
+    with _write_lock:
+        idx = len(_meta)
+        _meta.append({"path": path, "namespace": namespace})
+        tail_ids = np.append(_tail_ids, np.int64(idx))
+        tail_vecs = np.vstack([_tail_vecs, np.asarray(vec, dtype="float32")[np.newaxis, :]])
+        index, merged = _index, len(tail_ids) >= settings.FAISS_MERGE_SIZE
+        if merged:
+            index = _copy(_index)
+            index.add_with_ids(tail_vecs, tail_ids)
+            tail_ids, tail_vecs = _empty_tail(tail_vecs.shape[1])
+        _swap(index, _meta, tail_ids, tail_vecs)
+        _save_index(index_changed=merged)
+    return idx
+
+
+index_writer.register_op("clip.add", _apply_add)
+
+
+def delete_namespace(namespace: str) -> int:
+    """Remove the images indexed under ``namespace``; return how many were removed.
+
+    Their metadata is replaced by ``{"deleted": true}`` tombstones, dropped
+    by ``python -m vectorstore.maintenance compact``. Image files are left
+    to the blob store.
+    """
+    if index_writer.enabled():
+        return index_writer.submit("clip.delete", namespace=namespace)
+    return _apply_delete(namespace)
+
+
+def _apply_delete(namespace: str) -> int:
+    if _index is None and not os.path.exists(INDEX_PATH):
+        return 0
+    _load_index()
+    with _write_lock:
+        ids = [i for i, m in enumerate(_meta) if m.get("namespace") == namespace and not m.get("deleted")]
+        if not ids or not hasattr(_index, "remove_ids"):
+            return 0
+        ids = np.array(ids, dtype="int64")
+        keep = ~np.isin(_tail_ids, ids)
+        index, indexed = _index, ids[~np.isin(ids, _tail_ids)]
+        if len(indexed):
+            index = _copy(_index)
+            index.remove_ids(faiss.IDSelectorBatch(indexed))
+        meta = list(_meta)
+        for i in ids:
+            meta[i] = {"deleted": True}
+        _swap(index, meta, _tail_ids[keep], _tail_vecs[keep])
+        _save_index(index_changed=len(indexed) > 0)
+    return len(ids)
+
+
+index_writer.register_op("clip.delete", _apply_delete)
+
+
 def search_by_vector(vec: np.ndarray, namespace: str, k: int = 5) -> List[Tuple[str, float]]:
+    return search_by_vectors(vec[np.newaxis, :], namespace, k)[0]
+
+
+def search_by_vectors(vecs: np.ndarray, namespace: str, k: int = 5) -> List[List[dict]]:
+    """Search the image index with a ``(n, d)`` matrix of CLIP embeddings."""
     _load_index()
-    if getattr(_index, "ntotal", 0) == 0:
-        return []
-    try:
-        D, I = _index.search(vec[np.newaxis, :].astype("float32"), min(k, getattr(_index, "ntotal", k)))
-    except Exception:
-        return []
-    results = []
-    for idx, score in zip(I[0], D[0]):
-        if idx == -1:
-            continue
-        meta = _meta[idx]
-        if meta.get("namespace") != namespace:
-            continue
-        path = meta.get("path")
-        if path and os.path.exists(path):
-            filename = os.path.basename(path)
-            results.append({"url": f"/images/{filename}", "score": float(score)})
-    return results[:k]
+    _refresh_index()
+    snap = _snapshot
+    vecs = np.ascontiguousarray(vecs, dtype="float32")
+    batch: List[List[dict]] = [[] for _ in vecs]
+    ntotal = getattr(snap.index, "ntotal", 0)
+    if ntotal + len(snap.tail_ids) == 0 or not len(vecs):
+        return batch
+    D = np.zeros((len(vecs), 0), dtype="float32")
+    labels = np.zeros((len(vecs), 0), dtype="int64")
+    if ntotal:
+        try:
+            D, labels = snap.index.search(vecs, min(k, ntotal))
+        except Exception:
+            return batch
+    if len(snap.tail_ids):
+        # exact scores of the images not merged yet (row by row: a query
+        # scores the same alone and in a batch)
+        D = np.hstack([D, np.stack([snap.tail_vecs @ v for v in vecs])])
+        labels = np.hstack([labels, np.broadcast_to(snap.tail_ids, (len(vecs), len(snap.tail_ids)))])
+        order = np.argsort(-D, axis=1, kind="stable")
+        D, labels = np.take_along_axis(D, order, 1), np.take_along_axis(labels, order, 1)
+    metas = snap.meta
+    blobs = registry.get("image_blobs")
+    for results, row_ids, row_scores in zip(batch, labels, D):
+        for idx, score in zip(row_ids, row_scores):
+            if idx == -1 or idx >= snap.size:
+                continue
+            meta = metas[idx]
+            if meta.get("namespace") != namespace or meta.get("deleted"):
+                continue
+            path = meta.get("path")
+            if path and os.path.exists(path):
+                results.append({"url": f"/images/{blobs.relpath(path)}", "score": float(score)})
+        del results[k:]
+    return batch
 
 
 def search_text(text: str, namespace: str = "image", k: int = 5):
+    return search_by_vector(_encode_text(text), namespace, k)
+
+
+def search_texts(texts: List[str], namespace: str = "image", k: int = 5) -> List[List[dict]]:
+    """:func:`search_text` for each of ``texts``: one CLIP forward pass, one index search."""
+    if not texts:
+        return []
+    return search_by_vectors(_encode_texts(texts), namespace, k)
+
+
+def _encode_text(text: str) -> np.ndarray:
     processor, model = _load_model()
     try:
         import torch
@@ -239,31 +501,90 @@ def search_text(text: str, namespace: str = "image", k: int = 5):
             vec = arr.astype("float32")
     except Exception:
         vec = np.zeros(_model_dim(model), dtype="float32")
-    return search_by_vector(vec, namespace, k)
+    return vec
 
 
-def search_image(data: bytes, namespace: str = "image", k: int = 5):
-    vec = _encode_image(data)
-    return search_by_vector(vec, namespace, k)
+def _encode_texts(texts: List[str]) -> np.ndarray:
+    """``(n, d)`` CLIP embeddings of ``texts``, encoded as one padded batch."""
+    processor, model = _load_model()
+    if processor is not None and hasattr(model, "get_text_features"):
+        try:
+            import torch
 
+            # Truncate to CLIP's 77 token limit
+            inputs = processor(text=list(texts), return_tensors="pt", padding=True, truncation=True, max_length=77)
+            with torch.no_grad():
+                text_emb = model.get_text_features(**inputs)
+                text_emb = torch.nn.functional.normalize(text_emb, p=2, dim=-1)
+            return text_emb.cpu().numpy().astype("float32")
+        except Exception:
+            pass
+    # pipelines take one text at a time
+    return np.stack([_encode_text(t) for t in texts])
 
-def search_laion_by_image(data: bytes, k: int = 5):
+
+def search_image(data: bytes | ImageContext, namespace: str = "image", k: int = 5):
+    ctx = data if isinstance(data, ImageContext) else ImageContext(data)
+    return search_by_vector(encode_context(ctx), namespace, k)
+
+
+def search_laion_by_vectors(vecs: np.ndarray, k: int = 5) -> List[List[dict]]:
+    """Search the local LAION index with a ``(n, d)`` matrix of CLIP embeddings."""
     index, meta = _load_laion_index()
+    vecs = np.ascontiguousarray(vecs, dtype="float32").reshape(-1, index.d)
+    D, labels = index.search(vecs, k)
+    batch = []
+    for row_ids, row_scores in zip(labels, D):
+        results = []
+        for idx, score in zip(row_ids, row_scores):
+            if idx == -1:
+                continue
+            m = meta[idx]
+            results.append({
+                'caption': m.get('caption', ''),
+                'url': m.get('url', ''),
+                'score': float(score),
+                'index': m.get('index', int(idx))
+            })
+        batch.append(results)
+    return batch
+
+
+def search_laion_by_image(data: bytes | ImageContext, k: int = 5):
+    ctx = data if isinstance(data, ImageContext) else ImageContext(data)
+    _, meta = _load_laion_index()
     t0 = time.time()
-    vec = _encode_image(data)
-    faiss.normalize_L2(vec.reshape(1, -1))
-    D, I = index.search(vec.reshape(1, -1).astype('float32'), k)
-    results = []
-    for idx, score in zip(I[0], D[0]):
-        if idx == -1:
-            continue
-        m = meta[idx]
-        results.append({
-            'caption': m.get('caption', ''),
-            'url': m.get('url', ''),
-            'score': float(score),
-            'index': m.get('index', idx)
-        })
+    # encode_context already returns unit-length vectors
+    results = search_laion_by_vectors(encode_context(ctx), k)[0]
     t1 = time.time()
     print(f"[LAION] Searched {len(meta)} vectors, {os.path.getsize(LAION_INDEX_PATH)/1e6:.2f}MB, time: {t1-t0:.3f}s")
     return results
+
+
+def _warm_clip():
+    """Load CLIP and run one image and one text embedding so first requests
+    do not pay for lazy weight loading and buffer allocation."""
+    processor, model = _load_model()
+    buf = BytesIO()
+    Image.new("RGB", (224, 224)).save(buf, format="PNG")
+    encode_context(ImageContext(buf.getvalue()))
+    _encode_text("warm up")
+    return processor, model
+
+
+def _warm_image_index():
+    _load_index()
+    return _index
+
+
+def _warm_laion_index():
+    if not (os.path.exists(LAION_INDEX_PATH) and os.path.exists(LAION_META_PATH)):
+        return None
+    index, meta = _load_laion_index()
+    index.search(np.zeros((1, index.d), dtype="float32"), 1)
+    return index
+
+
+registry.register("clip", _warm_clip, warm_up=settings.MODEL_WARMUP, probe=lambda: _model is not None)
+registry.register("clip_index", _warm_image_index, warm_up=settings.MODEL_WARMUP, probe=lambda: _index is not None)
+registry.register("laion_index", _warm_laion_index, warm_up=settings.MODEL_WARMUP, probe=lambda: _laion_index is not None)
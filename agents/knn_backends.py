@@ -0,0 +1,143 @@
+"""Pluggable similarity-search backends for ``/image-analyze``.
+
+``search_similar`` tries the backends named in ``KNN_BACKENDS`` in order and
+returns the first successful answer together with the latency of every
+backend it tried. The local backend answers from the LAION FAISS slice in
+``agents.clip_faiss``; the remote LAION knn service is only consulted when
+``KNN_REMOTE_URL`` is configured.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List
+
+import numpy as np
+import requests
+
+from agents import clip_faiss
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+settings = Settings()
+
+
+class LocalLaionBackend:
+    """Search the local LAION index, coalescing concurrent queries.
+
+    Requests arriving within ``max_wait`` seconds of each other are stacked
+    into one matrix and answered by a single ``index.search`` call. The
+    index is opened by the caller before it starts waiting, so a cold start
+    (reading the slice and building the HNSW graph) is not cut short by
+    ``timeout``, which only bounds the wait for the search itself.
+    """
+
+    name = "local"
+
+    def __init__(self, max_batch: int = 32, max_wait: float = 0.002, timeout: float = 10.0):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self._queue: queue.Queue = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return os.path.exists(clip_faiss.LAION_INDEX_PATH) and os.path.exists(clip_faiss.LAION_META_PATH)
+
+    def search(self, vec: np.ndarray, k: int) -> List[dict]:
+        clip_faiss._load_laion_index()
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((np.asarray(vec, dtype="float32"), k, future))
+        return future.result(timeout=self.timeout)
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="laion-knn", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                k_max = max(k for _, k, _ in batch)
+                results = clip_faiss.search_laion_by_vectors(np.stack([v for v, _, _ in batch]), k_max)
+                for (_, k, future), hits in zip(batch, results):
+                    future.set_result(hits[:k])
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+
+
+class RemoteKnnBackend:
+    """Query a clip-retrieval compatible knn service over HTTP."""
+
+    name = "remote"
+
+    def __init__(self, url: str, indice_name: str, timeout: float):
+        self.url = url
+        self.indice_name = indice_name
+        self.timeout = timeout
+
+    def available(self) -> bool:
+        return bool(self.url)
+
+    def search(self, vec: np.ndarray, k: int) -> List[dict]:
+        payload = {
+            "embedding": np.asarray(vec, dtype="float32").tolist(),
+            "indice_name": self.indice_name,
+            "num_images": k,
+        }
+        resp = requests.post(self.url, json=payload, timeout=self.timeout)
+        resp.raise_for_status()
+        # Expecting a list of dicts with keys: url, score, caption
+        return [
+            {"url": item.get("url"), "score": item.get("score"), "caption": item.get("caption")}
+            for item in resp.json() if item.get("url")
+        ]
+
+
+BACKENDS = {
+    "local": LocalLaionBackend(),
+    "remote": RemoteKnnBackend(settings.KNN_REMOTE_URL, settings.KNN_REMOTE_INDICE, settings.KNN_REMOTE_TIMEOUT),
+}
+
+
+def search_similar(vec: np.ndarray, k: int = 5, order: List[str] | None = None) -> Dict[str, object]:
+    """Return ``results``, the ``backend`` that answered, per-backend ``latency_ms`` and any ``error``."""
+    latency_ms: Dict[str, float] = {}
+    errors: List[str] = []
+    for name in order or settings.KNN_BACKENDS:
+        backend = BACKENDS.get(name)
+        if backend is None or not backend.available():
+            continue
+        t0 = time.perf_counter()
+        try:
+            results = backend.search(vec, k)
+        except Exception as e:
+            latency_ms[name] = round((time.perf_counter() - t0) * 1000, 2)
+            errors.append(f"{name}: {e}")
+            logger.warning(f"kNN backend {name} failed after {latency_ms[name]}ms: {e}")
+            continue
+        latency_ms[name] = round((time.perf_counter() - t0) * 1000, 2)
+        return {"results": results, "backend": name, "latency_ms": latency_ms, "error": None}
+    if not errors:
+        logger.warning("No kNN backend available for similarity search")
+    return {"results": [], "backend": None, "latency_ms": latency_ms, "error": "; ".join(errors) or None}
@@ -1,8 +1,9 @@
 # --- agents/mcp_server.py ---
+import threading
 from typing import TypedDict
 from langgraph.graph import StateGraph
 from langchain_core.runnables import RunnableLambda
-from agents import search_agent, rag_agent, translate_agent, plugin_loader
+from agents import search_agent, rag_agent, translate_agent, plugin_loader, query_router
 from app.config import Settings
 
 settings = Settings()
@@ -15,40 +16,71 @@ class InputState(TypedDict):
     session_id: str | None
 
 
-# ✅ LangGraph routing logic
-def route_with_langgraph(text: str, lang: str = "en", session_id: str | None = None):
-    graph = StateGraph(InputState)
+# --- Node 1: Classify and route query ---
+def classify_and_route(state: InputState):
+    query = state.get("input", "")
+    session = state.get("session_id")
+    route = query_router.route(query, default=query_router.WEB).label
+
+    if route in (query_router.IMAGE, query_router.RAG) and session:
+        # the session's uploaded documents and images
+        result = rag_agent.query_pdf_image(query, session_id=session)[0]
+    else:
+        result = search_agent.handle_query(query)
+    return {"input": result, "lang": state.get("lang"), "session_id": session}
+
 
-    # --- Node 1: Classify and route query ---
-    def classify_and_route(state: InputState):
-        query = state.get("input", "")
-        session = state.get("session_id")
-        lower = query.lower()
-
-        if "image" in lower:
-            result = rag_agent.handle_text(query, namespace="image", session_id=session)
-        elif any(word in lower for word in ["pdf", "document"]):
-            result = rag_agent.handle_text(query, namespace="pdf", session_id=session)
-        else:
-            result = search_agent.handle_query(query)
-        return {"input": result, "lang": state.get("lang"), "session_id": session}
-
-    # --- Node 2: Translate response ---
-    def translate_output(state: InputState):
-        return translate_agent.translate_response(state["input"], state["lang"])
-
-    # --- Build LangGraph ---
+# --- Node 2: Translate response ---
+def translate_output(state: InputState):
+    return {"input": translate_agent.translate_response(state["input"], state["lang"])}
+
+
+def build_graph(plugins):
+    """Build and compile the routing graph for a set of plugin modules."""
+    graph = StateGraph(InputState)
     graph.add_node("route", RunnableLambda(classify_and_route))
     graph.add_node("translate", RunnableLambda(translate_output))
 
-    for plugin in plugin_loader.load_plugins():
+    plugin_nodes = 0
+    for plugin in plugins:
         if hasattr(plugin, "get_langgraph_node"):
             node_id, node_fn = plugin.get_langgraph_node()
             graph.add_node(node_id, node_fn)
             graph.add_edge("route", node_id)
             graph.add_edge(node_id, "translate")
+            plugin_nodes += 1
+    if not plugin_nodes:
+        graph.add_edge("route", "translate")
 
     graph.set_entry_point("route")
     graph.set_finish_point("translate")
+    return graph.compile()
+
+
+# Compiled graph for the current plugin set; rebuilt only when plugin files change
+_compiled = None
+_compiled_version = None
+_compile_lock = threading.Lock()
+
+
+def get_router():
+    """Return the compiled router, recompiling when the plugins were reloaded."""
+    global _compiled, _compiled_version
+    version, plugins = plugin_loader.plugin_set()
+    if _compiled is not None and _compiled_version == version:
+        return _compiled
+    with _compile_lock:
+        if _compiled is None or _compiled_version != version:
+            _compiled = build_graph(plugins)
+            _compiled_version = version
+        return _compiled
+
+
+# ✅ LangGraph routing logic
+def route_with_langgraph(text: str, lang: str = "en", session_id: str | None = None):
+    return get_router().invoke({"input": text, "lang": lang, "session_id": session_id})
+
 
-    return graph.compile().invoke({"input": text, "lang": lang, "session_id": session_id})
+async def aroute_with_langgraph(text: str, lang: str = "en", session_id: str | None = None):
+    """Async variant for request handlers; does not block the event loop."""
+    return await get_router().ainvoke({"input": text, "lang": lang, "session_id": session_id})
@@ -1,13 +1,39 @@
 # --- agents/plugin_loader.py ---
+"""Load LangGraph plugins from ``PLUGIN_DIR``, once per change on disk.
+
+The plugin modules are executed once and cached. ``load_plugins`` checks the
+directory's file names, sizes and mtimes at most every
+``PLUGIN_RELOAD_INTERVAL`` seconds and re-executes the modules only when
+that signature changes. ``plugin_set`` exposes it so callers (the
+LangGraph router) can cache anything derived from the plugin set.
+"""
+import hashlib
 import importlib.util
 import os
+import threading
+import time
 
 PLUGIN_DIR = "agents/plugins"
+PLUGIN_RELOAD_INTERVAL = float(os.getenv("PLUGIN_RELOAD_INTERVAL", "2"))
+
+_lock = threading.Lock()
+_plugins = []
+_version = None
+_checked_at = 0.0
+
 
+def _signature() -> str:
+    entries = []
+    for entry in os.scandir(PLUGIN_DIR):
+        if entry.name.endswith(".py") and entry.is_file():
+            st = entry.stat()
+            entries.append(f"{entry.name}:{st.st_size}:{st.st_mtime_ns}")
+    return hashlib.sha1("|".join(sorted(entries)).encode()).hexdigest()[:12]
 
-def load_plugins():
+
+def _exec_plugins():
     plugins = []
-    for fname in os.listdir(PLUGIN_DIR):
+    for fname in sorted(os.listdir(PLUGIN_DIR)):
         if fname.endswith(".py"):
             spec = importlib.util.spec_from_file_location(
                 fname[:-3], os.path.join(PLUGIN_DIR, fname))
@@ -15,3 +41,31 @@ def load_plugins():
             spec.loader.exec_module(mod)
             plugins.append(mod)
     return plugins
+
+
+def _refresh(force: bool = False) -> None:
+    global _plugins, _version, _checked_at
+    now = time.monotonic()
+    if not force and _version is not None and now - _checked_at < PLUGIN_RELOAD_INTERVAL:
+        return
+    with _lock:
+        if not force and _version is not None and now - _checked_at < PLUGIN_RELOAD_INTERVAL:
+            return
+        signature = _signature()
+        if force or signature != _version:
+            _plugins = _exec_plugins()
+            _version = signature
+        _checked_at = now
+
+
+def load_plugins(force: bool = False):
+    """Return the plugin modules, reloading them if the files changed."""
+    _refresh(force)
+    return list(_plugins)
+
+
+def plugin_set():
+    """Return ``(version, plugins)``: the plugin modules and their file signature."""
+    _refresh()
+    with _lock:
+        return _version, list(_plugins)
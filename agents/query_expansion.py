@@ -0,0 +1,133 @@
+# --- agents/query_expansion.py ---
+"""Second retrieval attempt for questions the local index answered poorly.
+
+A question phrased unlike the documents that answer it ("how do I get my
+money back" against a "refund policy" section) scores below
+``MIN_CONFIDENCE`` and goes to the slower web/paper search. Before that,
+``QUERY_EXPANSION`` rewrites it with one call to a fast chat model:
+
+* ``multi``: ``QUERY_EXPANSION_N`` paraphrases using other likely wording
+* ``hyde``: a short hypothetical answer passage (HyDE), which embeds close
+  to passages that answer the question
+
+The question and its rewrites are embedded in one request and searched as
+a batch in every session namespace in parallel, and their rankings fused
+(``faiss_store.search_faiss_fused``), whose confidence is scored against
+the original question. Rewriting and searching share a budget of
+``QUERY_EXPANSION_BUDGET`` seconds; when it runs out the result is
+``None`` and the caller falls back as before.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import List, Optional, Sequence, Tuple
+
+from app.config import Settings
+from app.services import registry
+from vectorstore import faiss_store
+
+logger = logging.getLogger(__name__)
+
+settings = Settings()
+
+MULTI = "multi"
+HYDE = "hyde"
+PROMPTS = {
+    MULTI: (
+        "Rewrite the question below in {n} different ways, using the words a "
+        "document answering it would likely use. Reply with one rewrite per "
+        "line and nothing else.\n\nQuestion: {question}"
+    ),
+    HYDE: (
+        "Write a short passage (at most 5 sentences) that answers the question "
+        "below, as it could appear in a document. Reply with the passage only."
+        "\n\nQuestion: {question}"
+    ),
+}
+# "1. ", "- ", "* " and the like in front of listed rewrites
+_BULLET = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s*")
+
+
+def _init_llm():
+    from langchain_openai import ChatOpenAI
+
+    # a late rewrite is useless: no retries, nothing outliving the budget
+    return ChatOpenAI(model=settings.QUERY_EXPANSION_MODEL, temperature=0.3,
+                      timeout=settings.QUERY_EXPANSION_BUDGET, max_retries=0)
+
+
+registry.register("expansion_llm", _init_llm, warm_up=False)
+
+
+def enabled() -> bool:
+    return settings.QUERY_EXPANSION in PROMPTS
+
+
+def expand(question: str, mode: Optional[str] = None, n: Optional[int] = None) -> List[str]:
+    """Rewrites of ``question`` from one chat model call."""
+    mode = mode or settings.QUERY_EXPANSION
+    n = n or settings.QUERY_EXPANSION_N
+    reply = registry.get("expansion_llm").invoke(PROMPTS[mode].format(n=n, question=question))
+    text = getattr(reply, "content", reply).strip()
+    if mode == HYDE:
+        return [text] if text else []
+    rewrites = []
+    for line in text.splitlines():
+        line = _BULLET.sub("", line).strip()
+        if line and line.lower() != question.strip().lower() and line not in rewrites:
+            rewrites.append(line)
+    return rewrites[:n]
+
+
+def search(question: str, namespaces: Sequence[Tuple[str, str]], k: int = 3,
+           budget: Optional[float] = None) -> Optional[Tuple[str, float, str]]:
+    """Best ``(excerpts, confidence, tag)`` over ``(tag, namespace)`` pairs.
+
+    Returns ``None`` when expansion fails, finds nothing or exceeds
+    ``budget`` seconds (default ``QUERY_EXPANSION_BUDGET``).
+    """
+    budget = settings.QUERY_EXPANSION_BUDGET if budget is None else budget
+    # one executor per request: work abandoned at the deadline (a running
+    # task cannot be cancelled) never delays another request
+    executor = ThreadPoolExecutor(max_workers=1 + len(namespaces), thread_name_prefix="query-expansion")
+    try:
+        return _search(executor, question, namespaces, k, budget)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _search(executor: ThreadPoolExecutor, question: str, namespaces: Sequence[Tuple[str, str]], k: int,
+            budget: float) -> Optional[Tuple[str, float, str]]:
+    deadline = time.monotonic() + budget
+    future = executor.submit(expand, question)
+    try:
+        rewrites = future.result(timeout=budget)
+    except TimeoutError:
+        logger.info(f"Query expansion skipped: no rewrite within {budget:.1f}s")
+        return None
+    except Exception as e:
+        logger.warning(f"Query expansion failed: {e}")
+        return None
+    if not rewrites:
+        return None
+    queries = [question, *rewrites]
+    futures = {tag: executor.submit(faiss_store.search_faiss_fused, queries, namespace, k)
+               for tag, namespace in namespaces}
+    ranked = []
+    for tag, future in futures.items():
+        try:
+            text, confidence = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            logger.info(f"Query expansion search of {tag} did not finish within {budget:.1f}s")
+            continue
+        except Exception as e:
+            logger.warning(f"Query expansion search of {tag} failed: {e}")
+            continue
+        if text:
+            ranked.append((text, confidence, tag))
+    if not ranked:
+        return None
+    return max(ranked, key=lambda r: r[1])
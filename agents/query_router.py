@@ -0,0 +1,203 @@
+"""Local intent classifier choosing between RAG, image and search routes.
+
+Queries are turned into sparse vectors of hashed word and character
+n-gram counts. These are plain lexical features, not model embeddings: no
+model is loaded and no network call is made. Each route is represented by
+the centroid of a handful of prototype queries. A query goes to the route
+whose centroid is most similar; when no centroid clears ``MIN_SCORE`` the
+caller's default applies. Centroids are built once and query vectors are
+LRU-cached, so a routing decision costs well under a millisecond.
+
+Evaluate changes to the prototypes with ``benchmarks/bench_query_router.py``
+against ``benchmarks/query_router_eval.jsonl``.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+RAG, IMAGE, WEB, ARXIV, SCHOLAR = "rag", "image", "web", "arxiv", "scholar"
+SEARCH_ROUTES = (WEB, ARXIV, SCHOLAR)
+
+DIM = 1 << 14
+MIN_SCORE = 0.12
+_WORD = re.compile(r"[a-z0-9]+(?:['.-][a-z0-9]+)*")
+# Very frequent words carry no routing signal and would pull every query
+# towards the largest prototype set
+_STOPWORDS = frozenset(
+    "a an the of in on at to for and or is are was were be been do does did "
+    "what which who whom whose how when where why can could would should will "
+    "me my i you your we our it its this that these those there please about "
+    "with from by as any some all give tell find get".split()
+)
+
+PROTOTYPES: Dict[str, List[str]] = {
+    RAG: [
+        "what does the document say about the budget",
+        "summarize the pdf I uploaded",
+        "according to the report what were the main findings",
+        "in the uploaded file which section covers safety",
+        "what are the key points of this document",
+        "list the requirements in the contract",
+        "what does page 5 of the pdf say",
+        "who is the author of this document",
+        "quote the paragraph about termination in the agreement",
+        "according to my notes what is due next week",
+        "what was the total amount on the invoice",
+        "explain chapter 3 of the manual",
+        "what did I ask you earlier",
+        "remind me what we discussed before",
+        "how do I configure the device according to the user guide",
+        "based on the uploaded slides what is the timeline",
+        "does the policy document mention refunds",
+        "what conclusion does the attached paper reach",
+    ],
+    IMAGE: [
+        "what is in this image",
+        "describe the picture",
+        "what does this photo show",
+        "find similar images",
+        "what color is the car in the photo",
+        "how many people are in the picture",
+        "what objects appear in the image",
+        "read the text in this screenshot",
+        "what does this diagram illustrate",
+        "is there a dog in the photo",
+        "show me pictures like this one",
+        "what brand is the logo in the image",
+        "identify the plant in this photo",
+        "what is written on the sign in the picture",
+        "look at this image and tell me what you see",
+        "what does the chart in the screenshot depict",
+    ],
+    WEB: [
+        "what is the weather in paris today",
+        "latest news about the election",
+        "who won the football game last night",
+        "stock price of apple",
+        "best restaurants near me",
+        "how to install python on windows",
+        "current exchange rate euro to dollar",
+        "release date of the new iphone",
+        "what time does the pharmacy close",
+        "population of tokyo",
+        "who is the ceo of tesla",
+        "movie showtimes this weekend",
+        "flight status for united 100",
+        "how tall is the eiffel tower",
+        "cheap hotels in rome",
+        "recipe for banana bread",
+        "what is the capital of canada",
+        "who is the prime minister of japan",
+        "how many miles from london to paris",
+        "opening hours of the museum",
+    ],
+    ARXIV: [
+        "find arxiv papers on diffusion models",
+        "latest preprints about large language models",
+        "arxiv paper on graph neural networks",
+        "recent machine learning preprints",
+        "search arxiv for quantum error correction",
+        "new arxiv submissions on reinforcement learning",
+        "preprint about transformer efficiency",
+        "cs.CL preprints on summarization",
+        "arxiv listing for computer vision this week",
+        "look up the arxiv version of the attention paper",
+        "preprints on protein language models",
+        "recent arxiv work on retrieval augmented generation",
+    ],
+    SCHOLAR: [
+        "scientific papers about climate change",
+        "research studies on sleep and memory",
+        "peer reviewed articles on vaccine efficacy",
+        "academic papers citing attention is all you need",
+        "literature review of microplastics in oceans",
+        "most cited papers in neuroscience",
+        "journal articles on protein folding",
+        "science research on photosynthesis efficiency",
+        "meta analysis of intermittent fasting studies",
+        "clinical trial publications on statins",
+        "scholarly sources on the history of economics",
+        "published research about bilingual children",
+    ],
+}
+
+
+class Route(NamedTuple):
+    label: str
+    score: float
+    scores: Dict[str, float]
+
+
+def _features(text: str) -> Iterable[str]:
+    words = [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+    for i, w in enumerate(words):
+        yield w
+        if i:
+            yield f"{words[i - 1]} {w}"
+        padded = f" {w} "
+        for n in (3, 4):
+            for j in range(len(padded) - n + 1):
+                yield padded[j:j + n]
+
+
+@lru_cache(maxsize=4096)
+def embed(text: str) -> np.ndarray:
+    """Hashed n-gram count vector of ``text`` (not a model embedding), L2-normalized, read-only and cached."""
+    idx = np.fromiter((zlib.crc32(f.encode()) % DIM for f in _features(text)), dtype=np.int64)
+    vec = np.zeros(DIM, dtype=np.float32)
+    if len(idx):
+        np.add.at(vec, idx, 1.0)
+        np.sqrt(vec, out=vec)  # damp repeated features
+        vec /= np.linalg.norm(vec)
+    vec.setflags(write=False)
+    return vec
+
+
+class PrototypeRouter:
+    """Nearest-centroid classifier over the prototype queries' n-gram vectors."""
+
+    def __init__(self, prototypes: Dict[str, Sequence[str]], min_score: float = MIN_SCORE):
+        self.labels = list(prototypes)
+        centroids = np.stack([np.mean([embed(p) for p in prototypes[label]], axis=0) for label in self.labels])
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+        self.centroids = centroids
+        self.min_score = min_score
+
+    def route(self, query: str, labels: Optional[Sequence[str]] = None,
+              default: Optional[str] = None) -> Route:
+        """Best route for ``query``, restricted to ``labels`` when given.
+
+        Returns ``default`` as the label when no route is similar enough.
+        """
+        rows = list(range(len(self.labels))) if labels is None else [self.labels.index(label) for label in labels]
+        sims = self.centroids[rows] @ embed(query)
+        best = int(np.argmax(sims))
+        scores = {self.labels[r]: float(s) for r, s in zip(rows, sims)}
+        label = self.labels[rows[best]]
+        if sims[best] < self.min_score and default is not None:
+            label = default
+        return Route(label, float(sims[best]), scores)
+
+
+_router: Optional[PrototypeRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> PrototypeRouter:
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = PrototypeRouter(PROTOTYPES)
+    return _router
+
+
+def route(query: str, labels: Optional[Sequence[str]] = None, default: Optional[str] = None) -> Route:
+    return get_router().route(query, labels=labels, default=default)
@@ -1,29 +1,86 @@
 # agents/rag_agent.py
 from __future__ import annotations
-import base64, os, tempfile, time, inspect, logging, json
+import asyncio, base64, os, tempfile, time, inspect, logging, json, threading
 from uuid import uuid4
 from collections import defaultdict
 from cachetools import TTLCache
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from vectorstore.faiss_embed_and_store import ingest_text_to_faiss
+from vectorstore.faiss_embed_and_store import ingest_chunks_to_faiss, ingest_text_to_faiss
+from vectorstore import chunking
+from vectorstore import faiss_store
 from vectorstore.faiss_store import search_faiss_with_score
-from vectorstore.pinecone_store import ingest_pdf_text_to_pinecone, search_pinecone_with_score
-from agents import search_agent, translate_agent
-from models.gemini_vision import summarize_text_gemini
+from vectorstore.pinecone_store import ingest_pdf_chunks_to_pinecone, search_pinecone_with_score
+from agents import query_expansion, search_agent, translate_agent
+from models.gemini_vision import SUMMARY_MODEL, summarize_text_gemini
+from app.image_rag_utils import analyze_image_content
 from app.config import Settings
-from typing import Any, Dict
+from app import token_budget
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 settings = Settings()
-DEFAULT_SESSION_TTL = 3600
+DEFAULT_SESSION_TTL = settings.SESSION_TTL
+# Per-session FAISS namespaces, deleted when the session is evicted
+SESSION_NAMESPACES = ("pdf", "memory")
 
-session_store: TTLCache[str, Dict[str, Any]] = TTLCache(maxsize=128, ttl=DEFAULT_SESSION_TTL)
+
+class SessionCache(TTLCache):
+    """TTLCache calling ``on_evict(sid)`` for sessions that expire or are pushed out."""
+
+    def __init__(self, maxsize: int, ttl: float, on_evict, **kwargs):
+        super().__init__(maxsize=maxsize, ttl=ttl, **kwargs)
+        self._on_evict = on_evict
+        self._setting = None
+
+    def __setitem__(self, key, value, **kwargs):
+        # TTLCache expires entries before storing; an expired session that is
+        # being written again lives on with its data
+        self._setting = key
+        try:
+            super().__setitem__(key, value, **kwargs)
+        finally:
+            self._setting = None
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for sid, _ in expired:
+            if sid != self._setting:
+                self._on_evict(sid)
+        return expired
+
+    def popitem(self):
+        sid, value = super().popitem()
+        self._on_evict(sid)
+        return sid, value
+
+
+def _drop_session_data(sid: str, evicted_at: float) -> None:
+    if sid in session_store:
+        logger.info(f"Session {sid} is active again; keeping its indexed data")
+        return
+    memory_cache.pop(sid, None)
+    for base in SESSION_NAMESPACES:
+        try:
+            # chunks written since the eviction (the session recreated here or
+            # served by another worker) are kept
+            faiss_store.delete_namespace(_session_ns(base, sid), before=evicted_at)
+        except Exception as e:
+            logger.warning(f"Failed to delete {_session_ns(base, sid)}: {e}")
+
+
+def _on_session_evicted(sid: str) -> None:
+    logger.info(f"Session {sid} evicted; deleting its indexed data")
+    # index writes can take a while; keep them off the request path
+    threading.Thread(target=_drop_session_data, args=(sid, time.time()), name="session-expiry",
+                     daemon=True).start()
+
+
+session_store: SessionCache = SessionCache(maxsize=128, ttl=DEFAULT_SESSION_TTL, on_evict=_on_session_evicted)
 
 memory_cache: dict[str, list[str]] = defaultdict(list)
-MIN_CONFIDENCE = 0.3
+# Calibrated confidence (see vectorstore.calibration) below which the answer
+# comes from web/paper search instead
+MIN_CONFIDENCE = settings.MIN_RAG_CONFIDENCE
 
 def _session_ns(base: str, sid: str|None) -> str:
     return f"{base}_{sid}" if sid else base
@@ -31,24 +88,13 @@ def _session_ns(base: str, sid: str|None) -> str:
 def _clean(txt: str) -> str:
     return txt.replace("<pad>", "").replace("<eos>", "").strip()
 
-def _is_image_query(query: str) -> bool:
-    """Detect if a text query should be treated as an image query."""
-    image_keywords = [
-        'image', 'picture', 'photo', 'look', 'see', 'show', 'display',
-        'what is this', 'what does this look like', 'describe this', 'similar',
-        'appears', 'contains', 'shows', 'depicts', 'represents', 'illustrates',
-        'this image', 'this picture', 'this photo', 'the image', 'the picture'
-    ]
-
-    lower_query = query.lower()
-    return any(keyword in lower_query for keyword in image_keywords)
-
 def _sanitize_b64(content: str) -> bytes:
     import base64, re, urllib.parse
     # Remove data:image/...;base64, prefix
     content = re.sub(r"^data:image/[^;]+;base64,", "", content)
     # URL decode
-    content = urllib.parse.unquote(content)
+    if "%" in content:
+        content = urllib.parse.unquote(content)
     # Remove whitespace
     content = content.strip().replace("\n", "").replace(" ", "")
     # Pad to multiple of 4
@@ -93,23 +139,17 @@ async def process_file(file, session_id: str|None=None) -> tuple[str,str]:
         if suffix == "pdf":
             logger.info(f"Processing PDF: {name}")
             try:
-                loader = PyPDFLoader(temp_path)
-                docs = loader.load()
-                logger.info(f"Loaded {len(docs)} pages from PDF")
-
-                splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
-                chunks = [c for d in docs for c in splitter.split_text(d.page_content)]
+                chunks = await asyncio.to_thread(chunking.chunk_pdf, temp_path)
                 logger.info(f"Created {len(chunks)} text chunks")
 
-                for i, chunk in enumerate(chunks):
+                namespace = _session_ns("pdf", sid)
+                for store, ingest in (("Pinecone", ingest_pdf_chunks_to_pinecone),
+                                      ("FAISS", ingest_chunks_to_faiss)):
                     try:
-                        ingest_pdf_text_to_pinecone(chunk, namespace=_session_ns("pdf", sid))
-                        ingest_text_to_faiss(chunk, namespace=_session_ns("pdf", sid))
-                        if i % 10 == 0:  # Log progress every 10 chunks
-                            logger.info(f"Processed {i+1}/{len(chunks)} chunks")
+                        await asyncio.to_thread(ingest, chunks, namespace, name)
                     except Exception as e:
-                        logger.error(f"Failed to ingest chunk {i}: {str(e)}")
-                        # Continue with other chunks
+                        logger.error(f"{store} ingest of {name} failed: {str(e)}")
+                        # Continue with the other store
 
                 msg = "✅ PDF ingested"
                 logger.info(f"PDF processing completed: {msg}")
@@ -169,12 +209,15 @@ def query_with_confidence(text:str, session_id:str|None=None) -> tuple[str,float
     return _search_all(text, session_id, include_mem=True)
 
 def rewrite_answer(excerpts:str, question:str, lang:str)->str:
-    prompt = f"You are a friendly assistant. The user asked: '{question}'.\nExcerpts:\n{excerpts}"
+    # excerpts come best first: trimming keeps the most relevant ones
     try:
-        return summarize_text_gemini(excerpts, question)
+        context = token_budget.fit(excerpts, SUMMARY_MODEL, site="rewrite_answer", reserve=question)
+        return summarize_text_gemini(context, question)
     except:
         from langchain_openai import ChatOpenAI
         llm = ChatOpenAI(temperature=0.2)
+        context = token_budget.fit(excerpts, llm.model_name, site="rewrite_answer", reserve=question)
+        prompt = f"You are a friendly assistant. The user asked: '{question}'.\nExcerpts:\n{context}"
         return llm.predict(prompt)
 
 def save_memory(q:str, a:str, session_id:str|None=None):
@@ -182,7 +225,8 @@ def save_memory(q:str, a:str, session_id:str|None=None):
     ingest_text_to_faiss(entry, namespace=_session_ns("memory",session_id))
     if session_id: memory_cache[session_id].append(entry)
 
-async def handle_query(mode: str, content: str, session_id: str, lang: str = "en") -> tuple[str, float, str | None]:
+
+async def handle_query(mode: str, content: str | bytes, session_id: str, lang: str = "en") -> tuple[str, float, str | None]:
     logger.info(f"handle_query: mode={mode}, session_id={session_id}, content_length={len(content)}")
     session_info = session_store.get(session_id, {})
     last_upload_type = session_info.get("last_upload_type")
@@ -196,21 +240,14 @@ async def handle_query(mode: str, content: str, session_id: str, lang: str = "en
         last_upload_type = None
         raw = ""
 
-    # 1) Image mode: CLIP image-to-image, else OCR fallback
+    # 1) Image mode: OCR / describe the image itself
     if mode == "image":
         try:
-            data = _sanitize_b64(content)
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp:
-                tmp.write(data)
-                temp_path = tmp.name
-            # OCR fallback
-            ocr_text = summarize_text_gemini(content, content) # Assuming summarize_text_gemini can handle image text
+            # raw bytes from multipart/binary bodies, base64 text from JSON
+            data = content if isinstance(content, bytes) else _sanitize_b64(content)
+            result = await asyncio.to_thread(analyze_image_content, image_bytes=data)
+            ocr_text = result["caption"]
             response_data = {"ocr_text": ocr_text}
-            if temp_path and os.path.exists(temp_path):
-                try:
-                    os.remove(temp_path)
-                except Exception:
-                    pass
             save_memory("[image upload]", ocr_text, session_id)
             session_store[session_id] = {
                 "text": raw + f"\nUser: [image upload]\nBot: {ocr_text}",
@@ -229,8 +266,17 @@ async def handle_query(mode: str, content: str, session_id: str, lang: str = "en
         pass
     # 3) Text mode: route to image or PDF RAG
     if mode == "text":
-        combined = f"{raw}\nUser: {content}"
+        # the latest turns give the question context; older ones only dilute it
+        history = token_budget.fit(raw, site="search_query", budget=settings.HISTORY_TOKEN_BUDGET, keep_end=True)
+        combined = f"{history}\nUser: {content}"
         excerpts, conf, src = query_with_confidence(combined, session_id)
+        if conf < MIN_CONFIDENCE and query_expansion.enabled():
+            expanded = await asyncio.to_thread(
+                query_expansion.search, content,
+                [(base, _session_ns(base, session_id)) for base in SESSION_NAMESPACES])
+            if expanded and expanded[1] > conf:
+                logger.info(f"Query expansion raised confidence from {conf:.2f} to {expanded[1]:.2f}")
+                excerpts, conf, src = _clean(expanded[0]), expanded[1], expanded[2]
         if conf < MIN_CONFIDENCE:
             for fn, tag in [
                 (search_agent.search_arxiv, "arxiv"),
@@ -1,7 +1,8 @@
 import os
 import requests
-from models.gemini_vision import summarize_text_gemini
-from langchain_openai import ChatOpenAI
+from models.gemini_vision import SUMMARY_MODEL, summarize_text_gemini
+from agents import query_router
+from app import token_budget
 from urllib.parse import quote_plus
 import string
 
@@ -74,13 +75,17 @@ def search_semantic_scholar(query: str) -> str:
 def summarize(text: str, query: str, mode: str = "web") -> str:
     try:
         # Gemini-based summarization
-        summary = summarize_text_gemini(text, query)
+        context = token_budget.fit(text, SUMMARY_MODEL, site="summarize", reserve=query)
+        summary = summarize_text_gemini(context, query)
         return f"🔎 {mode.upper()} Summary:\n{summary}"
     except Exception:
         try:
             # Fallback to OpenAI
+            from langchain_openai import ChatOpenAI
+
             llm = ChatOpenAI(temperature=0.3, model_name="gpt-4")
-            prompt = f"Summarize the following search results based on the query: '{query}'\n\n{text}"
+            context = token_budget.fit(text, llm.model_name, site="summarize", reserve=query)
+            prompt = f"Summarize the following search results based on the query: '{query}'\n\n{context}"
             summary = llm.predict(prompt)
             return f"🧠 {mode.upper()} Summary (OpenAI):\n{summary}"
         except Exception as e:
@@ -91,9 +96,9 @@ def summarize(text: str, query: str, mode: str = "web") -> str:
 def handle_query(query: str) -> str:
     if not query or not query.strip():
         return "❌ Empty search query"
-    query_lower = query.lower()
-    if "arxiv" in query_lower:
+    route = query_router.route(query, labels=query_router.SEARCH_ROUTES, default=query_router.WEB)
+    if route.label == query_router.ARXIV:
         return search_arxiv(query)
-    if "science" in query_lower or "paper" in query_lower:
+    if route.label == query_router.SCHOLAR:
         return search_semantic_scholar(query)
     return search_web(query)
@@ -1,21 +1,180 @@
 # --- agents/translate_agent.py ---
-from langchain_community.llms import OpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain.chains import LLMChain
+"""Translation of answers into the user's language.
 
+Answers are segmented at sentence boundaries and packed into chunks of up
+to ``TRANSLATION_CHUNK_CHARS`` characters, so long answers are translated
+whole (in parallel) instead of being truncated. Each chunk's translation is
+stored in a SQLite table keyed by (sha256 of the chunk, target language) and
+survives restarts. One chat model client is shared by all calls.
+"""
+from __future__ import annotations
 
-def translate_response(text: str, target_lang: str) -> str:
-    if target_lang.lower() == "en":
-        return text
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from app.config import Settings
+from app.services import registry
+
+logger = logging.getLogger(__name__)
+
+settings = Settings()
+
+PROMPT = (
+    "Translate the following text to {lang}. Keep the formatting, links, code "
+    "and numbers unchanged and reply with the translation only.\n\n{text}"
+)
+# A sentence (up to and including its terminal punctuation) or a line, plus
+# the whitespace after it, so joining segments reproduces the input exactly
+_SEGMENT = re.compile(r"[^.!?。！？\n]*(?:[.!?。！？]+|\n|$)\s*")
+
+_executor = ThreadPoolExecutor(max_workers=max(1, settings.TRANSLATION_CONCURRENCY),
+                               thread_name_prefix="translate")
+
+
+def _init_llm():
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(model=settings.TRANSLATION_MODEL, temperature=0)
+
+
+registry.register("translation_llm", _init_llm, warm_up=False)
+
+
+class TranslationCache:
+    """(text hash, language) -> translation, persisted in SQLite."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "hash TEXT NOT NULL, lang TEXT NOT NULL, text TEXT NOT NULL, "
+                "PRIMARY KEY (hash, lang))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
 
-    # Prevent context overflow on long responses
-    if len(text) > 4000:
-        text = text[:4000]
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-    prompt = PromptTemplate.from_template("Translate this to {lang}: {text}")
-    chain = LLMChain(llm=OpenAI(), prompt=prompt)
+    def get_many(self, texts: List[str], lang: str) -> dict:
+        """Return ``{text: translation}`` for the cached ones among ``texts``."""
+        keys = {self.key(t): t for t in texts}
+        if not keys:
+            return {}
+        found = {}
+        with self._lock:
+            db = self._db()
+            items = list(keys)
+            for i in range(0, len(items), 500):  # SQLite host parameter limit
+                batch = items[i:i + 500]
+                rows = db.execute(
+                    f"SELECT hash, text FROM translations WHERE lang = ? AND hash IN ({','.join('?' * len(batch))})",
+                    [lang, *batch],
+                ).fetchall()
+                found.update({keys[h]: t for h, t in rows})
+        return found
 
+    def set(self, text: str, lang: str, translation: str) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO translations (hash, lang, text) VALUES (?, ?, ?)",
+                (self.key(text), lang, translation),
+            )
+            db.commit()
+
+
+cache = TranslationCache(settings.TRANSLATION_CACHE_PATH)
+
+
+def needs_translation(target_lang: str | None) -> bool:
+    return bool(target_lang) and target_lang.lower().split("-")[0] != "en"
+
+
+def segment(text: str, max_chars: int | None = None) -> List[Tuple[str, str]]:
+    """Split ``text`` into ``(chunk, trailing_whitespace)`` pairs.
+
+    Whole sentences are packed into chunks of at most ``max_chars``; a single
+    sentence longer than that becomes its own chunk.
+    """
+    max_chars = max_chars or settings.TRANSLATION_CHUNK_CHARS
+    chunks: List[Tuple[str, str]] = []
+    current = ""
+    for sentence in _SEGMENT.findall(text):
+        if current and len(current) + len(sentence) > max_chars:
+            body = current.rstrip()
+            chunks.append((body, current[len(body):]))
+            current = ""
+        current += sentence
+    if current:
+        body = current.rstrip()
+        chunks.append((body, current[len(body):]))
+    # leading whitespace of the text is kept as is
+    lead = text[: len(text) - len(text.lstrip())]
+    if lead and chunks:
+        chunks[0] = (chunks[0][0].lstrip(), chunks[0][1])
+        chunks.insert(0, ("", lead))
+    return chunks
+
+
+def _translate_chunk(text: str, lang: str) -> str:
+    reply = registry.get("translation_llm").invoke(PROMPT.format(lang=lang, text=text))
+    translated = getattr(reply, "content", reply).strip()
+    cache.set(text, lang, translated)
+    return translated
+
+
+def translate_stream(text: str, target_lang: str) -> Iterator[str]:
+    """Yield the translation of ``text`` chunk by chunk, in order.
+
+    Cached chunks are served immediately; the others are translated in
+    parallel and yielded as soon as every chunk before them is done. A chunk
+    whose translation fails is passed through untranslated.
+    """
+    if not needs_translation(target_lang) or not text.strip():
+        yield text
+        return
+    lang = target_lang.lower()
+    chunks = segment(text)
+    cached = cache.get_many([c for c, _ in chunks if c], lang)
+    futures = {
+        i: _executor.submit(_translate_chunk, c, lang)
+        for i, (c, _) in enumerate(chunks)
+        if c and c not in cached
+    }
     try:
-        return chain.run(lang=target_lang, text=text)
-    except Exception as e:
-        return f"⚠️ Translation failed: {str(e)}"
+        for i, (chunk, tail) in enumerate(chunks):
+            if not chunk:
+                yield tail
+                continue
+            if i in futures:
+                try:
+                    translated = futures[i].result()
+                except Exception as e:
+                    logger.warning(f"Translation to {lang} failed, keeping original text: {e}")
+                    translated = chunk
+            else:
+                translated = cached[chunk]
+            yield translated + tail
+    finally:
+        for fut in futures.values():
+            fut.cancel()
+
+
+def translate_response(text: str, target_lang: str) -> str:
+    return "".join(translate_stream(text, target_lang))
@@ -0,0 +1,142 @@
+"""Content-addressed storage for uploaded and indexed images.
+
+Blobs are named by the SHA-256 of their bytes and sharded into nested
+two-character directories (``ab/cd/abcd....png``) so no directory grows
+without bound. Writes go to a temp file and are renamed into place, and the
+``aput`` variant runs the blocking disk I/O in a worker thread so request
+handlers never stall the event loop. ``cleanup`` enforces an age and total
+size retention policy on the sharded files only, leaving anything else under
+``root`` (indexes, metadata) untouched.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_HEX = set("0123456789abcdef")
+
+
+class ImageBlobStore:
+    def __init__(self, root: str, shard_depth: int = 2, max_age: Optional[float] = None,
+                 max_bytes: Optional[int] = None, cleanup_interval: float = 3600.0):
+        self.root = root
+        self.shard_depth = shard_depth
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = 0.0
+        self._cleanup_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, key: str, ext: str = "") -> str:
+        shards = [key[2 * i:2 * i + 2] for i in range(self.shard_depth)]
+        return os.path.join(self.root, *shards, f"{key}{ext}")
+
+    def relpath(self, path: str) -> str:
+        """Path of a blob relative to ``root`` using URL separators."""
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def put(self, data: bytes, ext: str = "", key: Optional[str] = None) -> str:
+        """Store ``data`` under its content hash and return the blob path."""
+        key = key or hashlib.sha256(data).hexdigest()
+        path = self.path_for(key, ext)
+        if os.path.exists(path):
+            os.utime(path)
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return path
+
+    def put_file(self, src: str, ext: Optional[str] = None) -> str:
+        """Copy the file at ``src`` into the store, hashing it in chunks."""
+        digest = hashlib.sha256()
+        with open(src, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        path = self.path_for(digest.hexdigest(), os.path.splitext(src)[1] if ext is None else ext)
+        if os.path.exists(path):
+            os.utime(path)
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return path
+
+    async def aput(self, data: bytes, ext: str = "", key: Optional[str] = None) -> str:
+        path = await asyncio.to_thread(self.put, data, ext, key)
+        self._schedule_cleanup()
+        return path
+
+    def _schedule_cleanup(self) -> None:
+        if self.max_age is None and self.max_bytes is None:
+            return
+        if time.time() - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = time.time()
+        threading.Thread(target=self.cleanup, name="blob-cleanup", daemon=True).start()
+
+    def _blobs(self):
+        """Yield ``(mtime, size, path)`` for files inside shard directories."""
+        def walk(directory: str, depth: int):
+            try:
+                names = os.listdir(directory)
+            except OSError:
+                return
+            for name in names:
+                path = os.path.join(directory, name)
+                if depth < self.shard_depth:
+                    if len(name) == 2 and set(name) <= _HEX and os.path.isdir(path):
+                        yield from walk(path, depth + 1)
+                elif not name.endswith(".tmp"):
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield st.st_mtime, st.st_size, path
+        yield from walk(self.root, 0)
+
+    def cleanup(self, max_age: Optional[float] = None, max_bytes: Optional[int] = None) -> Dict[str, int]:
+        """Delete blobs older than ``max_age`` seconds, then the oldest until under ``max_bytes``."""
+        max_age = self.max_age if max_age is None else max_age
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        removed = freed = 0
+        with self._cleanup_lock:
+            blobs = sorted(self._blobs())
+            total = sum(size for _, size, _ in blobs)
+            cutoff = time.time() - max_age if max_age is not None else None
+            for mtime, size, path in blobs:
+                expired = cutoff is not None and mtime < cutoff
+                oversize = max_bytes is not None and total > max_bytes
+                if not (expired or oversize):
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                removed += 1
+                freed += size
+                total -= size
+        if removed:
+            logger.info(f"Blob store {self.root}: removed {removed} files, freed {freed} bytes")
+        return {"removed": removed, "freed_bytes": freed}
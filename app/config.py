@@ -23,10 +23,110 @@ class Settings:
         self.MODEL_PATH           = self._get("MODEL_PATH")
         self.FAISS_INDEX_PATH     = self._get("FAISS_INDEX_PATH")
         self.CLIP_FAISS_INDEX     = os.getenv("CLIP_FAISS_INDEX", "clip_faiss.index")
+        # Embedding size of the CLIP model (512 for clip-vit-base-patch32), so
+        # the image index can be opened without loading the model
+        self.CLIP_EMBED_DIM = self._get_int("CLIP_EMBED_DIM", 512)
 
         repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         default_image_store = os.path.join(repo_root, "vectorstore", "image_store")
         self.IMAGE_STORE = os.getenv("IMAGE_STORE", default_image_store)
+        # Private application state; never mounted as static files (unlike IMAGE_STORE)
+        self.DATA_DIR = os.getenv("DATA_DIR", os.path.join(repo_root, "data"))
+
+        # Content-hash cache of /image-analyze results and deduplicated uploads
+        self.UPLOADED_IMAGES_DIR = os.getenv("UPLOADED_IMAGES_DIR", "uploaded_images")
+        self.UPLOADED_IMAGES_RETENTION_HOURS = self._get_int("UPLOADED_IMAGES_RETENTION_HOURS", 168)
+        self.UPLOADED_IMAGES_MAX_MB = self._get_int("UPLOADED_IMAGES_MAX_MB", 2048)
+        self.IMAGE_ANALYSIS_CACHE_DIR = os.getenv("IMAGE_ANALYSIS_CACHE_DIR", "image_analysis_cache")
+        self.IMAGE_ANALYSIS_CACHE_MAX_MB = self._get_int("IMAGE_ANALYSIS_CACHE_MAX_MB", 256)
+
+        # Similarity search backends for /image-analyze, tried in order.
+        # The remote LAION knn service is only used when its URL is set.
+        self.KNN_BACKENDS = [b.strip() for b in os.getenv("KNN_BACKENDS", "local,remote").split(",") if b.strip()]
+        self.KNN_REMOTE_URL = os.getenv("KNN_REMOTE_URL", "")
+        self.KNN_REMOTE_INDICE = os.getenv("KNN_REMOTE_INDICE", "laion5B-L-14")
+        self.KNN_REMOTE_TIMEOUT = self._get_int("KNN_REMOTE_TIMEOUT", 15)
+
+        # Whisper: model replicas transcribing chunks in parallel (each replica
+        # holds its own weights) and the longest chunk cut at silence
+        self.WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+        self.WHISPER_POOL_SIZE = self._get_int("WHISPER_POOL_SIZE", 1)
+        self.WHISPER_CHUNK_SECONDS = self._get_int("WHISPER_CHUNK_SECONDS", 30)
+
+        # Answer translation: persistent (text hash, language) cache, chat
+        # model, and how long answers are split up for parallel translation
+        self.TRANSLATION_CACHE_PATH = os.getenv(
+            "TRANSLATION_CACHE_PATH", os.path.join(self.DATA_DIR, "translation_cache.sqlite3"))
+        self.TRANSLATION_MODEL = os.getenv("TRANSLATION_MODEL", "gpt-4o-mini")
+        self.TRANSLATION_CHUNK_CHARS = self._get_int("TRANSLATION_CHUNK_CHARS", 1500)
+        self.TRANSLATION_CONCURRENCY = self._get_int("TRANSLATION_CONCURRENCY", 4)
+
+        # Services built in the background at startup: empty for every service
+        # flagged for warm-up, "none" to build everything on first use
+        self.WARMUP_SERVICES = [s.strip() for s in os.getenv("WARMUP_SERVICES", "").split(",") if s.strip()]
+        # Preload CLIP, Whisper and the FAISS indexes (with a dummy inference)
+        # during that background warm-up instead of on the first request
+        self.MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() == "true"
+
+        # Fuse the local FAISS text search with a BM25 keyword index
+        # (reciprocal-rank fusion, RRF_K damping the rank contributions)
+        self.HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+        self.RRF_K = self._get_int("RRF_K", 60)
+        # Re-rank fused FAISS candidates before they reach the prompt: MMR
+        # (RERANK_MMR_LAMBDA weighs relevance against redundancy), dropping
+        # chunks at RERANK_DEDUPE cosine similarity to a kept one, and an
+        # optional local cross-encoder scoring at most RERANK_CANDIDATES chunks
+        self.RERANK = os.getenv("RERANK", "true").lower() == "true"
+        self.RERANK_MMR_LAMBDA = self._get_float("RERANK_MMR_LAMBDA", 0.7)
+        self.RERANK_DEDUPE = self._get_float("RERANK_DEDUPE", 0.95)
+        self.RERANK_MODEL = os.getenv("RERANK_MODEL", "")
+        self.RERANK_CANDIDATES = self._get_int("RERANK_CANDIDATES", 10)
+        # Fitted per-retriever score calibration (see vectorstore/calibration.py);
+        # built-in defaults apply while the file does not exist
+        self.CALIBRATION_PATH = os.getenv("CALIBRATION_PATH", "calibration.json")
+        # Tokens of context (excerpts, search results) per LLM prompt, by
+        # default and per model ("gemini-1.5-flash:6000,gpt-4:2000"), and of
+        # the session transcript that is searched along with a question
+        self.PROMPT_TOKEN_BUDGET = self._get_int("PROMPT_TOKEN_BUDGET", 3000)
+        self.PROMPT_TOKEN_BUDGETS = os.getenv("PROMPT_TOKEN_BUDGETS", "")
+        self.HISTORY_TOKEN_BUDGET = self._get_int("HISTORY_TOKEN_BUDGET", 500)
+        # Retry low-confidence questions against the local index before the
+        # web fallback: "multi" searches QUERY_EXPANSION_N LLM paraphrases,
+        # "hyde" a hypothetical answer, all within QUERY_EXPANSION_BUDGET s
+        self.QUERY_EXPANSION = os.getenv("QUERY_EXPANSION", "").lower()
+        self.QUERY_EXPANSION_N = self._get_int("QUERY_EXPANSION_N", 3)
+        self.QUERY_EXPANSION_MODEL = os.getenv("QUERY_EXPANSION_MODEL", "gpt-4o-mini")
+        self.QUERY_EXPANSION_BUDGET = self._get_float("QUERY_EXPANSION_BUDGET", 2.0)
+        # Maximum characters per indexed chunk; PDF chunks follow the layout
+        # (headings, paragraphs, tables) and keep their pages and section
+        self.CHUNK_CHARS = self._get_int("CHUNK_CHARS", 1000)
+        # Processes extracting the pages of long PDFs in parallel (0: one per
+        # core), each task covering PDF_PAGES_PER_TASK pages
+        self.PDF_WORKERS = self._get_int("PDF_WORKERS", 0)
+        self.PDF_PAGES_PER_TASK = self._get_int("PDF_PAGES_PER_TASK", 16)
+
+        # Precision of the raw embeddings kept next to the FAISS text index
+        # ("float16" halves the file); only applies to a new vectors file
+        self.FAISS_VECTOR_DTYPE = os.getenv("FAISS_VECTOR_DTYPE", "float32")
+
+        # Seconds a chat session lives without activity; its pdf_<sid> and
+        # memory_<sid> namespaces are deleted from the FAISS store with it
+        self.SESSION_TTL = self._get_int("SESSION_TTL", 3600)
+
+        # Namespaces kept in quantized indexes ("memory_*:sq8,pdf_*:pq", see
+        # vectorstore/quantization.py), PQ code size in bytes (0: dim / 16)
+        # and how many extra candidates lossy modes re-score exactly
+        self.FAISS_QUANTIZATION = os.getenv("FAISS_QUANTIZATION", "")
+        self.FAISS_PQ_M = self._get_int("FAISS_PQ_M", 0)
+        self.FAISS_RESCORE_FACTOR = self._get_int("FAISS_RESCORE_FACTOR", 16)
+        # Chunks (and CLIP images) appended to the stores are searched exactly
+        # from their vectors until this many are merged into the indexes at once
+        self.FAISS_MERGE_SIZE = self._get_int("FAISS_MERGE_SIZE", 1000)
+
+        # Multi-worker (gunicorn) deployments: socket of the single process
+        # that applies FAISS index writes; empty keeps writes in-process
+        self.INDEX_WRITER_ADDRESS = os.getenv("INDEX_WRITER_ADDRESS", "")
+        self.INDEX_WRITER_AUTHKEY = os.getenv("INDEX_WRITER_AUTHKEY", "")
 
         self.RUNPOD_URL  = os.getenv("RUNPOD_URL", "")
         self.NEXT_PUBLIC_FASTAPI_URL = os.getenv("NEXT_PUBLIC_FASTAPI_URL", "")
@@ -65,6 +165,24 @@ class Settings:
             raise EnvironmentError(f"❌ Environment variable `{key}` is not set.")
         return value
 
+    def _get_float(self, key: str, default: float) -> float:
+        raw = os.getenv(key)
+        try:
+            return float(raw) if raw and raw.strip() else default
+        except ValueError:
+            if self.env == "production":
+                raise RuntimeError(f"Invalid {key}: {raw!r}")
+            return default
+
+    def _get_int(self, key: str, default: int) -> int:
+        raw = os.getenv(key)
+        try:
+            return int(raw) if raw and raw.strip() else default
+        except ValueError:
+            if self.env == "production":
+                raise RuntimeError(f"Invalid {key}: {raw!r}")
+            return default
+
     def validate_api_keys(self) -> None:
         """Raise if any critical API key is dummy in production."""
         required = {
@@ -0,0 +1,125 @@
+"""Content-hash keyed cache for ``/image-analyze`` results.
+
+Entries live in a small in-memory LRU backed by one JSON file per image hash
+on disk, so retries of the same upload survive restarts. The disk directory
+is bounded by ``max_bytes``; the least recently used entries (by file mtime,
+refreshed on every hit) are evicted first. The directory is only scanned
+when a running byte count crosses ``max_bytes``, and eviction then goes
+down to ``low_water`` of it so the next scan is many writes away.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from cachetools import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def image_key(data: bytes) -> str:
+    """Return the content hash used to key cached analyses and stored files."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ImageAnalysisCache:
+    def __init__(self, cache_dir: str, max_bytes: int, memory_items: int = 256, low_water: float = 0.9):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self._memory: LRUCache[str, Dict[str, Any]] = LRUCache(maxsize=memory_items)
+        self._lock = threading.Lock()
+        # Bytes on disk: counted by the first scan, then kept up to date by
+        # this process (other processes' writes show up at the next scan)
+        self._total: Optional[int] = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(key)
+        path = self._path(key)
+        if entry is None:
+            try:
+                with open(path, "r") as f:
+                    entry = json.load(f)
+            except FileNotFoundError:
+                return None
+            except Exception as e:
+                logger.warning(f"Dropping unreadable image cache entry {key}: {e}")
+                self._remove(path)
+                return None
+            with self._lock:
+                self._memory[key] = entry
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[key] = value
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        try:
+            with open(tmp, "w") as f:
+                json.dump(value, f)
+                size = f.tell()
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning(f"Failed to persist image cache entry {key}: {e}")
+            self._remove(tmp)
+            return
+        with self._lock:
+            if self._total is not None:
+                self._total += size - old_size
+                if self._total <= self.max_bytes:
+                    return
+        self._evict()
+
+    def _evict(self) -> None:
+        """Rescan the directory and drop the oldest entries down to the low-water mark."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        if total > self.max_bytes:
+            target = int(self.max_bytes * self.low_water)
+            entries.sort()
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                self._remove(path)
+                with self._lock:
+                    self._memory.pop(os.path.basename(path)[:-5], None)
+                total -= size
+            logger.info(f"Image cache evicted down to {total} bytes")
+        with self._lock:
+            self._total = total
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
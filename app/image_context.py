@@ -0,0 +1,52 @@
+"""Per-request image state shared by the CLIP, kNN and Gemini stages.
+
+An :class:`ImageContext` wraps the uploaded bytes and decodes them at most
+once. Stages attach what they compute (the CLIP pixel tensor and the
+normalized embedding) so later stages reuse it instead of re-reading or
+re-encoding the image.
+"""
+
+from __future__ import annotations
+
+from io import BytesIO
+from typing import Any, Optional
+
+import numpy as np
+from PIL import Image
+
+from app.image_cache import image_key
+
+
+class ImageContext:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pixel_values: Any = None
+        self.embedding: Optional[np.ndarray] = None
+        self.decode_count = 0
+        self._image: Optional[Image.Image] = None
+        self._rgb: Optional[Image.Image] = None
+        self._sha256: Optional[str] = None
+
+    @property
+    def sha256(self) -> str:
+        if self._sha256 is None:
+            self._sha256 = image_key(self.data)
+        return self._sha256
+
+    @property
+    def image(self) -> Image.Image:
+        """The decoded image in its original mode and format."""
+        if self._image is None:
+            img = Image.open(BytesIO(self.data))
+            img.load()
+            self.decode_count += 1
+            self._image = img
+        return self._image
+
+    @property
+    def rgb(self) -> Image.Image:
+        """RGB view of :attr:`image` as expected by CLIP."""
+        if self._rgb is None:
+            img = self.image
+            self._rgb = img if img.mode == "RGB" else img.convert("RGB")
+        return self._rgb
@@ -1,21 +1,59 @@
+import logging
 from models import gemini_vision
+from app.image_context import ImageContext
 from fastapi import HTTPException
 
-def analyze_image_content(image_path: str) -> dict:
+logger = logging.getLogger(__name__)
+
+FALLBACK_CAPTION = "Unable to generate a description for this image."
+
+
+def analyze_image_content(image_path: str | None = None, image_bytes: bytes | None = None,
+                          context: ImageContext | None = None) -> dict:
     """
     Modular image understanding pipeline:
-    1. Try OCR (extract_image_text)
-    2. If OCR succeeds and is non-empty, try to summarize (summarize_text_gemini)
-    3. If OCR fails or is empty, try describe_image
+    1. Decode the image once (reusing ``context`` when the caller already has one)
+    2. Ask Gemini for OCR text, summary and description in one structured call
+    3. Only if that call fails, fall back to the OCR -> summarize -> describe cascade
     4. Return the best available result and which method was used
     """
-    ocr_text = None
-    summary = None
-    description = None
-    used = None
+    if context is None:
+        if image_bytes is None:
+            if not image_path:
+                raise HTTPException(status_code=400, detail="No image provided")
+            with open(image_path, "rb") as f:
+                image_bytes = f.read()
+        context = ImageContext(image_bytes)
+    try:
+        img = gemini_vision.validate_image(context.image)
+    except Exception as e:
+        logger.warning(f"Image decode failed: {e}")
+        return {"caption": FALLBACK_CAPTION, "method": "none"}
+    # Every Gemini call below would fail without a key
+    if not gemini_vision.api_key_configured():
+        logger.warning("GEMINI_API_KEY not configured, skipping image analysis")
+        return {"caption": FALLBACK_CAPTION, "method": "none"}
+
+    # 1. Single combined call
+    try:
+        result = gemini_vision.analyze_image(img)
+        ocr_text, summary, description = result["text"], result["summary"], result["description"]
+        if ocr_text and summary:
+            return {"caption": summary, "method": "ocr+summary", "raw_ocr": ocr_text}
+        if ocr_text:
+            return {"caption": ocr_text, "method": "ocr"}
+        if description:
+            return {"caption": description, "method": "describe"}
+    except Exception as e:
+        logger.warning(f"Combined image analysis failed, falling back to cascade: {e}")
+    return _analyze_cascade(img)
+
+
+def _analyze_cascade(img) -> dict:
+    """Sequential OCR -> summarize -> describe fallback on a decoded image."""
     # 1. Try OCR
     try:
-        ocr_text = gemini_vision.extract_image_text(image_path)
+        ocr_text = gemini_vision.extract_text_from_image(img)
         if ocr_text and ocr_text.strip():
             used = "ocr"
             # 2. Try summarization
@@ -31,11 +69,10 @@ def analyze_image_content(image_path: str) -> dict:
         pass
     # 3. Try description
     try:
-        description = gemini_vision.describe_image(image_path)
+        description = gemini_vision.describe_pil_image(img)
         if description and description.strip():
-            used = "describe"
-            return {"caption": description.strip(), "method": used}
+            return {"caption": description.strip(), "method": "describe"}
     except Exception:
         pass
     # 4. Fallback
-    return {"caption": "Unable to generate a description for this image.", "method": "none"} 
+    return {"caption": FALLBACK_CAPTION, "method": "none"}
@@ -1,8 +1,12 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
-from app.routes import chat, upload
+from app.routes import chat, transcribe, upload
 from app.config import Settings
+from app.services import registry
+from app import token_budget
 import logging
 import time
 import uuid
@@ -12,7 +16,24 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 settings = Settings()
-app = FastAPI(title="AutonoMind API", version="2.0")
+
+
+def _warm_up_selection() -> list[str]:
+    if settings.WARMUP_SERVICES == ["none"]:
+        return []
+    return registry.warm_up_names(settings.WARMUP_SERVICES or None)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serve /ping immediately; SDK clients, models and indexes load in the background
+    selected = _warm_up_selection()
+    if selected:
+        registry.start_warm_up(selected)
+    yield
+
+
+app = FastAPI(title="AutonoMind API", version="2.0", lifespan=lifespan)
 app.mount("/images", StaticFiles(directory=settings.IMAGE_STORE), name="images")
 
 # Request logging middleware
@@ -52,6 +73,28 @@ def root() -> dict:
 def ping() -> dict:
     return {"status": "ok", "timestamp": time.time()}
 
+
+# Per-component readiness of lazily initialized backends
+@app.get("/ready")
+def ready():
+    components = registry.status()
+    is_ready = all(registry.is_ready(name) for name in _warm_up_selection())
+    return JSONResponse(
+        content={
+            "ready": is_ready,
+            "warm_up": registry.warm_up_state(),
+            "components": components,
+            "timestamp": time.time(),
+        },
+        status_code=200 if is_ready else 503,
+    )
+
+
+# Tokens of context sent to models per call site, and how often it was trimmed
+@app.get("/metrics")
+def metrics() -> dict:
+    return {"prompt_tokens": token_budget.stats(), "timestamp": time.time()}
+
 # Return the runtime backend URL to verify environment propagation
 @app.get("/debug-env")
 def debug_env() -> dict:
@@ -117,3 +160,4 @@ async def debug_session(session_id: str):
 # Register routers
 app.include_router(upload.router)
 app.include_router(chat.router)
+app.include_router(transcribe.router)
@@ -1,3 +1,3 @@
-from . import chat, upload
+from . import chat, transcribe, upload
 
-__all__ = ["chat", "upload"]
+__all__ = ["chat", "transcribe", "upload"]
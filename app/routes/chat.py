@@ -1,8 +1,10 @@
 # app/routes/chat.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from fastapi.responses import StreamingResponse, JSONResponse
 import agents.rag_agent as rag_agent
-from agents import search_agent
+from agents import search_agent, translate_agent
 from app.config import Settings
 import base64, asyncio, json
 import logging
@@ -13,26 +15,115 @@ from models.whisper_runner import transcribe_audio
 settings = Settings()
 router = APIRouter(tags=["chat"])
 
-def _transcribe(audio_b64: str) -> str:
-    data = base64.b64decode(audio_b64)
+BINARY_MODES = {"image", "voice"}
+
+
+def _transcribe(audio: str | bytes) -> str:
+    data = audio if isinstance(audio, bytes) else base64.b64decode(audio)
     return transcribe_audio(data)
 
-@router.post("/chat")
-async def unified_chat(payload: ChatRequest):
+
+def _mode_for(content_type: str | None) -> str:
+    content_type = (content_type or "").lower()
+    if content_type.startswith("audio/"):
+        return "voice"
+    if content_type.startswith("image/"):
+        return "image"
+    return "text"
+
+
+async def _read_chat_request(request: Request) -> ChatRequest:
+    """Build the chat request from a JSON, multipart or raw binary body.
+
+    JSON bodies carry images and audio base64-encoded in ``content``. To skip
+    that inflation, clients can instead send a multipart form with a ``file``
+    part, or the raw bytes as the body with ``session_id``/``mode``/``lang``
+    in the query string (or ``X-Session-ID``/``X-Mode``/``X-Lang`` headers).
+    For image and voice modes ``content`` is then the undecoded bytes.
+    """
+    ctype = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if ctype in ("", "application/json"):
+        try:
+            body = json.loads(await request.body())
+        except json.JSONDecodeError as e:
+            # the same 422 FastAPI returns for a malformed typed body
+            raise RequestValidationError([{"type": "json_invalid", "loc": ("body", e.pos), "msg": "JSON decode error",
+                                           "input": {}, "ctx": {"error": e.msg}}])
+        return _validate(body)
+
+    if ctype == "multipart/form-data":
+        params = await request.form()
+        part = params.get("file")
+        if hasattr(part, "read"):
+            content, default_mode = await part.read(), _mode_for(part.content_type)
+        else:
+            content, default_mode = params.get("content", ""), "text"
+    else:
+        params = request.query_params
+        content, default_mode = await request.body(), _mode_for(ctype)
+
+    def param(name: str, header: str, default: str) -> str:
+        return params.get(name) or request.headers.get(header) or default
+
+    mode = param("mode", "X-Mode", default_mode)
+    if isinstance(content, bytes) and mode not in BINARY_MODES:
+        content = content.decode("utf-8", errors="replace")
+    return _validate({
+        "session_id": param("session_id", "X-Session-ID", ""),
+        "mode": mode,
+        "lang": param("lang", "X-Lang", "en"),
+        "content": content,
+    })
+
+
+def _validate(body) -> ChatRequest:
+    try:
+        return ChatRequest.model_validate(body)
+    except ValidationError as e:
+        raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)])
+
+
+# The body is read by hand to accept multipart and raw bodies too; document
+# the JSON schema (and the alternatives) as a typed body would
+_CHAT_BODY = {
+    "required": True,
+    "content": {
+        "application/json": {"schema": ChatRequest.model_json_schema()},
+        "multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {
+                "file": {"type": "string", "format": "binary"}, "content": {"type": "string"},
+                "session_id": {"type": "string"}, "mode": {"type": "string"}, "lang": {"type": "string"},
+            },
+        }},
+        "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+    },
+}
+
+
+@router.post("/chat", openapi_extra={"requestBody": _CHAT_BODY})
+async def unified_chat(request: Request):
     settings.validate_api_keys()
+    payload = await _read_chat_request(request)
     if not payload.session_id:
         raise HTTPException(400, "session_id required")
 
     mode, content = payload.mode, payload.content
-    # if voice: content already base64-audio, transcribe upstream
+    # voice content is audio (raw bytes or base64), transcribe before RAG
     if mode=="voice":
-        content = _transcribe(content)
+        content = await asyncio.to_thread(_transcribe, content)
         mode = "text"
 
     if mode == "search":
         text = search_agent.handle_query(content)
         conf = 1.0
         src = "web"
+    elif mode == "agent":
+        # LangGraph router (intent routing, plugin nodes, translation), compiled
+        # once per plugin set; imported here so langgraph loads on first use
+        from agents import mcp_server
+        state = await mcp_server.aroute_with_langgraph(content, payload.lang, payload.session_id)
+        text, conf, src = state["input"], 1.0, "agent"
     else:
         text, conf, src = await rag_agent.handle_query(mode, content, payload.session_id, payload.lang)
         # If image query failed, return error as plain text
@@ -45,8 +136,10 @@ async def unified_chat(payload: ChatRequest):
             text = rag_agent.rewrite_answer(text, content, payload.lang)
 
     # Check if response is JSON (image query result)
+    is_json = False
     try:
         response_data = json.loads(text)
+        is_json = isinstance(response_data, (dict, list))
         if isinstance(response_data, dict) and ("image_url" in response_data or "description" in response_data or "results" in response_data):
             # Return structured JSON response for image queries
             headers = {
@@ -71,4 +164,9 @@ async def unified_chat(payload: ChatRequest):
       "X-Confidence": str(conf),
       "X-Source": src or ""
     }
+    # the agent graph translates in its last node
+    if translate_agent.needs_translation(payload.lang) and not is_json and mode != "agent":
+        # Translated chunk by chunk; a sync generator runs in a worker thread
+        body = translate_agent.translate_stream(text, payload.lang)
+        return StreamingResponse(body, media_type="text/plain", headers=headers)
     return StreamingResponse(streamer(), media_type="text/plain", headers=headers)
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import logging
+
+from models import whisper_runner
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["transcribe"])
+
+
+@router.post("/transcribe")
+async def transcribe(request: Request, file: UploadFile = File(...), stream: bool = False):
+    """Transcribe an uploaded audio file.
+
+    Returns ``{"text": ...}``; with ``?stream=true`` (or ``Accept:
+    application/x-ndjson``) partial transcripts are streamed as NDJSON lines
+    per speech chunk, followed by a final ``{"done": true, "text": ...}``.
+    """
+    data = await file.read()
+    try:
+        audio = await asyncio.to_thread(whisper_runner.decode_audio, data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not (stream or "application/x-ndjson" in request.headers.get("accept", "")):
+        parts = await asyncio.to_thread(lambda: list(whisper_runner.transcribe_chunks(audio)))
+        return {"text": " ".join(p["text"] for p in parts if p["text"])}
+
+    # A sync generator: Starlette iterates it in a worker thread
+    def lines():
+        texts = []
+        try:
+            for part in whisper_runner.transcribe_chunks(audio):
+                texts.append(part["text"])
+                yield json.dumps(part) + "\n"
+        except Exception as e:
+            logger.error(f"Streaming transcription failed: {e}")
+            yield json.dumps({"error": str(e)}) + "\n"
+            return
+        yield json.dumps({"done": True, "text": " ".join(t for t in texts if t)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -4,13 +4,15 @@ import logging
 from uuid import uuid4
 from agents import rag_agent
 from agents import clip_faiss  # For CLIP embedding
-from models import gemini_vision  # For image captioning
-import requests
+from agents import knn_backends
+import asyncio
 import numpy as np
-import os
 from app.image_rag_utils import analyze_image_content
-from fastapi import APIRouter, UploadFile, File
-from fastapi.responses import JSONResponse
+from app.image_cache import ImageAnalysisCache
+from app.blob_store import ImageBlobStore
+from app.image_context import ImageContext
+from app.config import Settings
+from app.services import registry
 from agents.clip_faiss import search_laion_by_image
 
 # Configure logging
@@ -18,6 +20,27 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["upload"])
+settings = Settings()
+
+
+# Both stores create their directory, so they are built on first use
+def _init_upload_blobs() -> ImageBlobStore:
+    return ImageBlobStore(
+        settings.UPLOADED_IMAGES_DIR,
+        max_age=settings.UPLOADED_IMAGES_RETENTION_HOURS * 3600,
+        max_bytes=settings.UPLOADED_IMAGES_MAX_MB * 1024 * 1024,
+    )
+
+
+def _init_analysis_cache() -> ImageAnalysisCache:
+    return ImageAnalysisCache(
+        settings.IMAGE_ANALYSIS_CACHE_DIR,
+        max_bytes=settings.IMAGE_ANALYSIS_CACHE_MAX_MB * 1024 * 1024,
+    )
+
+
+registry.register("upload_blobs", _init_upload_blobs, warm_up=False)
+registry.register("image_analysis_cache", _init_analysis_cache, warm_up=False)
 
 # File size limits (50MB for PDFs, 10MB for images)
 MAX_PDF_SIZE = 50 * 1024 * 1024  # 50MB
@@ -79,6 +102,24 @@ async def debug_upload(file: UploadFile = File(...), session_id: str = Form(""))
         logger.error(f"Debug upload failed: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Debug upload failed: {str(e)}")
 
+
+def _image_analyze_response(session_id: str, result: dict, cached: bool = False) -> dict:
+    """Build the /image-analyze response from a (possibly cached) analysis."""
+    if not result["similar_images"]:
+        clip_message = "No visually similar images found in the public gallery."
+    else:
+        clip_message = None
+    return {
+        "session_id": session_id,
+        "caption": result["caption"],
+        "caption_method": result["caption_method"],
+        "similar_images": result["similar_images"],
+        "clip_message": clip_message,
+        "knn_backend": result.get("knn_backend"),
+        "knn_latency_ms": {} if cached else result.get("knn_latency_ms", {}),
+        "cached": cached,
+    }
+
 @router.post("/image-analyze")
 async def image_analyze(file: UploadFile = File(...), session_id: str = Form("")):
     """Hybrid image pipeline: CLIP embedding, clip-retrieval, modular Gemini Vision captioning/OCR/summarization."""
@@ -94,49 +135,34 @@ async def image_analyze(file: UploadFile = File(...), session_id: str = Form("")
         if not session_id:
             session_id = str(uuid4())
             logger.info(f"Generated new session_id: {session_id}")
-        # Save file to disk
         contents = await file.read()
-        save_dir = "uploaded_images"
-        os.makedirs(save_dir, exist_ok=True)
-        save_path = os.path.join(save_dir, f"{uuid4().hex}_{file.filename}")
-        with open(save_path, "wb") as f_out:
-            f_out.write(contents)
+        # One decoded image, CLIP tensor and embedding shared by every stage below
+        ctx = ImageContext(contents)
+        # Repeat uploads of the same bytes are served from the analysis cache
+        image_hash = ctx.sha256
+        analysis_cache = registry.get("image_analysis_cache")
+        cached = await asyncio.to_thread(analysis_cache.get, image_hash)
+        if cached is not None:
+            logger.info(f"Image-analyze cache hit {image_hash[:12]} for session {session_id}")
+            return _image_analyze_response(session_id, cached, cached=True)
+        # Save file off the event loop, deduplicated by content hash
+        save_path = await registry.get("upload_blobs").aput(contents, f".{suffix}", key=image_hash)
         logger.info(f"Saved uploaded image to {save_path}")
         # Compute CLIP embedding
         try:
-            embedding = clip_faiss._encode_image(contents)
+            embedding = await asyncio.to_thread(clip_faiss.encode_context, ctx)
             embedding_list = embedding.tolist() if isinstance(embedding, np.ndarray) else list(embedding)
         except Exception as e:
             logger.error(f"CLIP embedding failed: {e}")
             raise HTTPException(status_code=500, detail="Failed to compute image embedding.")
-        # Call clip-retrieval API
-        clip_results = []
-        clip_error = None
-        try:
-            clip_api_url = "https://knn.laion.ai/knn-service"
-            payload = {
-                "embedding": embedding_list,
-                "indice_name": "laion5B-L-14",
-                "num_images": 5
-            }
-            resp = requests.post(clip_api_url, json=payload, timeout=15)
-            resp.raise_for_status()
-            data = resp.json()
-            # Expecting a list of dicts with keys: url, score, caption
-            clip_results = [
-                {
-                    "url": item.get("url"),
-                    "score": item.get("score"),
-                    "caption": item.get("caption")
-                }
-                for item in data if item.get("url")
-            ]
-            logger.info(f"clip-retrieval returned {len(clip_results)} results for session {session_id}")
-        except Exception as e:
-            clip_error = str(e)
-            logger.error(f"clip-retrieval failed: {clip_error}")
-        # Modular Gemini Vision pipeline (OCR, summarize, describe)
-        ai_caption_result = analyze_image_content(save_path)
+        # Similarity search: local LAION index first, remote knn service if configured
+        knn = await asyncio.to_thread(knn_backends.search_similar, embedding, 5)
+        clip_results = knn["results"]
+        clip_error = knn["error"]
+        logger.info(f"kNN backend {knn['backend']} returned {len(clip_results)} results for session {session_id} "
+                    f"(latency_ms={knn['latency_ms']})")
+        # Gemini Vision: one combined OCR/summary/description call, cascade on failure
+        ai_caption_result = await asyncio.to_thread(analyze_image_content, context=ctx)
         ai_caption = ai_caption_result.get("caption")
         ai_caption_method = ai_caption_result.get("method")
         # Logging
@@ -147,20 +173,21 @@ async def image_analyze(file: UploadFile = File(...), session_id: str = Form("")
             "similarity_scores": [r["score"] for r in clip_results],
             "caption_method": ai_caption_method
         })
-        # Response construction
-        if not clip_results:
-            clip_message = "No visually similar images found in the public gallery."
-        else:
-            clip_message = None
         if not ai_caption:
             ai_caption = "Unable to generate a description for this image."
-        return {
-            "session_id": session_id,
+        result = {
+            "embedding": embedding_list,
+            "knn_backend": knn["backend"],
+            "knn_latency_ms": knn["latency_ms"],
             "caption": ai_caption,
             "caption_method": ai_caption_method,
             "similar_images": clip_results,
-            "clip_message": clip_message
         }
+        # Only cache complete analyses so transient failures are retried: a
+        # backend must have answered (none configured is not "no matches")
+        if knn["backend"] is not None and ai_caption_method != "none":
+            await asyncio.to_thread(analysis_cache.set, image_hash, result)
+        return _image_analyze_response(session_id, result)
     except HTTPException:
         raise
     except Exception as e:
@@ -170,5 +197,5 @@ async def image_analyze(file: UploadFile = File(...), session_id: str = Form("")
 @router.post('/laion-search-image')
 async def laion_search_image(file: UploadFile = File(...), top_k: int = 5):
     data = await file.read()
-    results = search_laion_by_image(data, k=top_k)
+    results = await asyncio.to_thread(search_laion_by_image, data, k=top_k)
     return JSONResponse(content={"results": results})
@@ -14,5 +14,6 @@ class SearchInput(BaseModel):
 class ChatRequest(BaseModel):
     session_id: str
     mode: str = "text"
-    content: str
+    # base64 text in JSON bodies; raw bytes for multipart/binary image and voice
+    content: str | bytes
     lang: str = "en"
@@ -0,0 +1,135 @@
+"""Lazily initialized backends and their readiness.
+
+Modules register a zero-argument factory for each heavyweight dependency
+(SDK clients, models, indexes) instead of building it at import time. A
+service is built on the first :meth:`ServiceRegistry.get` call or by the
+background warm-up started from ``app.main``, whichever comes first, and
+``/ready`` reports the per-component state.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+
+class _Service:
+    def __init__(self, factory: Callable[[], Any], warm_up: bool, probe: Optional[Callable[[], bool]]):
+        self.factory = factory
+        self.warm_up = warm_up
+        self.probe = probe
+        self.value: Any = None
+        self.state = PENDING
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self.lock = threading.Lock()
+
+
+class ServiceRegistry:
+    def __init__(self):
+        self._services: Dict[str, _Service] = {}
+        self._warm_thread: Optional[threading.Thread] = None
+        self._warm_state: Dict[str, Any] = {"phase": "idle", "services": [], "started_at": None, "seconds": None}
+
+    def register(self, name: str, factory: Callable[[], Any], warm_up: bool = True,
+                 probe: Optional[Callable[[], bool]] = None) -> None:
+        """Register (or replace) the factory building service ``name``.
+
+        ``probe`` lets modules that also load the resource on their own code
+        path (outside :meth:`get`) report it as ready once loaded.
+        """
+        self._services[name] = _Service(factory, warm_up, probe)
+
+    def get(self, name: str) -> Any:
+        """Return service ``name``, building it on first use.
+
+        A failed build is retried on the next call so transient errors (a
+        slow network during warm-up) do not disable the component for good.
+        """
+        svc = self._services[name]
+        if svc.state == READY:
+            return svc.value
+        with svc.lock:
+            if svc.state == READY:
+                return svc.value
+            svc.state = LOADING
+            t0 = time.perf_counter()
+            try:
+                svc.value = svc.factory()
+            except Exception as e:
+                svc.state = FAILED
+                svc.error = str(e)
+                svc.seconds = round(time.perf_counter() - t0, 3)
+                raise
+            svc.state = READY
+            svc.error = None
+            svc.seconds = round(time.perf_counter() - t0, 3)
+            logger.info(f"Service {name} ready in {svc.seconds}s")
+            return svc.value
+
+    def _state(self, svc: _Service) -> str:
+        if svc.state != READY and svc.probe is not None:
+            try:
+                if svc.probe():
+                    return READY
+            except Exception:
+                pass
+        return svc.state
+
+    def is_ready(self, name: str) -> bool:
+        svc = self._services.get(name)
+        return svc is not None and self._state(svc) == READY
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {"state": self._state(svc), "seconds": svc.seconds, "error": svc.error, "warm_up": svc.warm_up}
+            for name, svc in self._services.items()
+        }
+
+    def warm_up_names(self, names: Optional[Iterable[str]] = None) -> list[str]:
+        """Registered services selected for warm-up (``None`` means all flagged ones)."""
+        if names is None:
+            return [n for n, svc in self._services.items() if svc.warm_up]
+        return [n for n in names if n in self._services]
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, max_workers: int = 4) -> None:
+        """Build the selected services in parallel, logging (not raising) failures."""
+        def build(name: str) -> None:
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.warning(f"Warm-up of {name} failed: {e}")
+
+        selected = self.warm_up_names(names)
+        if not selected:
+            return
+        started = time.time()
+        self._warm_state = {"phase": "running", "services": selected, "started_at": started, "seconds": None}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warmup") as pool:
+            list(pool.map(build, selected))
+        self._warm_state = {
+            "phase": "done", "services": selected, "started_at": started,
+            "seconds": round(time.time() - started, 3),
+        }
+        logger.info(f"Warm-up of {', '.join(selected)} finished in {self._warm_state['seconds']}s")
+
+    def warm_up_state(self) -> Dict[str, Any]:
+        """Phase (``idle``/``running``/``done``) and timing of the last warm-up."""
+        return dict(self._warm_state)
+
+    def start_warm_up(self, names: Optional[Iterable[str]] = None) -> threading.Thread:
+        """Run :meth:`warm_up` in a daemon thread and return it."""
+        names = list(names) if names is not None else None
+        self._warm_thread = threading.Thread(target=self.warm_up, args=(names,), name="warmup", daemon=True)
+        self._warm_thread.start()
+        return self._warm_thread
+
+
+registry = ServiceRegistry()
@@ -0,0 +1,156 @@
+"""Token budgets for the context placed into LLM prompts.
+
+Excerpts, search results and session transcripts go into Gemini/OpenAI
+prompts and embedding requests; unbounded, they make every call slower and
+more expensive. :func:`fit` cuts such context down to the budget of the
+model it is sent to, keeping it in priority order: the leading lines of
+ranked excerpts, or the trailing (most recent) lines of a transcript. A
+line that only partly fits is cut at a word boundary.
+
+Tokens are counted with ``tiktoken`` when it is installed (exact for
+OpenAI models, close for Gemini) and estimated at four characters per
+token otherwise. Budgets are ``PROMPT_TOKEN_BUDGET`` unless
+``PROMPT_TOKEN_BUDGETS`` (``model:tokens`` pairs, e.g.
+``gemini-1.5-flash:6000,gpt-4:2000``) sets one for the model.
+
+Every :func:`fit` call is counted per call site; :func:`stats` (served at
+``/metrics``) reports the tokens sent and how often context was trimmed.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+settings = Settings()
+
+CHARS_PER_TOKEN = 4
+
+
+def parse_budgets(spec: str) -> Dict[str, int]:
+    """``"model:tokens,..."`` -> ``{model: tokens}``."""
+    budgets = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        model, sep, tokens = item.strip().rpartition(":")
+        if not sep or not model or not tokens.strip().isdigit():
+            raise ValueError(f"Invalid token budget {item.strip()!r}: expected model:tokens")
+        budgets[model.strip()] = int(tokens)
+    return budgets
+
+
+_budgets = parse_budgets(settings.PROMPT_TOKEN_BUDGETS)
+
+
+def budget_for(model: Optional[str]) -> int:
+    return _budgets.get(model or "", settings.PROMPT_TOKEN_BUDGET)
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: Optional[str]):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model or "")
+    except KeyError:
+        pass
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:  # the encoding is downloaded on first use
+        logger.warning(f"tiktoken encoding unavailable, estimating token counts: {e}")
+        return None
+
+
+def count(text: str, model: Optional[str] = None) -> int:
+    """Number of tokens of ``text`` for ``model`` (estimated without tiktoken)."""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _cut(line: str, tokens: int, model: Optional[str], from_end: bool) -> str:
+    """Longest run of whole words at the start (end) of ``line`` within ``tokens``."""
+    words = line.split(" ")
+    lo, hi = 0, len(words)
+    while lo < hi:  # most words that fit
+        mid = (lo + hi + 1) // 2
+        part = words[len(words) - mid:] if from_end else words[:mid]
+        if count(" ".join(part), model) <= tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    part = words[len(words) - lo:] if from_end else words[:lo]
+    return " ".join(part) if lo else ""
+
+
+def fit(text: str, model: Optional[str] = None, site: str = "prompt", reserve: str = "",
+        budget: Optional[int] = None, keep_end: bool = False) -> str:
+    """Trim ``text`` so that it and ``reserve`` take at most ``budget`` tokens.
+
+    ``reserve`` is the rest of the prompt (question, instructions), counted
+    but never trimmed. Whole lines are kept from the start of ``text``, or
+    from its end with ``keep_end``. ``budget`` defaults to the model's.
+    """
+    budget = budget_for(model) if budget is None else budget
+    reserved = count(reserve, model)
+    available = max(0, budget - reserved)
+    total = count(text, model)
+    if total <= available:
+        _record(site, total + reserved, 0)
+        return text
+    lines = text.split("\n")
+    if keep_end:
+        lines.reverse()
+    kept: List[str] = []
+    used = 0
+    for line in lines:
+        sep = 1 if kept else 0  # the newline joining it to the kept lines
+        cost = count(line, model) + sep
+        if used + cost > available:
+            part = _cut(line, available - used - sep, model, keep_end)
+            if part:
+                kept.append(part)
+                used += count(part, model) + sep
+            break
+        kept.append(line)
+        used += cost
+    if keep_end:
+        kept.reverse()
+    fitted = "\n".join(kept)
+    _record(site, used + reserved, total - used)
+    logger.info(f"{site}: trimmed context from {total} to {used} tokens (budget {budget}, model {model})")
+    return fitted
+
+
+_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _record(site: str, tokens: int, dropped: int) -> None:
+    with _lock:
+        s = _stats.setdefault(site, {"requests": 0, "tokens": 0, "max_tokens": 0, "trimmed": 0,
+                                     "tokens_dropped": 0})
+        s["requests"] += 1
+        s["tokens"] += tokens
+        s["max_tokens"] = max(s["max_tokens"], tokens)
+        if dropped > 0:
+            s["trimmed"] += 1
+            s["tokens_dropped"] += dropped
+
+
+def stats() -> Dict[str, Dict[str, float]]:
+    """Per call site: requests, tokens sent (total, mean, max) and trimming."""
+    with _lock:
+        return {site: {**s, "mean_tokens": round(s["tokens"] / s["requests"], 1)} for site, s in _stats.items()}
@@ -0,0 +1,149 @@
+"""Throughput of batched versus one-at-a-time vector store searches.
+
+Fills a throwaway ``vectorstore.faiss_store`` text index and a CLIP image
+index (``agents.clip_faiss``) with a synthetic corpus of normalized
+embeddings, then runs the same queries through the single-query functions
+and through their batch variants, which search the whole query matrix with
+one ``index.search`` call. It prints queries/sec for:
+
+* dense: ``_search_ids`` vs ``_search_ids_batch`` (FAISS only)
+* text: ``search_faiss_with_score`` vs ``search_faiss_with_score_batch``
+  (embedding, BM25, fusion, MMR and confidence included); queries are
+  embedded by table lookup, ``--embed-ms`` adds the round trip of one
+  embedding request, which the batch path pays once per batch
+* image: ``search_by_vector`` vs ``search_by_vectors``
+
+FAISS switches its flat search to BLAS matrix products only for large
+query batches (at 128 queries with FAISS 1.15), so the dense speedup shows
+at the batch sizes of evaluation runs rather than of a handful of query
+rewrites; those mostly save embedding round trips.
+
+Usage: python benchmarks/bench_batch_search.py [--n 20000] [--dim 1536] [--queries 512] [--batch 8,64,256] [--embed-ms 0]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+from agents import clip_faiss  # noqa: E402
+from vectorstore import faiss_store as fs  # noqa: E402
+from vectorstore.bm25_index import BM25Index  # noqa: E402
+
+NAMESPACE = "pdf_bench"
+CLIP_DIM = 512
+
+
+def normalize(x: np.ndarray) -> np.ndarray:
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype("float32")
+
+
+class TableEmbeddings:
+    """Embeds known texts by lookup, sleeping ``delay`` seconds per request."""
+
+    def __init__(self, table, delay: float):
+        self.table, self.delay = table, delay
+
+    def embed_query(self, text):
+        time.sleep(self.delay)
+        return self.table[text]
+
+    def embed_documents(self, texts):
+        time.sleep(self.delay)
+        return [self.table[t] for t in texts]
+
+
+def qps(fn, items, batch: int = 0) -> float:
+    t0 = time.perf_counter()
+    if batch:
+        for start in range(0, len(items), batch):
+            fn(items[start:start + batch])
+    else:
+        for item in items:
+            fn(item)
+    return len(items) / (time.perf_counter() - t0)
+
+
+def text_store(stack: ExitStack, tmpdir: str, vecs, texts, embeddings) -> None:
+    path = os.path.join(tmpdir, "index")
+    for name, value in (("FAISS_INDEX_PATH", path), ("META_PATH", path + ".json"),
+                        ("VECTORS_PATH", path + ".vecs"), ("_index", None), ("_meta", []),
+                        ("_vecfile", None), ("_quantized", {}), ("_tail", []), ("_snapshot", None),
+                        ("_loaded_mtime", None), ("_bm25", BM25Index()), ("embedding_model", embeddings)):
+        stack.enter_context(patch.object(fs, name, value))
+    for start in range(0, len(vecs), 1000):
+        fs._apply_add(vecs[start:start + 1000], texts[start:start + 1000], NAMESPACE)
+
+
+def image_store(stack: ExitStack, tmpdir: str, vecs) -> None:
+    path = os.path.join(tmpdir, "clip.index")
+    image = os.path.join(tmpdir, "image.png")
+    with open(image, "wb") as f:
+        f.write(b"png")
+    index = faiss.IndexIDMap(faiss.IndexFlatIP(vecs.shape[1]))
+    index.add_with_ids(vecs, np.arange(len(vecs), dtype="int64"))
+    faiss.write_index(index, path)
+    fs._write_json([{"path": image, "namespace": "image"}] * len(vecs), path + ".json")
+    for name, value in (("INDEX_PATH", path), ("META_PATH", path + ".json"), ("IMAGE_STORE", tmpdir),
+                        ("_index", None), ("_meta", []), ("_loaded_mtime", None)):
+        stack.enter_context(patch.object(clip_faiss, name, value))
+    # only the index dimension is needed; searching by vector runs no model
+    model = SimpleNamespace(projection_dim=vecs.shape[1])
+    stack.enter_context(patch.object(clip_faiss, "_load_model", lambda: (None, model)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=512)
+    parser.add_argument("--batch", default="8,64,256", help="comma-separated batch sizes")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--embed-ms", type=float, default=0.0,
+                        help="simulated latency of one embedding request")
+    args = parser.parse_args()
+    batches = [int(b) for b in args.batch.split(",")]
+
+    rng = np.random.default_rng(0)
+    vecs = normalize(rng.standard_normal((args.n, args.dim)))
+    words = [f"w{i}" for i in range(5000)]
+    texts = [" ".join(rng.choice(words, size=40)) for _ in range(args.n)]
+    picks = rng.choice(args.n, size=args.queries, replace=False)
+    queries = [" ".join(texts[i].split()[:8]) + f" q{j}" for j, i in enumerate(picks)]
+    qvecs = normalize(vecs[picks] + 0.05 * rng.standard_normal((args.queries, args.dim)))
+    embeddings = TableEmbeddings(dict(zip(queries, qvecs.tolist())), args.embed_ms / 1000)
+    images = normalize(rng.standard_normal((args.n, CLIP_DIM)))
+    iqueries = normalize(images[picks] + 0.05 * rng.standard_normal((args.queries, CLIP_DIM)))
+
+    print(f"{args.n} vectors x {args.dim} dims ({CLIP_DIM} for images), {args.queries} queries, "
+          f"k={args.k}, embedding request {args.embed_ms:g} ms, "
+          f"{faiss.omp_get_max_threads()} FAISS threads")
+    print(f"\n{'':8} {'single q/s':>10}" + "".join(f" {f'batch {b}':>10}" for b in batches))
+    with tempfile.TemporaryDirectory() as tmpdir, ExitStack() as stack:
+        text_store(stack, tmpdir, vecs, texts, embeddings)
+        image_store(stack, tmpdir, images)
+        rows = [
+            ("dense", lambda v: fs._search_ids(v, NAMESPACE, args.k),
+             lambda m: fs._search_ids_batch(m, NAMESPACE, args.k), qvecs),
+            ("text", lambda q: fs.search_faiss_with_score(q, NAMESPACE, args.k),
+             lambda qs: fs.search_faiss_with_score_batch(qs, NAMESPACE, args.k), queries),
+            ("image", lambda v: clip_faiss.search_by_vector(v, "image", args.k),
+             lambda m: clip_faiss.search_by_vectors(m, "image", args.k), iqueries),
+        ]
+        for name, single, batched, items in rows:
+            single(items[0]), batched(items[:1])  # load the indexes
+            one = qps(single, items)
+            print(f"{name:8} {one:10.0f}" + "".join(f" {qps(batched, items, b) / one:9.1f}x" for b in batches))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Fallback rate, calibration and latency of RAG confidence scores.
+
+Builds a throwaway local FAISS text index from the passages in
+``benchmarks/calibration_eval.jsonl`` and runs its queries, each labelled
+with the passage that answers it (or ``null`` when none does), through
+``vectorstore.faiss_store``. Confidence is then computed two ways:
+
+* before: ``max(1 / (1 + similarity), keyword coverage)`` against 0.3
+* after: per-retriever Platt calibration against ``MIN_RAG_CONFIDENCE``
+
+and the script prints how often the RAG agent would fall back to web
+search, how often that decision is wrong in either direction, the Brier
+score of the confidence, and the per-query latency of both paths. The
+calibrated numbers are out of sample (two-fold cross-fitting).
+
+Queries are embedded offline with the hashed n-gram embedder of
+``agents.query_router``; ``--openai`` uses the production OpenAI embeddings
+instead, which is what a deployed calibration file should be fitted with:
+``--fit calibration.json`` fits on the whole set and writes the parameters
+(the Pinecone entry reuses the FAISS fit: same embeddings, cosine metric).
+
+Usage: python benchmarks/bench_calibration.py [--openai] [--runs 5] [--fit PATH]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+
+from agents import query_router  # noqa: E402
+from vectorstore import calibration  # noqa: E402
+from vectorstore import faiss_store as fs  # noqa: E402
+from vectorstore.bm25_index import BM25Index  # noqa: E402
+
+EVAL_PATH = os.path.join(os.path.dirname(__file__), "calibration_eval.jsonl")
+NAMESPACE = "pdf_bench"
+LEGACY_THRESHOLD = 0.3
+
+
+class HashedEmbeddings:
+    def embed_query(self, text):
+        return query_router.embed(text).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+def load_eval(path: str = EVAL_PATH):
+    """Return ``(passages, queries)``: ``{id: text}`` and the query rows."""
+    passages, queries = {}, []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if "query" in row:
+                queries.append(row)
+            else:
+                passages[row["id"]] = row["text"]
+    return passages, queries
+
+
+@contextmanager
+def local_store(passages, embeddings):
+    """Point ``faiss_store`` at a temporary index holding ``passages``."""
+    names = ("FAISS_INDEX_PATH", "META_PATH", "VECTORS_PATH", "embedding_model", "_index", "_meta",
+             "_loaded_mtime", "_bm25", "_vecfile")
+    saved = {name: getattr(fs, name) for name in names}
+    with tempfile.TemporaryDirectory() as tmp:
+        fs.FAISS_INDEX_PATH = os.path.join(tmp, "index")
+        fs.META_PATH = fs.FAISS_INDEX_PATH + ".json"
+        fs.VECTORS_PATH = fs.FAISS_INDEX_PATH + ".vecs"
+        fs.embedding_model = embeddings
+        fs._index, fs._meta, fs._loaded_mtime, fs._bm25 = None, [], None, BM25Index()
+        try:
+            fs.add_texts(list(passages.values()), namespace=NAMESPACE)
+            yield fs
+        finally:
+            for name, value in saved.items():
+                setattr(fs, name, value)
+
+
+def collect(passages, queries, k: int = 3):
+    """Raw retriever scores per query and whether the answer was retrieved."""
+    records = []
+    for row in queries:
+        ids, dense, keyword = fs._search_hybrid(row["query"], NAMESPACE, k)
+        texts = [fs._meta[i]["text"] for i in ids]
+        coverages = dict(keyword)
+        answer = passages.get(row["answer"]) if row["answer"] else None
+        records.append({
+            "query": row["query"],
+            "dense": dense[0][1] if dense else 0.0,
+            "coverage": max((coverages.get(i, 0.0) for i in ids), default=0.0),
+            "relevant": int(answer is not None and answer in texts),
+        })
+    return records
+
+
+def legacy_confidence(record, _=None) -> float:
+    return max(1 / (1 + record["dense"]), record["coverage"])
+
+
+def calibrated_confidence(record, calibrators) -> float:
+    confidence = calibrators[calibration.FAISS](record["dense"])
+    if record["coverage"]:
+        confidence = max(confidence, calibrators[calibration.KEYWORD](record["coverage"]))
+    return confidence
+
+
+def fit(records):
+    dense = calibration.fit_platt([r["dense"] for r in records], [r["relevant"] for r in records])
+    keyword = calibration.fit_platt([r["coverage"] for r in records], [r["relevant"] for r in records])
+    return {calibration.FAISS: dense, calibration.PINECONE: dense, calibration.KEYWORD: keyword}
+
+
+def cross_fit(records, folds: int = 2):
+    """Calibrated confidence of each record from a fit on the other folds."""
+    confidences = [0.0] * len(records)
+    for fold in range(folds):
+        train = [r for i, r in enumerate(records) if i % folds != fold]
+        calibrators = fit(train)
+        for i, r in enumerate(records):
+            if i % folds == fold:
+                confidences[i] = calibrated_confidence(r, calibrators)
+    return confidences
+
+
+def decisions(records, confidences, threshold: float):
+    """Fallback rate, wrong fallbacks and wrongly kept answers (as rates)."""
+    n = len(records)
+    fallback = [c < threshold for c in confidences]
+    wrong_fallback = sum(f and r["relevant"] for f, r in zip(fallback, records))
+    wrong_answer = sum(not f and not r["relevant"] for f, r in zip(fallback, records))
+    brier = sum((c - r["relevant"]) ** 2 for c, r in zip(confidences, records)) / n
+    return {
+        "fallback": sum(fallback) / n,
+        "wrong_fallback": wrong_fallback / n,
+        "wrong_answer": wrong_answer / n,
+        "errors": (wrong_fallback + wrong_answer) / n,
+        "brier": brier,
+    }
+
+
+def _latency(queries, confidence, runs: int):
+    samples = []
+    for _ in range(runs):
+        for row in queries:
+            t0 = time.perf_counter()
+            _, dense, keyword = fs._search_hybrid(row["query"], NAMESPACE, 3)
+            confidence(dense, keyword)
+            samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--openai", action="store_true", help="embed with the production OpenAI embeddings")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--fit", metavar="PATH", help="write parameters fitted on the whole set to PATH")
+    args = parser.parse_args()
+
+    passages, queries = load_eval()
+    embeddings = fs._init_embeddings() if args.openai else HashedEmbeddings()
+    threshold = calibration.settings.MIN_RAG_CONFIDENCE
+    with local_store(passages, embeddings):
+        records = collect(passages, queries)
+        answerable = sum(r["relevant"] for r in records)
+        print(f"{len(records)} queries, {answerable} with the answer retrieved")
+
+        rows = [
+            (f"before (1/(1+s), < {LEGACY_THRESHOLD})", [legacy_confidence(r) for r in records], LEGACY_THRESHOLD),
+            (f"after (calibrated, < {threshold})", cross_fit(records), threshold),
+        ]
+        print(f"\n{'':34} {'fallback':>9} {'wrong fb':>9} {'wrong ans':>10} {'errors':>7} {'brier':>6}")
+        for name, confidences, thr in rows:
+            d = decisions(records, confidences, thr)
+            print(f"{name:34} {d['fallback']:9.1%} {d['wrong_fallback']:9.1%} {d['wrong_answer']:10.1%} "
+                  f"{d['errors']:7.1%} {d['brier']:6.3f}")
+
+        calibrators = fit(records)
+        cal_dense, cal_kw = calibrators[calibration.FAISS], calibrators[calibration.KEYWORD]
+
+        def before(dense, keyword):
+            return max(1 / (1 + dense[0][1]) if dense else 0.0, max((c for _, c in keyword), default=0.0))
+
+        def after(dense, keyword):
+            conf = cal_dense(dense[0][1]) if dense else 0.0
+            coverage = max((c for _, c in keyword), default=0.0)
+            return max(conf, cal_kw(coverage)) if coverage else conf
+
+        print()
+        for name, confidence in [("before", before), ("after", after)]:
+            mean, p95 = _latency(queries, confidence, args.runs)
+            print(f"latency {name:6}: mean {mean:.3f} ms, p95 {p95:.3f} ms per query (search + confidence)")
+
+    if args.fit:
+        calibration.save(calibrators, args.fit)
+        print(f"\nwrote {args.fit}: " + ", ".join(f"{n} a={c.a:.3f} b={c.b:.3f}" for n, c in calibrators.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Decode, allocation and Gemini call counts for the /image-analyze image path.
+
+Runs the functions each flow calls rather than a simulation of them:
+
+* ``baseline``: the route before :class:`app.image_context.ImageContext`
+  writes the upload to disk, embeds the bytes with ``clip_faiss._encode_image``,
+  runs the original OCR -> summarize -> describe cascade on the saved file
+  (``gemini_vision.extract_image_text`` / ``describe_image``, the description
+  only when OCR found no text) and re-encodes the bytes for the LAION search.
+* ``context``: the current route, one ``ImageContext`` shared by
+  ``clip_faiss.encode_context`` and ``analyze_image_content``.
+
+Only the model boundaries are replaced: CLIP inference by a preprocessing
+stand-in and the Gemini SDK by canned replies (the images it is sent are
+still decoded, as the SDK does to serialize them). The numbers therefore
+cover decoding, I/O, allocations and how many Gemini requests each flow
+makes, not model latency. ``text`` uploads have OCR text, ``photo`` uploads
+have none and need a description.
+
+Usage: python benchmarks/bench_image_pipeline.py [--size 1024] [--runs 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+from types import SimpleNamespace
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+from agents import clip_faiss  # noqa: E402
+from app.image_context import ImageContext  # noqa: E402
+from app.image_rag_utils import analyze_image_content  # noqa: E402
+from models import gemini_vision  # noqa: E402
+
+_decodes = 0
+_gemini_calls = 0
+_orig_open = Image.open
+
+
+def _counting_open(*a, **k):
+    global _decodes
+    _decodes += 1
+    return _orig_open(*a, **k)
+
+
+def _clip_stand_in(img: Image.Image) -> list:
+    """CLIP-sized preprocessing in place of the model forward pass."""
+    arr = np.asarray(img.resize((224, 224)), dtype="float32") / 255.0
+    return [arr.mean(axis=(0, 1))]
+
+
+class _FakeGemini:
+    """Canned Gemini replies; ``ocr_text`` is empty for photo uploads."""
+
+    def __init__(self, ocr_text: str):
+        self.ocr_text = ocr_text
+
+    def GenerativeModel(self, name):
+        return self
+
+    def generate_content(self, parts, **kwargs):
+        global _gemini_calls
+        _gemini_calls += 1
+        prompt = parts if isinstance(parts, str) else parts[0]
+        for part in parts if isinstance(parts, list) else []:
+            if isinstance(part, Image.Image):
+                part.load()
+        if prompt == gemini_vision.COMBINED_ANALYSIS_PROMPT:
+            text = json.dumps({"text": self.ocr_text, "summary": "a summary" if self.ocr_text else "",
+                               "description": "a description"})
+        elif prompt.startswith("Extract"):
+            text = self.ocr_text
+        elif prompt.startswith("Describe"):
+            text = "a description"
+        else:
+            text = "a summary"
+        return SimpleNamespace(text=text)
+
+
+def _make_image(size: int, with_text: bool) -> bytes:
+    rng = np.random.default_rng(0)
+    img = Image.fromarray(rng.integers(0, 255, (size, size, 3), dtype=np.uint8))
+    if with_text:
+        from PIL import ImageDraw
+
+        ImageDraw.Draw(img).text((10, 10), "INVOICE 42", fill=(0, 0, 0))
+    buf = BytesIO()
+    img.save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def _baseline_analyze(path: str) -> dict:
+    """``analyze_image_content`` as it was before the combined Gemini call."""
+    try:
+        ocr_text = gemini_vision.extract_image_text(path)
+        if ocr_text and ocr_text.strip():
+            summary = gemini_vision.summarize_text_gemini(ocr_text)
+            if summary and summary.strip():
+                return {"caption": summary.strip(), "method": "ocr+summary", "raw_ocr": ocr_text.strip()}
+            return {"caption": ocr_text.strip(), "method": "ocr"}
+    except Exception:
+        pass
+    try:
+        description = gemini_vision.describe_image(path)
+        if description and description.strip():
+            return {"caption": description.strip(), "method": "describe"}
+    except Exception:
+        pass
+    return {"caption": "Unable to generate a description for this image.", "method": "none"}
+
+
+def baseline_pipeline(data: bytes, tmpdir: str) -> dict:
+    path = os.path.join(tmpdir, "upload.jpg")
+    with open(path, "wb") as f:
+        f.write(data)
+    clip_faiss._encode_image(data)
+    result = _baseline_analyze(path)
+    # search_laion_by_image took the bytes and embedded them again
+    clip_faiss._encode_image(data)
+    return result
+
+
+def context_pipeline(data: bytes) -> dict:
+    ctx = ImageContext(data)
+    clip_faiss.encode_context(ctx)
+    result = analyze_image_content(context=ctx)
+    clip_faiss.encode_context(ctx)  # the LAION search reuses the embedding
+    return result
+
+
+def measure(fn, runs: int) -> dict:
+    global _decodes, _gemini_calls
+    method = fn()["method"]  # warm-up
+    _decodes = _gemini_calls = 0
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    elapsed = time.perf_counter() - t0
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = snapshot.statistics("filename")
+    return {
+        "method": method,
+        "decodes/run": _decodes / runs,
+        "gemini_calls/run": _gemini_calls / runs,
+        "ms/run": 1000 * elapsed / runs,
+        "peak_MB": peak / 1e6,
+        "live_blocks": sum(s.count for s in stats),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    clip_faiss._processor, clip_faiss._model = None, _clip_stand_in
+    gemini_vision.settings.GEMINI_API_KEY = "bench-key"
+    Image.open = _counting_open
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for upload, ocr_text in (("text", "INVOICE 42"), ("photo", "")):
+            data = _make_image(args.size, with_text=bool(ocr_text))
+            gemini_vision._genai = lambda fake=_FakeGemini(ocr_text): fake
+            rows = {
+                "baseline": measure(lambda: baseline_pipeline(data, tmpdir), args.runs),
+                "context": measure(lambda: context_pipeline(data), args.runs),
+            }
+            for name, row in rows.items():
+                print(f"{upload:5s} {name:8s} " + "  ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Pages/sec of PDF chunking by number of extraction processes.
+
+Generates a PDF of ``--pages`` pages with PyMuPDF: a heading and a few
+paragraphs per page, plus a ruled table on every ``--table-every``-th page
+(table detection is the most expensive part of extraction). It then runs
+``vectorstore.chunking.chunk_pdf`` on it with each worker count (a fresh
+pool of ``PDF_WORKERS`` processes each), after one untimed run that
+starts the pool's processes. Every run must produce the
+same chunks as the single-process one.
+
+Speedups are bounded by the cores available (``os.cpu_count()`` is
+printed) and by the in-order chunking in the parent process.
+
+Usage: python benchmarks/bench_pdf_extract.py [--pages 400] [--workers 1,2,4,8] [--pages-per-task 16]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+import fitz
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+from vectorstore import chunking  # noqa: E402
+
+WORDS = ("retrieval index chunk vector page section table model query answer latency budget "
+         "document layout heading paragraph score citation").split()
+
+
+def paragraph(seed: int, words: int = 60) -> str:
+    text = " ".join(WORDS[(seed * 7 + i * 3) % len(WORDS)] for i in range(words))
+    return text.capitalize() + "."
+
+
+def make_pdf(path: str, pages: int, table_every: int) -> None:
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Section {number}: {WORDS[number % len(WORDS)]}", fontsize=18)
+        y = 100
+        for p in range(3):
+            rect = fitz.Rect(72, y, 540, y + 110)
+            page.insert_textbox(rect, paragraph(number * 3 + p), fontsize=10)
+            y += 120
+        if table_every and number % table_every == 0:
+            rows, cols, x0, w, h = 8, 4, 72, 117, 20
+            for r in range(rows + 1):
+                page.draw_line((x0, y + r * h), (x0 + cols * w, y + r * h))
+            for c in range(cols + 1):
+                page.draw_line((x0 + c * w, y), (x0 + c * w, y + rows * h))
+            for r in range(rows):
+                for c in range(cols):
+                    cell = "Metric" if r == 0 and c == 0 else f"r{r}c{c}"
+                    page.insert_text((x0 + c * w + 4, y + r * h + 14), cell, fontsize=9)
+        page.insert_text((300, 810), str(number), fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", default="1,2,4,8", help="comma-separated process counts")
+    parser.add_argument("--pages-per-task", type=int, default=chunking.settings.PDF_PAGES_PER_TASK)
+    parser.add_argument("--table-every", type=int, default=5)
+    args = parser.parse_args()
+    counts = [int(w) for w in args.workers.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmpdir, \
+            patch.object(chunking.settings, "PDF_PAGES_PER_TASK", args.pages_per_task):
+        path = os.path.join(tmpdir, "bench.pdf")
+        make_pdf(path, args.pages, args.table_every)
+        print(f"{args.pages} pages ({os.path.getsize(path) // 1024} KiB), {args.pages_per_task} pages per task, "
+              f"{os.cpu_count()} cores")
+        print(f"\n{'workers':>7} {'seconds':>8} {'pages/s':>8} {'speedup':>8}")
+        baseline, reference = None, None
+        for workers in counts:
+            with patch.object(chunking.settings, "PDF_WORKERS", workers):
+                chunking.chunk_pdf(path)  # start the pool
+                t0 = time.perf_counter()
+                chunks = chunking.chunk_pdf(path)
+                elapsed = time.perf_counter() - t0
+            if chunking._pool is not None:
+                chunking._pool.shutdown()
+                chunking._pool = None
+            if reference is None:
+                reference, baseline = chunks, elapsed
+            elif chunks != reference:
+                raise SystemExit(f"{workers} workers produced different chunks")
+            print(f"{workers:7} {elapsed:8.2f} {args.pages / elapsed:8.1f} {baseline / elapsed:7.2f}x")
+        print(f"\n{len(reference)} chunks, {sum(c.section is not None for c in reference)} with a section")
+
+
+if __name__ == "__main__":
+    main()
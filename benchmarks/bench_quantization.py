@@ -0,0 +1,95 @@
+"""Memory, recall and latency of the FAISS storage modes.
+
+Builds one index per mode of ``vectorstore/quantization.py`` over a
+synthetic corpus of normalized embeddings (clustered like chunks of a few
+hundred documents, with most of their variance in a few dozen directions as
+in real text embeddings), keeps the raw vectors in an embedding file as the
+store does, and queries it with perturbed copies of corpus vectors. For each mode
+it prints the serialized index size, recall@k against exact search with and
+without re-scoring from the raw vectors, and the per-query latency.
+
+Usage: python benchmarks/bench_quantization.py [--n 20000] [--dim 1536] [--queries 200] [--k 5] [--rescore 16]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+from vectorstore import quantization  # noqa: E402
+from vectorstore.embedding_file import EmbeddingFile  # noqa: E402
+
+
+def normalize(x: np.ndarray) -> np.ndarray:
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype("float32")
+
+
+def corpus(n: int, dim: int, clusters: int, rank: int = 64, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    basis = np.linalg.qr(rng.standard_normal((dim, rank)))[0].T
+    centers = rng.standard_normal((clusters, rank))
+    latent = centers[rng.integers(clusters, size=n)] + 0.7 * rng.standard_normal((n, rank))
+    return normalize(latent @ basis + 0.15 * rng.standard_normal((n, dim)) / np.sqrt(dim / rank))
+
+
+def run(mode: str, vecs, queries, exact, k: int, vectors=None):
+    t0 = time.perf_counter()
+    index = quantization.build(mode, vecs, np.arange(len(vecs)))
+    build_s = time.perf_counter() - t0
+    hits, times = 0, []
+    for q, truth in zip(queries, exact):
+        t0 = time.perf_counter()
+        found = quantization.search(index, mode, q, k, vectors)
+        times.append(time.perf_counter() - t0)
+        hits += len(truth & {i for i, _ in found})
+    return {
+        "mib": len(faiss.serialize_index(index)) / 2**20,
+        "build_s": build_s,
+        "recall": hits / (len(queries) * k),
+        "ms": 1000 * float(np.median(times)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rescore", type=int, default=quantization.settings.FAISS_RESCORE_FACTOR,
+                        help="FAISS_RESCORE_FACTOR")
+    args = parser.parse_args()
+
+    vecs = corpus(args.n, args.dim, args.clusters)
+    rng = np.random.default_rng(1)
+    picks = rng.choice(args.n, size=args.queries, replace=False)
+    queries = normalize(vecs[picks] + 0.05 * rng.standard_normal((args.queries, args.dim)))
+    exact = [set(np.argsort(-(vecs @ q))[:args.k].tolist()) for q in queries]
+    print(f"{args.n} vectors x {args.dim} dims, {args.queries} queries, recall@{args.k}, "
+          f"PQ {quantization.pq_subquantizers(args.dim)} bytes/vector, re-scoring {args.rescore}x")
+    print(f"raw float32 vectors: {vecs.nbytes / 2**20:.1f} MiB (kept on disk, memory-mapped)")
+
+    print(f"\n{'':14} {'MiB':>8} {'build s':>8} {'recall':>7} {'ms':>7}")
+    with tempfile.TemporaryDirectory() as tmpdir, \
+            patch.object(quantization.settings, "FAISS_RESCORE_FACTOR", args.rescore):
+        stored = EmbeddingFile(os.path.join(tmpdir, "bench.vecs"))
+        stored.append(0, vecs)
+        for mode in quantization.MODES:
+            settings = [(mode, None)]
+            if mode in quantization.RESCORED:
+                settings.append((f"{mode}+rescore", stored))
+            for name, vectors in settings:
+                r = run(mode, vecs, queries, exact, args.k, vectors)
+                print(f"{name:14} {r['mib']:8.1f} {r['build_s']:8.2f} {r['recall']:7.1%} {r['ms']:7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Accuracy and latency of the query router against the offline eval set.
+
+Runs ``agents.query_router`` over ``benchmarks/query_router_eval.jsonl``
+(queries labeled rag/image/web/arxiv/scholar) and prints per-route
+accuracy, the confusion matrix and per-query latency, next to the keyword
+heuristics the router replaced. The latency budget is one millisecond per
+uncached query.
+
+Usage: python benchmarks/bench_query_router.py [--runs 20]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from agents import query_router  # noqa: E402
+
+EVAL_PATH = os.path.join(os.path.dirname(__file__), "query_router_eval.jsonl")
+BUDGET_MS = 1.0
+
+_OLD_IMAGE_KEYWORDS = [
+    'image', 'picture', 'photo', 'look', 'see', 'show', 'display',
+    'what is this', 'what does this look like', 'describe this', 'similar',
+    'appears', 'contains', 'shows', 'depicts', 'represents', 'illustrates',
+]
+
+
+def load_eval(path: str = EVAL_PATH):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def keyword_route(query: str) -> str:
+    """Previous routing: image keywords, then pdf/document, then search keywords."""
+    lower = query.lower()
+    if any(k in lower for k in _OLD_IMAGE_KEYWORDS):
+        return query_router.IMAGE
+    if "pdf" in lower or "document" in lower:
+        return query_router.RAG
+    if "arxiv" in lower:
+        return query_router.ARXIV
+    if "science" in lower or "paper" in lower:
+        return query_router.SCHOLAR
+    return query_router.WEB
+
+
+def evaluate(classify, rows):
+    confusion = defaultdict(Counter)
+    for row in rows:
+        confusion[row["label"]][classify(row["query"])] += 1
+    correct = sum(confusion[label][label] for label in confusion)
+    return correct / len(rows), confusion
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    rows = load_eval()
+    labels = query_router.get_router().labels
+
+    for name, classify in [
+        ("keywords", keyword_route),
+        ("prototype router", lambda q: query_router.route(q, default=query_router.WEB).label),
+    ]:
+        accuracy, confusion = evaluate(classify, rows)
+        print(f"\n{name}: accuracy {accuracy:.1%} on {len(rows)} queries")
+        print(f"{'label':>9} " + " ".join(f"{label:>8}" for label in labels))
+        for label in labels:
+            print(f"{label:>9} " + " ".join(f"{confusion[label][p]:8d}" for p in labels))
+
+    samples = []
+    for _ in range(args.runs):
+        query_router.embed.cache_clear()
+        for row in rows:
+            t0 = time.perf_counter()
+            query_router.route(row["query"])
+            samples.append((time.perf_counter() - t0) * 1000)
+    cached = []
+    for row in rows:
+        t0 = time.perf_counter()
+        query_router.route(row["query"])
+        cached.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"\nlatency uncached: mean {statistics.mean(samples):.3f} ms, p99 {p99:.3f} ms "
+          f"(budget {BUDGET_MS} ms) {'OK' if p99 < BUDGET_MS else 'OVER BUDGET'}")
+    print(f"latency cached:   mean {statistics.mean(cached):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
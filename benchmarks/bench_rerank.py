@@ -0,0 +1,105 @@
+"""What re-ranking does to the chunks that reach the RAG prompt.
+
+Concatenates the passages of ``benchmarks/calibration_eval.jsonl`` into one
+document, splits it into overlapping chunks (the same shape of overlap the
+PDF splitter produces), indexes them in a throwaway local FAISS store and
+runs the answerable queries with re-ranking off and on. For each setting
+it prints the prompt size (characters and separate passages), how much of
+that is text repeated across chunks, how much of the answering passage the
+chunks cover, and the per-query retrieval latency.
+
+Queries are embedded offline with the hashed n-gram embedder of
+``agents.query_router``; ``--openai`` uses the production embeddings.
+Score calibration is fitted for the embedder on the same eval set first,
+as chunk relevance is judged by calibrated confidence.
+
+Usage: python benchmarks/bench_rerank.py [--openai] [--chunk 240] [--overlap 120] [--k 3] [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from bench_calibration import HashedEmbeddings, collect, fit, load_eval, local_store, NAMESPACE  # noqa: E402
+from vectorstore import calibration  # noqa: E402
+from vectorstore import faiss_store as fs  # noqa: E402
+
+
+def split(text: str, size: int, overlap: int):
+    """Overlapping ``(start, end)`` windows of ``text`` cut at spaces."""
+    spans, start = [], 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            end = text.rfind(" ", start + 1, end) if " " in text[start + 1:end] else end
+        spans.append((start, end))
+        if end == len(text):
+            break
+        nxt = max(start + 1, end - overlap)
+        start = text.find(" ", nxt) + 1 if " " in text[nxt:end] else nxt
+    return spans
+
+
+def build_document(passages):
+    doc, offsets = "", {}
+    for pid, text in passages.items():
+        offsets[pid] = (len(doc), len(doc) + len(text))
+        doc += text + " "
+    return doc.strip(), offsets
+
+
+def run(queries, spans, offsets, k: int):
+    stats = {"chars": [], "passages": [], "repeated": [], "answer_covered": [], "ms": []}
+    for row in queries:
+        t0 = time.perf_counter()
+        text = fs.search_faiss(row["query"], NAMESPACE, k)
+        stats["ms"].append((time.perf_counter() - t0) * 1000)
+        ids, _, _ = fs._search_hybrid(row["query"], NAMESPACE, k)
+        covered = set()
+        for start, end in (spans[i] for i in ids):
+            covered.update(range(start, end))
+        a_start, a_end = offsets[row["answer"]]
+        chars = len(text.replace("\n", ""))
+        stats["chars"].append(chars)
+        stats["passages"].append(text.count("\n") + 1)
+        stats["repeated"].append(max(0, chars - len(covered)) / chars)
+        stats["answer_covered"].append(len(covered & set(range(a_start, a_end))) / (a_end - a_start))
+    return {name: statistics.mean(values) for name, values in stats.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--openai", action="store_true", help="embed with the production OpenAI embeddings")
+    parser.add_argument("--chunk", type=int, default=240)
+    parser.add_argument("--overlap", type=int, default=120)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    passages, queries = load_eval()
+    embeddings = fs._init_embeddings() if args.openai else HashedEmbeddings()
+    # relevance is calibrated confidence, so calibrate for this embedder
+    with local_store(passages, embeddings):
+        calibrators = dict(calibration.DEFAULTS, **fit(collect(passages, queries)))
+    queries = [q for q in queries if q["answer"]]
+    doc, offsets = build_document(passages)
+    spans = split(doc, args.chunk, args.overlap)
+    chunks = {f"c{i}": doc[s:e] for i, (s, e) in enumerate(spans)}
+    print(f"{len(spans)} chunks of ~{args.chunk} chars ({args.overlap} overlap), "
+          f"{len(queries)} queries, k={args.k}")
+    print(f"\n{'':12} {'chars':>7} {'passages':>9} {'repeated':>9} {'answer':>7} {'ms':>7}")
+    with local_store(chunks, embeddings), patch.object(calibration, "_calibrators", calibrators):
+        for name, enabled in [("no rerank", False), ("rerank", True)]:
+            with patch.object(fs.settings, "RERANK", enabled):
+                results = [run(queries, spans, offsets, args.k) for _ in range(args.runs)]
+            r = {key: statistics.mean(res[key] for res in results) for key in results[0]}
+            print(f"{name:12} {r['chars']:7.0f} {r['passages']:9.2f} {r['repeated']:9.1%} "
+                  f"{r['answer_covered']:7.1%} {r['ms']:7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Per-request overhead of the LangGraph router in ``agents.mcp_server``.
+
+Compares the previous flow (exec every plugin file, build the StateGraph and
+compile it on each call) with the cached router: plugins loaded once,
+graph compiled once per plugin-set version, invoked via ``invoke`` and
+``ainvoke``. The route and translate nodes are replaced by no-ops so the
+numbers isolate routing overhead. A few throwaway plugins are written to a
+temp directory to exercise plugin loading.
+
+Usage: python benchmarks/bench_router.py [--plugins 5] [--runs 200]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+
+PLUGIN_TEMPLATE = '''
+def _node(state):
+    return {{"input": state["input"]}}
+
+
+def get_langgraph_node():
+    return "plugin_{i}", _node
+'''
+
+
+def _timed(fn, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def _report(name: str, samples: list) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{name:<36} mean {statistics.mean(samples):8.3f} ms   p95 {p95:8.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plugins", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    try:
+        from agents import mcp_server, plugin_loader
+    except ImportError as e:
+        raise SystemExit(f"langgraph is required for this benchmark: {e}")
+
+    plugin_dir = tempfile.mkdtemp()
+    for i in range(args.plugins):
+        with open(os.path.join(plugin_dir, f"plugin_{i}.py"), "w") as f:
+            f.write(PLUGIN_TEMPLATE.format(i=i))
+    plugin_loader.PLUGIN_DIR = plugin_dir
+    mcp_server.classify_and_route = lambda state: {"input": state["input"]}
+    mcp_server.translate_output = lambda state: {"input": state["input"]}
+    state = {"input": "hello", "lang": "en", "session_id": "bench"}
+
+    def uncached():
+        plugins = plugin_loader._exec_plugins()
+        mcp_server.build_graph(plugins).invoke(state)
+
+    def cached():
+        mcp_server.get_router().invoke(state)
+
+    async def cached_async(runs: int) -> list:
+        samples = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            await mcp_server.get_router().ainvoke(state)
+            samples.append((time.perf_counter() - t0) * 1000)
+        return samples
+
+    cached()  # first call loads plugins and compiles
+    _report("load + build + compile + invoke", _timed(uncached, args.runs))
+    _report("cached router, invoke", _timed(cached, args.runs))
+    _report("cached router, ainvoke", asyncio.run(cached_async(args.runs)))
+    _report("plugin_set() version check", _timed(plugin_loader.plugin_set, args.runs))
+
+
+if __name__ == "__main__":
+    main()
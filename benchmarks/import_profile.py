@@ -0,0 +1,54 @@
+"""Import-time profile of the API entry point.
+
+Runs ``python -X importtime -c "import app.main"`` in a fresh interpreter and
+prints the total wall time plus the modules with the largest cumulative
+import cost, which is what gates how fast ``/ping`` can answer after a
+deploy. Heavy SDKs (torch, transformers, whisper, langchain loaders, the
+Pinecone and Gemini clients) should not appear here; they are built by the
+service registry on first use or during background warm-up.
+
+Usage: python benchmarks/import_profile.py [--module app.main] [--top 25]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def profile(module: str):
+    env = dict(os.environ, ENV=os.environ.get("ENV", "dev"), WARMUP_SERVICES="none")
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return wall, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+    wall, rows = profile(args.module)
+    print(f"import {args.module}: {wall:.3f}s wall (interpreter start included)")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative, self_us, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
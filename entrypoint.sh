@@ -23,24 +23,31 @@ echo "window.RUNTIME_FASTAPI_URL=\"${NEXT_PUBLIC_FASTAPI_URL}\";" > webapp/publi
 echo "-> Using FASTAPI URL: $NEXT_PUBLIC_FASTAPI_URL (for SSR only)" >&2
 echo "-> Client requests will use /api proxy to localhost:8000" >&2
 
-# Start FastAPI with production-optimized Uvicorn settings
+# Start FastAPI with production-optimized settings. With WEB_CONCURRENCY > 1
+# gunicorn preloads the indexes once and forks workers sharing them.
 echo "Starting FastAPI with production settings..." >&2
-uvicorn app.main:app \
-  --host 0.0.0.0 \
-  --port 8000 \
-  --proxy-headers \
-  --forwarded-allow-ips="*" \
-  --timeout-keep-alive=75 \
-  --limit-concurrency=1000 \
-  --limit-max-requests=10000 \
-  --backlog=2048 \
-  --workers=1 \
-  --log-level=info &
+if [ "${WEB_CONCURRENCY:-1}" -gt 1 ]; then
+  gunicorn app.main:app -c gunicorn.conf.py &
+else
+  uvicorn app.main:app \
+    --host 0.0.0.0 \
+    --port 8000 \
+    --proxy-headers \
+    --forwarded-allow-ips="*" \
+    --timeout-keep-alive=75 \
+    --limit-concurrency=1000 \
+    --limit-max-requests=10000 \
+    --backlog=2048 \
+    --workers=1 \
+    --log-level=info &
+fi
 PID=$!
 
-# Wait for FastAPI to be fully ready with multiple health checks
+# Wait for FastAPI to be fully ready with multiple health checks.
+# /ping answers as soon as the app is imported (backends warm up in the
+# background, see /ready), so poll frequently.
 echo "Waiting for FastAPI to be ready..." >&2
-for i in {1..30}; do
+for i in {1..120}; do
   if curl -fs http://localhost:8000/ping >/dev/null 2>&1; then
     echo "✅ FastAPI started successfully on port 8000" >&2
     # Additional verification - test upload endpoint
@@ -55,10 +62,10 @@ for i in {1..30}; do
     echo "❌ FastAPI failed to start" >&2
     exit 1
   fi
-  sleep 2
+  sleep 0.5
 done
 
-if [ $i -eq 30 ]; then
+if [ $i -eq 120 ]; then
   echo "❌ FastAPI failed to become ready within 60 seconds" >&2
   exit 1
 fi
@@ -0,0 +1,84 @@
+"""Gunicorn settings for running several Uvicorn workers on one host.
+
+The app is imported once in the master (``preload_app``) and the
+read-mostly index state — the FAISS indexes and their mmapped vectors — is
+loaded there before forking, so workers share those pages copy-on-write
+instead of each holding its own copy. ``gc.freeze`` keeps the collector from
+touching (and therefore copying) the preloaded objects in the children.
+
+The torch models (CLIP, Whisper) are not fork-safe: on a GPU host loading
+them creates a CUDA context that forked workers cannot reinitialise. Each
+worker loads its own copy in the background right after the fork.
+
+Index writes are funnelled through one writer process (see
+``vectorstore/index_writer.py``); workers reload the index when it changes.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+"""
+
+import gc
+import multiprocessing
+import os
+import secrets
+
+# Must be set before the app is preloaded so every module sees it
+os.environ.setdefault("INDEX_WRITER_ADDRESS", "/tmp/autonomind-index-writer.sock")
+os.environ.setdefault("INDEX_WRITER_AUTHKEY", secrets.token_hex(16))
+# Background warm-up threads would not survive the fork; preload in when_ready
+os.environ.setdefault("WARMUP_SERVICES", "none")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+keepalive = 75
+backlog = 2048
+timeout = 300
+max_requests = 10000
+max_requests_jitter = 500
+forwarded_allow_ips = "*"
+loglevel = "info"
+
+# Services whose state is safe to share across fork (no threads, sockets or
+# CUDA contexts); SDK clients are built lazily inside each worker instead
+PRELOAD_SERVICES = ["clip_index", "laion_index", "faiss_text"]
+# torch models, warmed up in every worker after the fork
+WORKER_SERVICES = ["clip", "whisper"]
+
+_writer = None
+
+
+def when_ready(server):
+    global _writer
+    from app.services import registry
+    from vectorstore import index_writer
+
+    _writer = index_writer.start_writer_process()
+    server.log.info(f"Index writer started (pid {_writer.pid})")
+    for name in registry.warm_up_names(PRELOAD_SERVICES):
+        try:
+            registry.get(name)
+        except Exception as e:
+            server.log.warning(f"Preload of {name} failed: {e}")
+    gc.freeze()
+    server.log.info(f"Preloaded {', '.join(PRELOAD_SERVICES)}; forking {workers} workers")
+
+
+def post_fork(server, worker):
+    # Split the cores between workers instead of oversubscribing them
+    try:
+        import torch
+
+        torch.set_num_threads(max(1, multiprocessing.cpu_count() // workers))
+    except ImportError:
+        pass
+    from app.services import registry
+
+    selected = registry.warm_up_names(WORKER_SERVICES)
+    if selected:
+        registry.start_warm_up(selected)
+
+
+def on_exit(server):
+    if _writer is not None and _writer.is_alive():
+        _writer.terminate()
@@ -1,21 +1,56 @@
 # --- models/gemini_vision.py ---
 
 import os
+import json
 from io import BytesIO
 import mimetypes
 from fastapi import HTTPException
 from PIL import Image
-import google.generativeai as genai
 from app.config import Settings
+from app.services import registry
 
 # Allowed MIME types for OCR
 SUPPORTED_IMAGE_TYPES = {"image/png", "image/jpeg", "image/gif", "image/webp"}
+# Text summarization model (prompt budgets are looked up by this name)
+SUMMARY_MODEL = "gemini-1.5-flash"
+
+# Single prompt covering OCR, summary and description so one vision call suffices
+COMBINED_ANALYSIS_PROMPT = (
+    "Analyze this image and reply with a JSON object with exactly these keys:\n"
+    '"text": all visible text in the image, verbatim (empty string if none);\n'
+    '"summary": a concise summary of that text (empty string if there is no text);\n'
+    '"description": a detailed description of the objects and scene.'
+)
 
 # Load environment settings
 settings = Settings()
 
-# Configure the Gemini SDK once globally
-genai.configure(api_key=settings.GEMINI_API_KEY)
+
+def _init_gemini():
+    """Import and configure the Gemini SDK once, on first use."""
+    import google.generativeai as genai
+
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+    return genai
+
+
+registry.register("gemini", _init_gemini)
+
+
+def _genai():
+    return registry.get("gemini")
+
+
+def api_key_configured() -> bool:
+    """Whether a real (non-placeholder) Gemini API key is set."""
+    api_key = settings.GEMINI_API_KEY
+    return bool(api_key) and not api_key.lower().startswith("dummy")
+
+
+def _require_api_key() -> None:
+    if not api_key_configured():
+        raise HTTPException(status_code=503, detail="GEMINI_API_KEY not configured")
+
 
 def extract_image_text(path: str) -> str:
     """Extract visible text from an image using Gemini Pro Vision.
@@ -24,9 +59,7 @@ def extract_image_text(path: str) -> str:
     validate the path, ensure the MIME type is supported and then send the
     image bytes to Gemini for OCR.
     """
-    api_key = settings.GEMINI_API_KEY
-    if not api_key or api_key.lower().startswith("dummy"):
-        raise HTTPException(status_code=503, detail="GEMINI_API_KEY not configured")
+    _require_api_key()
 
     if not isinstance(path, str) or not os.path.exists(path):
         raise HTTPException(status_code=400, detail=f"File not found: {path}")
@@ -53,7 +86,16 @@ def extract_image_text(path: str) -> str:
 
     try:
         img = Image.open(BytesIO(image_bytes))
-        model = genai.GenerativeModel("gemini-1.5-pro")
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Gemini request failed: {e}")
+    return extract_text_from_image(img)
+
+
+def extract_text_from_image(img: Image.Image) -> str:
+    """OCR an already decoded image with Gemini Pro Vision."""
+    _require_api_key()
+    try:
+        model = _genai().GenerativeModel("gemini-1.5-pro")
         resp = model.generate_content([
             "Extract any visible text from this image.",
             img,
@@ -71,13 +113,80 @@ def describe_image(path: str) -> str:
 
     try:
         image = Image.open(path)
-        model = genai.GenerativeModel("gemini-1.5-pro")
-        response = model.generate_content(["Describe this image in detail.", image])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Exception during image description: {e}")
+    return describe_pil_image(image)
+
+
+def describe_pil_image(img: Image.Image) -> str:
+    """Describe an already decoded image with Gemini Vision."""
+    _require_api_key()
+    try:
+        model = _genai().GenerativeModel("gemini-1.5-pro")
+        response = model.generate_content(["Describe this image in detail.", img])
         return response.text
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Exception during image description: {e}")
 
 
+def load_image(image_bytes: bytes) -> Image.Image:
+    """Decode ``image_bytes`` once and validate the format is supported."""
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="Empty image data")
+    try:
+        img = Image.open(BytesIO(image_bytes))
+        img.load()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Unsupported image type")
+    return validate_image(img)
+
+
+def validate_image(img: Image.Image) -> Image.Image:
+    """Ensure an already decoded image has a format Gemini accepts."""
+    if Image.MIME.get(img.format) not in SUPPORTED_IMAGE_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported image type")
+    return img
+
+
+def _parse_json_reply(text: str) -> dict:
+    """Parse a JSON object from a model reply, tolerating markdown fences."""
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.strip("`")
+        if cleaned.lower().startswith("json"):
+            cleaned = cleaned[4:]
+    start, end = cleaned.find("{"), cleaned.rfind("}")
+    if start == -1 or end == -1:
+        raise ValueError("No JSON object in Gemini reply")
+    data = json.loads(cleaned[start:end + 1])
+    if not isinstance(data, dict):
+        raise ValueError("Gemini reply is not a JSON object")
+    return data
+
+
+def analyze_image(image: Image.Image | bytes) -> dict:
+    """OCR, summarize and describe an image in one structured Gemini call.
+
+    Returns a dict with ``text``, ``summary`` and ``description`` keys (empty
+    strings when the model has nothing to report). Raises ``HTTPException``
+    when the request fails or the reply cannot be parsed so callers can fall
+    back to the individual calls.
+    """
+    _require_api_key()
+
+    img = load_image(image) if isinstance(image, (bytes, bytearray)) else image
+    try:
+        model = _genai().GenerativeModel("gemini-1.5-pro")
+        resp = model.generate_content(
+            [COMBINED_ANALYSIS_PROMPT, img],
+            generation_config={"response_mime_type": "application/json"},
+        )
+        data = _parse_json_reply(resp.text)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Gemini combined analysis failed: {e}")
+    return {key: str(data.get(key) or "").strip() for key in ("text", "summary", "description")}
+
+
 def summarize_text_gemini(text: str, query: str = "") -> str:
     """Summarize text using Gemini Pro."""
     api_key = settings.GEMINI_API_KEY
@@ -91,7 +200,7 @@ def summarize_text_gemini(text: str, query: str = "") -> str:
             f"Summarize the following text:\n\n{text}"
         )
 
-        model = genai.GenerativeModel("gemini-1.5-flash")
+        model = _genai().GenerativeModel(SUMMARY_MODEL)
         response = model.generate_content(prompt)
 
         return response.text.strip()
@@ -1,26 +1,229 @@
 # whisper_runner.py
-import whisper
-import os
+"""Whisper transcription on in-memory audio.
 
+Audio is decoded straight into a 16 kHz float32 buffer (``wave`` for PCM
+WAV, an ffmpeg pipe for anything else), split at pauses by an energy-based
+voice activity detector into chunks of at most ``WHISPER_CHUNK_SECONDS``,
+and the chunks are transcribed on a bounded thread pool. Whisper installs
+per-call hooks on the model, so a model instance is never shared by two
+threads: each worker checks one of ``WHISPER_POOL_SIZE`` replicas out of a
+queue for the duration of a chunk.
+"""
+import io
+import logging
+import queue
+import subprocess
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple, Union
+
+import numpy as np
+from app.config import Settings
+from app.services import registry
+
+logger = logging.getLogger(__name__)
+
+settings = Settings()
+
+SAMPLE_RATE = 16000  # what Whisper expects
+FRAME_SECONDS = 0.03
+# RMS below this is silence regardless of how quiet the whole clip is
+ENERGY_FLOOR = 1e-3
+
+whisper = None  # imported on first use; pulls in torch
 model = None  # Global model reference
+_model_lock = threading.Lock()
+_pool: "queue.Queue | None" = None
+_pool_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
 
-def transcribe_audio(audio_bytes):
-    if not audio_bytes:
-        raise ValueError("Empty audio data")
-    global model
+
+def _load_model():
+    global whisper, model
     if model is None:
-        model = whisper.load_model("base")
+        with _model_lock:
+            if model is None:
+                if whisper is None:
+                    import whisper as whisper_mod
+                    whisper = whisper_mod
+                model = whisper.load_model(settings.WHISPER_MODEL)
+    return model
+
+
+def _warm_model():
+    """Load Whisper and transcribe one second of silence to allocate buffers."""
+    # checked out like any chunk, so a request arriving meanwhile waits for it
+    with _checkout() as m:
+        m.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), fp16=False)
+    return model
 
-    import tempfile
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-        tmp.write(audio_bytes)
-        path = tmp.name
 
+registry.register("whisper", _warm_model, warm_up=settings.MODEL_WARMUP, probe=lambda: model is not None)
+
+
+def _model_pool() -> queue.Queue:
+    """Queue of model replicas; the first one is the shared global ``model``."""
+    global _pool, _executor
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                size = max(1, settings.WHISPER_POOL_SIZE)
+                pool = queue.Queue()
+                pool.put(_load_model())
+                for _ in range(size - 1):
+                    pool.put(whisper.load_model(settings.WHISPER_MODEL))
+                _executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="whisper")
+                _pool = pool
+    return _pool
+
+
+@contextmanager
+def _checkout():
+    pool = _model_pool()
+    m = pool.get()
     try:
-        result = model.transcribe(path)
+        yield m
     finally:
+        pool.put(m)
+
+
+def decode_audio(data: bytes) -> np.ndarray:
+    """Decode an audio file held in memory to mono float32 at 16 kHz."""
+    if not data:
+        raise ValueError("Empty audio data")
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
         try:
-            os.remove(path)
-        except Exception:
-            pass
-    return result["text"]
+            return _decode_wav(data)
+        except (wave.Error, ValueError, EOFError):
+            pass  # compressed or unusual WAV, let ffmpeg handle it
+    return _decode_ffmpeg(data)
+
+
+def _decode_wav(data: bytes) -> np.ndarray:
+    with wave.open(io.BytesIO(data)) as w:
+        width, channels, rate = w.getsampwidth(), w.getnchannels(), w.getframerate()
+        frames = w.readframes(w.getnframes())
+    if width == 2:
+        audio = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        audio = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    elif width == 1:
+        audio = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width}")
+    if channels > 1:
+        audio = audio[: len(audio) // channels * channels].reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE and len(audio):
+        n = int(round(len(audio) * SAMPLE_RATE / rate))
+        audio = np.interp(np.linspace(0, len(audio) - 1, n), np.arange(len(audio)), audio)
+    return audio.astype(np.float32)
+
+
+def _decode_ffmpeg(data: bytes) -> np.ndarray:
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "pipe:1",
+    ]
+    try:
+        out = subprocess.run(cmd, input=data, capture_output=True, check=True).stdout
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg is required to decode non-WAV audio")
+    except subprocess.CalledProcessError as e:
+        detail = e.stderr.decode(errors="ignore").strip().splitlines()[-1:] or ["unknown error"]
+        raise ValueError(f"Failed to decode audio: {detail[0]}")
+    return np.frombuffer(out, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def split_on_silence(audio: np.ndarray, max_seconds: float = 30.0,
+                     min_silence: float = 0.3) -> List[Tuple[int, int]]:
+    """Return ``(start, end)`` sample ranges of speech, each at most ``max_seconds``.
+
+    Frames are voiced when their RMS energy clears a threshold relative to
+    the loud part of the clip. Voiced runs separated by less than
+    ``min_silence`` belong together; runs are then packed greedily into
+    chunks up to ``max_seconds``, and a run that is still too long is cut at
+    its quietest frame. Leading, trailing and long pauses are dropped.
+    """
+    frame = int(SAMPLE_RATE * FRAME_SECONDS)
+    n = len(audio) // frame
+    if n == 0:
+        return [(0, len(audio))] if len(audio) and np.abs(audio).max() > ENERGY_FLOOR else []
+    energy = np.sqrt(np.mean(audio[: n * frame].reshape(n, frame) ** 2, axis=1))
+    threshold = max(ENERGY_FLOOR, 0.1 * float(np.percentile(energy, 90)))
+    voiced = np.flatnonzero(energy > threshold)
+    if len(voiced) == 0:
+        return []
+    max_frames = max(1, int(max_seconds / FRAME_SECONDS))
+    min_gap = max(1, int(min_silence / FRAME_SECONDS))
+
+    breaks = np.flatnonzero(np.diff(voiced) > min_gap)
+    starts = np.concatenate(([voiced[0]], voiced[breaks + 1]))
+    ends = np.concatenate((voiced[breaks], [voiced[-1]])) + 1
+
+    packed = []
+    cur_start, cur_end = int(starts[0]), int(ends[0])
+    for s, e in zip(starts[1:], ends[1:]):
+        if e - cur_start <= max_frames:
+            cur_end = int(e)
+        else:
+            packed.append((cur_start, cur_end))
+            cur_start, cur_end = int(s), int(e)
+    packed.append((cur_start, cur_end))
+
+    # (start, end, start padding, end padding): chunks get a little context
+    # around pauses, but not around cuts, where it would be transcribed twice
+    spans = []
+    pad = min_gap // 2
+    for s, e in packed:
+        pad_start = pad
+        while e - s > max_frames:
+            # quietest frame in the second half, the latest one on ties
+            window = energy[s + max_frames // 2:s + max_frames][::-1]
+            cut = s + max_frames - 1 - int(np.argmin(window))
+            spans.append((s, cut, pad_start, 0))
+            s, pad_start = cut, 0
+        spans.append((s, e, pad_start, pad))
+    return [
+        (max(0, s - ps) * frame, len(audio) if e + pe >= n else (e + pe) * frame)
+        for s, e, ps, pe in spans
+    ]
+
+
+def _transcribe_chunk(chunk: np.ndarray) -> str:
+    with _checkout() as m:
+        fp16 = str(getattr(m, "device", "cpu")).startswith("cuda")
+        result = m.transcribe(chunk, fp16=fp16)
+    return result["text"].strip()
+
+
+def transcribe_chunks(audio: Union[bytes, np.ndarray]) -> Iterator[dict]:
+    """Yield ``{index, start, end, text}`` per speech chunk, in order.
+
+    All chunks are queued at once so they run in parallel on the model pool;
+    each is yielded as soon as it and every chunk before it are done.
+    """
+    if isinstance(audio, (bytes, bytearray)):
+        audio = decode_audio(bytes(audio))
+    spans = split_on_silence(audio, max_seconds=settings.WHISPER_CHUNK_SECONDS)
+    _model_pool()
+    futures = [_executor.submit(_transcribe_chunk, audio[s:e]) for s, e in spans]
+    try:
+        for i, ((s, e), fut) in enumerate(zip(spans, futures)):
+            yield {
+                "index": i,
+                "start": round(s / SAMPLE_RATE, 2),
+                "end": round(e / SAMPLE_RATE, 2),
+                "text": fut.result(),
+            }
+    finally:
+        # The consumer went away (e.g. client disconnected): drop queued chunks
+        for fut in futures:
+            fut.cancel()
+
+
+def transcribe_audio(audio_bytes):
+    if not audio_bytes:
+        raise ValueError("Empty audio data")
+    return " ".join(part["text"] for part in transcribe_chunks(audio_bytes) if part["text"])
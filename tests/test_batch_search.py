@@ -0,0 +1,175 @@
+import os
+import shutil
+import tempfile
+import types
+import unittest
+import sys
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+import faiss
+from vectorstore import quantization
+
+DIM = 16
+
+
+def _vectors(n, seed=0):
+    rng = np.random.default_rng(seed)
+    vecs = rng.standard_normal((n, DIM)).astype("float32")
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+class _Embeddings:
+    """Looks texts up in a fixed table and counts the requests."""
+
+    def __init__(self, table):
+        self.table = table
+        self.calls = []
+
+    def embed_query(self, text):
+        self.calls.append([text])
+        return self.table[text].tolist()
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [self.table[t].tolist() for t in texts]
+
+
+@unittest.skipUnless(isinstance(faiss, types.ModuleType), "faiss is stubbed by another test module")
+class TestBatchTextSearch(unittest.TestCase):
+    def setUp(self):
+        import vectorstore.faiss_store as fs
+        from vectorstore.bm25_index import BM25Index
+
+        self.fs = fs
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, "index")
+        self.vecs = _vectors(400)
+        self.texts = [f"chunk{i} {'alpha' if i % 2 else 'beta'}" for i in range(len(self.vecs))]
+        self.embeddings = _Embeddings(dict(zip(self.texts, self.vecs)))
+        self.patches = [
+            patch.object(fs, "FAISS_INDEX_PATH", path), patch.object(fs, "META_PATH", path + ".json"),
+            patch.object(fs, "VECTORS_PATH", path + ".vecs"), patch.object(fs, "_index", None),
+            patch.object(fs, "_meta", []), patch.object(fs, "_vecfile", None),
+            patch.object(fs, "_quantized", {}), patch.object(fs, "_tail", []), patch.object(fs, "_snapshot", None),
+            patch.object(fs, "_loaded_mtime", None), patch.object(fs, "_bm25", BM25Index()),
+            patch.object(fs, "embedding_model", self.embeddings),
+            patch.object(fs.settings, "FAISS_MERGE_SIZE", 1),
+            patch.object(quantization, "_rules", [("memory", "sq8")]),
+            patch.dict(quantization.TRAIN_SIZE, {"sq8": 100}),
+        ]
+        for p in self.patches:
+            p.start()
+        # flat, quantized and (after the last add) unmerged chunks
+        self._add(range(0, 150), "pdf")
+        self._add(range(150, 300), "memory")
+        with patch.object(fs.settings, "FAISS_MERGE_SIZE", 1000):
+            self._add(range(300, 400), "pdf")
+        self.assertEqual(len(fs._tail), 100)
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def _add(self, rows, namespace):
+        self.fs._apply_add(self.vecs[rows], [self.texts[i] for i in rows], namespace)
+
+    def test_batch_matches_single_queries(self):
+        rows = [3, 170, 350, 299]
+        for namespace in (None, "pdf", "memory"):
+            batch = self.fs._search_ids_batch(self.vecs[rows], namespace, k=5)
+            self.assertEqual(len(batch), len(rows))
+            for row, hits in zip(rows, batch):
+                single = self.fs._search_ids(self.vecs[row], namespace, k=5)
+                self.assertEqual([i for i, _ in hits], [i for i, _ in single])
+                np.testing.assert_allclose([s for _, s in hits], [s for _, s in single], rtol=1e-5)
+        top = [hits[0][0] for hits in self.fs._search_ids_batch(self.vecs[rows], None, k=1)]
+        self.assertEqual(top, rows)
+        self.assertEqual(self.fs._search_ids_batch(self.vecs[:0], None), [])
+
+    def test_queries_are_embedded_in_one_request(self):
+        queries = [self.texts[i] for i in (10, 200, 390)]
+        batch = self.fs.search_faiss_with_score_batch(queries, "pdf", k=2)
+        self.assertEqual(self.embeddings.calls, [queries])
+        for (text, confidence), query in zip(batch, queries):
+            single_text, single_confidence = self.fs.search_faiss_with_score(query, "pdf", k=2)
+            self.assertEqual(text, single_text)
+            self.assertAlmostEqual(confidence, single_confidence, places=5)
+        self.assertIn("chunk10 ", batch[0][0])
+        self.assertEqual(self.fs.search_faiss_batch(queries[:1], "memory", k=1),
+                         [self.fs.search_faiss(queries[0], "memory", k=1)])
+        self.assertEqual(self.fs.search_faiss_with_score_batch([]), [])
+
+    def test_fused_search_merges_phrasings(self):
+        queries = [self.texts[10], self.texts[20]]
+        with patch.object(self.fs.settings, "HYBRID_SEARCH", False):
+            text, confidence = self.fs.search_faiss_fused(queries, "pdf", k=2)
+            single = max(self.fs.search_faiss_with_score(q, "pdf", k=2)[1] for q in queries)
+        self.assertEqual(self.embeddings.calls[0], queries)
+        self.assertIn("chunk10 ", text)
+        self.assertIn("chunk20 ", text)
+        self.assertAlmostEqual(confidence, single, places=5)
+        self.assertEqual(self.fs.search_faiss_fused(queries, "nothing"), (None, 0.0))
+
+    def test_fused_confidence_is_scored_for_the_question(self):
+        # a vague question and a rewrite matching chunk 10 exactly (as a HyDE
+        # passage would): the question's own similarity sets the confidence
+        rng = np.random.default_rng(5)
+        vague = self.vecs[10] + 0.4 * rng.standard_normal(DIM).astype("float32")
+        self.embeddings.table["vague question"] = vague / np.linalg.norm(vague)
+        queries = ["vague question", self.texts[10]]
+        with patch.object(self.fs.settings, "HYBRID_SEARCH", False):
+            text, confidence = self.fs.search_faiss_fused(queries, "pdf", k=1)
+            passage = self.fs.search_faiss_with_score(self.texts[10], "pdf", k=1)[1]
+        self.assertIn("chunk10 ", text)
+        expected = self.fs.calibrate(self.fs.FAISS, float(self.embeddings.table["vague question"] @ self.vecs[10]))
+        self.assertAlmostEqual(confidence, expected, places=5)
+        self.assertLess(confidence, passage)
+
+
+@unittest.skipUnless(isinstance(faiss, types.ModuleType), "faiss is stubbed by another test module")
+class TestBatchImageSearch(unittest.TestCase):
+    def setUp(self):
+        from agents import clip_faiss
+
+        self.cf = clip_faiss
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, "clip.index")
+        model = types.SimpleNamespace(projection_dim=DIM)
+        self.patches = [
+            patch.object(clip_faiss, "INDEX_PATH", path), patch.object(clip_faiss, "META_PATH", path + ".json"),
+            patch.object(clip_faiss, "IMAGE_STORE", self.tmpdir), patch.object(clip_faiss, "_index", None),
+            patch.object(clip_faiss, "_meta", []), patch.object(clip_faiss, "_loaded_mtime", None),
+            patch.object(clip_faiss, "_load_model", lambda: (None, model)),
+            patch.object(clip_faiss.settings, "CLIP_EMBED_DIM", DIM),
+        ]
+        for p in self.patches:
+            p.start()
+        self.vecs = _vectors(20, 1)
+        for i, vec in enumerate(self.vecs):
+            path = os.path.join(self.tmpdir, f"{i}.png")
+            with open(path, "wb") as f:
+                f.write(b"png")
+            clip_faiss._apply_add(vec, path, "image" if i % 4 else "other")
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def test_batch_matches_single_vectors(self):
+        rows = [1, 2, 4, 7]
+        batch = self.cf.search_by_vectors(self.vecs[rows], "image", k=3)
+        self.assertEqual(batch, [self.cf.search_by_vector(self.vecs[r], "image", k=3) for r in rows])
+        self.assertTrue(batch[0][0]["url"].endswith("/1.png"))
+        # image 4 is in another namespace
+        self.assertFalse([hit for hit in batch[2] if hit["url"].endswith("/4.png")])
+        self.assertEqual(self.cf.search_texts([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.blob_store import ImageBlobStore
+
+
+class TestImageBlobStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = ImageBlobStore(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_content_addressed_and_sharded(self):
+        key = hashlib.sha256(b"img").hexdigest()
+        path = self.store.put(b"img", ".png")
+        self.assertEqual(path, os.path.join(self.root, key[:2], key[2:4], f"{key}.png"))
+        self.assertEqual(self.store.put(b"img", ".png"), path)
+        self.assertEqual(self.store.relpath(path), f"{key[:2]}/{key[2:4]}/{key}.png")
+
+    def test_async_put_and_put_file(self):
+        path = asyncio.run(self.store.aput(b"async", ".jpg"))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"async")
+        src = os.path.join(self.root, "source.jpg")
+        with open(src, "wb") as f:
+            f.write(b"async")
+        self.assertEqual(self.store.put_file(src), path)
+
+    def test_cleanup_by_age_and_size_keeps_other_files(self):
+        keep = os.path.join(self.root, "laion_clip.index")
+        with open(keep, "wb") as f:
+            f.write(b"x" * 100)
+        old = self.store.put(b"a" * 10, ".png")
+        mid = self.store.put(b"b" * 10, ".png")
+        new = self.store.put(b"c" * 10, ".png")
+        os.utime(old, (1, 1))
+        os.utime(mid, (2e9 - 10, 2e9 - 10))
+        os.utime(new, (2e9, 2e9))
+        stats = self.store.cleanup(max_age=365 * 86400, max_bytes=15)
+        self.assertEqual(stats, {"removed": 2, "freed_bytes": 20})
+        self.assertEqual([os.path.exists(p) for p in (old, mid, new)], [False, False, True])
+        self.assertTrue(os.path.exists(keep))
+
+
+class TestStoresAreLazy(unittest.TestCase):
+    def test_importing_does_not_create_store_directories(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        dirs = {name: os.path.join(root, name) for name in
+                ("IMAGE_STORE", "UPLOADED_IMAGES_DIR", "IMAGE_ANALYSIS_CACHE_DIR")}
+        env = {**os.environ, **dirs, "ENV": "dev"}
+        repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        subprocess.run([sys.executable, "-c", "import agents.clip_faiss, app.routes.upload"],
+                       cwd=repo, env=env, check=True, capture_output=True)
+        self.assertEqual(os.listdir(root), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
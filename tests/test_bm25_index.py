@@ -0,0 +1,77 @@
+import os
+import sys
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+from vectorstore.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+class TestBM25Index(unittest.TestCase):
+    def setUp(self):
+        self.index = BM25Index()
+        self.index.add([
+            (0, "Replace the filter cartridge XJ-9000 every six months."),
+            (1, "The warranty covers manufacturing defects for two years."),
+            (2, "Filters should be rinsed weekly; see section 4.2.1 for details."),
+        ], "pdf_s1")
+        self.index.add([(3, "XJ-9000 is also mentioned in another session.")], "pdf_s2")
+
+    def test_tokenize_keeps_identifiers_and_parts(self):
+        tokens = tokenize("Part XJ-9000, firmware v2.3.1")
+        for tok in ("xj-9000", "xj", "9000", "v2.3.1", "firmware"):
+            self.assertIn(tok, tokens)
+
+    def test_exact_identifier_ranks_first(self):
+        results = self.index.search("which cartridge is XJ-9000?", "pdf_s1")
+        self.assertEqual(results[0][0], 0)
+        self.assertGreater(results[0][2], 0.9)
+
+    def test_namespaces_are_isolated(self):
+        self.assertEqual([r[0] for r in self.index.search("XJ-9000", "pdf_s2")], [3])
+        self.assertEqual({r[0] for r in self.index.search("XJ-9000")}, {0, 3})
+        self.assertEqual(self.index.search("XJ-9000", "missing"), [])
+
+    def test_partial_match_has_lower_coverage(self):
+        full = self.index.search("warranty defects", "pdf_s1")[0]
+        partial = self.index.search("warranty refund policy", "pdf_s1")[0]
+        self.assertEqual(full[0], 1)
+        self.assertLess(partial[2], full[2])
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]])
+        self.assertEqual(fused[0], "c")
+        self.assertEqual(set(fused), {"a", "b", "c", "d"})
+        self.assertEqual(reciprocal_rank_fusion([["x", "y"]]), ["x", "y"])
+
+
+class TestHybridSearch(unittest.TestCase):
+    def test_keyword_match_fused_with_dense_results(self):
+        import vectorstore.faiss_store as fs
+
+        meta = [
+            {"text": "General maintenance overview.", "source": "pdf_s"},
+            {"text": "Order replacement part KX-42 from the service portal.", "source": "pdf_s"},
+        ]
+        bm25 = BM25Index()
+        bm25.add([(i, m["text"]) for i, m in enumerate(meta)], "pdf_s")
+        with patch.object(fs, "_index", types.SimpleNamespace(ntotal=2)), \
+                patch.object(fs, "_meta", meta), \
+                patch.object(fs, "_bm25", bm25), \
+                patch.object(fs, "_embed_query", return_value=[0.0, 0.0]), \
+                patch.object(fs, "_search_ids", MagicMock(return_value=[(0, 0.9)])), \
+                patch.object(fs, "_vectors", MagicMock(return_value=np.eye(2, dtype="float32"))):
+            text, conf = fs.search_faiss_with_score("where do I order KX-42", namespace="pdf_s", k=2)
+            self.assertIn("KX-42", text)
+            self.assertGreater(conf, 1 / (1 + 0.9))
+            with patch.object(fs.settings, "HYBRID_SEARCH", False):
+                text, _ = fs.search_faiss_with_score("where do I order KX-42", namespace="pdf_s", k=2)
+                self.assertNotIn("KX-42", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+os.environ.setdefault("ENV", "dev")
+import faiss
+from vectorstore import calibration
+
+
+class TestCalibration(unittest.TestCase):
+    def test_fit_platt_recovers_sigmoid(self):
+        rng = np.random.default_rng(0)
+        scores = rng.uniform(0.6, 1.0, 4000)
+        labels = rng.random(4000) < 1 / (1 + np.exp(-(25 * scores - 20)))
+        fitted = calibration.fit_platt(scores, labels.astype(int))
+        self.assertAlmostEqual(fitted.a, 25, delta=3)
+        self.assertAlmostEqual(-fitted.b / fitted.a, 0.8, delta=0.01)
+
+    def test_fit_platt_needs_both_classes(self):
+        with self.assertRaises(ValueError):
+            calibration.fit_platt([0.1, 0.2], [1, 1])
+
+    def test_higher_similarity_means_higher_confidence(self):
+        for retriever in (calibration.FAISS, calibration.PINECONE, calibration.KEYWORD):
+            low, high = calibration.calibrate(retriever, 0.5), calibration.calibrate(retriever, 0.95)
+            self.assertLess(low, high)
+            self.assertTrue(0.0 <= low <= high <= 1.0)
+
+    def test_calibration_file_overrides_defaults(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "calibration.json")
+            with open(path, "w") as f:
+                json.dump({"faiss": [10.0, -5.0]}, f)
+            with patch.object(calibration.settings, "CALIBRATION_PATH", path), \
+                    patch.object(calibration, "_calibrators", None):
+                self.assertAlmostEqual(calibration.calibrate("faiss", 0.5), 0.5)
+                self.assertEqual(calibration.get_calibrators()["keyword"], calibration.DEFAULTS["keyword"])
+
+    def test_pinecone_similarity_is_calibrated(self):
+        from vectorstore import pinecone_store
+
+        store = MagicMock()
+        store.similarity_search_with_score.return_value = [
+            (types.SimpleNamespace(page_content="best"), 0.9),
+            (types.SimpleNamespace(page_content="next"), 0.7),
+        ]
+        with patch.object(pinecone_store, "_vectorstore", return_value=store):
+            text, conf = pinecone_store.search_pinecone_with_score("q", k=2)
+            self.assertEqual(text, "best\nnext")
+            self.assertAlmostEqual(conf, calibration.calibrate("pinecone", 0.9))
+            self.assertEqual(pinecone_store.search_pinecone("q"), "best")
+
+
+@unittest.skipUnless(isinstance(faiss, types.ModuleType), "faiss is stubbed by another test module")
+class TestCalibrationEval(unittest.TestCase):
+    def test_calibrated_fallback_beats_legacy_on_eval_set(self):
+        import bench_calibration as bench
+
+        passages, queries = bench.load_eval()
+        with bench.local_store(passages, bench.HashedEmbeddings()):
+            records = bench.collect(passages, queries)
+        legacy = bench.decisions(records, [bench.legacy_confidence(r) for r in records], bench.LEGACY_THRESHOLD)
+        calibrated = bench.decisions(records, bench.cross_fit(records), calibration.settings.MIN_RAG_CONFIDENCE)
+        self.assertLess(calibrated["errors"], legacy["errors"])
+        self.assertLess(calibrated["brier"], legacy["brier"])
+        self.assertLessEqual(calibrated["wrong_fallback"], 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
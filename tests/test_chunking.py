@@ -0,0 +1,203 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+import faiss
+from vectorstore import chunking
+from vectorstore.chunking import HEADING, TABLE, Block
+
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+
+class TestSplitText(unittest.TestCase):
+    def test_chunks_respect_the_limit_and_boundaries(self):
+        text = "\n\n".join(f"Paragraph {i}. " + "word " * 30 for i in range(10))
+        chunks = chunking.split_text(text, max_chars=400)
+        self.assertTrue(all(len(c) <= 400 for c in chunks))
+        self.assertTrue(all(c.startswith("Paragraph") for c in chunks))
+        self.assertEqual(" ".join(" ".join(chunks).split()), " ".join(text.split()))
+
+    def test_long_words_are_cut(self):
+        self.assertEqual(chunking.split_text("x" * 25, max_chars=10), ["x" * 10, "x" * 10, "x" * 5])
+        self.assertEqual(chunking.split_text("  \n\n "), [])
+
+
+class TestChunkBlocks(unittest.TestCase):
+    def setUp(self):
+        table = "\n".join(["Year | Revenue"] + [f"{2000 + i} | {i * 10}" for i in range(30)])
+        self.blocks = [
+            Block("Introduction", 1, HEADING),
+            Block("The report covers " + "growth " * 20, 1),
+            Block("It spans two pages " + "detail " * 20, 2),
+            Block("Results", 2, HEADING),
+            Block("Quarterly figures", 2, HEADING),
+            Block(table, 3, TABLE),
+            Block("Revenue grew every year.", 4),
+        ]
+
+    def test_sections_start_chunks_and_keep_their_heading(self):
+        chunks = chunking.chunk_blocks(self.blocks, max_chars=1000)
+        self.assertEqual([c.section for c in chunks], ["Introduction", "Results"])
+        intro, results = chunks
+        self.assertTrue(intro.text.startswith("Introduction\n\nThe report covers"))
+        self.assertEqual((intro.page, intro.end_page), (1, 2))
+        self.assertTrue(results.text.startswith("Results\n\nQuarterly figures\n\nYear | Revenue"))
+        self.assertEqual((results.page, results.end_page), (2, 4))
+
+    def test_offsets_point_into_the_document_text(self):
+        doc = chunking.document_text(self.blocks)
+        for c in chunking.chunk_blocks(self.blocks, max_chars=1000):
+            self.assertEqual(doc[c.start:c.end].split(), c.text.split())
+
+    def test_split_tables_repeat_their_header(self):
+        chunks = chunking.chunk_blocks(self.blocks, max_chars=150)
+        self.assertTrue(all(len(c.text) <= 150 for c in chunks))
+        tables = [c for c in chunks if "|" in c.text]
+        self.assertGreater(len(tables), 2)
+        for c in tables:
+            self.assertIn("Year | Revenue", c.text)
+            self.assertEqual(c.section, "Results")
+        rows = [line for c in tables for line in c.text.split("\n") if line[:2] == "20"]
+        self.assertEqual(rows, [f"{2000 + i} | {i * 10}" for i in range(30)])
+
+    def test_metadata_and_citation(self):
+        chunk = chunking.chunk_blocks(self.blocks, max_chars=1000)[0]
+        meta = chunk.metadata()
+        self.assertEqual(meta["page"], 1)
+        self.assertEqual(meta["section"], "Introduction")
+        self.assertNotIn(None, meta.values())
+        self.assertEqual(chunking.cite({**meta, "doc": "report.pdf"}), "[report.pdf pp. 1-2] ")
+        self.assertEqual(chunking.cite({"page": 3, "end_page": 3}), "[p. 3] ")
+        self.assertEqual(chunking.cite({"text": "chat memory"}), "")
+
+
+@unittest.skipUnless(fitz is not None, "PyMuPDF is not installed")
+class TestPdfChunking(unittest.TestCase):
+    def test_headings_and_pages_come_from_the_layout(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "report.pdf")
+        doc = fitz.open()
+        for number, title in enumerate(("Methods", "Findings"), start=1):
+            page = doc.new_page()
+            page.insert_text((72, 72), title, fontsize=20)
+            page.insert_text((72, 120), f"Body text of the {title.lower()} section.", fontsize=11)
+            page.insert_text((300, 800), str(number), fontsize=9)
+        doc.save(path)
+        doc.close()
+
+        chunks = chunking.chunk_pdf(path)
+        self.assertEqual([(c.section, c.page) for c in chunks], [("Methods", 1), ("Findings", 2)])
+        self.assertNotIn("\n1", chunks[0].text)
+
+
+class TestPageRanges(unittest.TestCase):
+    def test_ranges_cover_every_page_once(self):
+        self.assertEqual(chunking.page_ranges(35, 16), [(1, 16), (17, 32), (33, 35)])
+        self.assertEqual(chunking.page_ranges(3, 16), [(1, 3)])
+        self.assertEqual(chunking.page_ranges(0, 16), [])
+
+
+@unittest.skipUnless(fitz is not None, "PyMuPDF is not installed")
+class TestParallelExtraction(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.path = os.path.join(tmpdir, "long.pdf")
+        doc = fitz.open()
+        for number in range(1, 10):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Chapter {number}", fontsize=20)
+            page.insert_text((72, 120), f"Text of chapter {number}, which ends here.", fontsize=11)
+        doc.save(self.path)
+        doc.close()
+
+    def tearDown(self):
+        if chunking._pool is not None:
+            chunking._pool.shutdown()
+            chunking._pool = None
+
+    def test_page_ranges_are_extracted_by_the_pool_in_order(self):
+        with patch.object(chunking.settings, "PDF_PAGES_PER_TASK", 2):
+            with patch.object(chunking.settings, "PDF_WORKERS", 1):
+                serial = chunking.chunk_pdf(self.path)
+            self.assertIsNone(chunking._pool)
+            with patch.object(chunking.settings, "PDF_WORKERS", 3):
+                parallel = chunking.chunk_pdf(self.path)
+                pool = chunking._pool
+                # a document with another number of ranges reuses the pool
+                with patch.object(chunking.settings, "PDF_PAGES_PER_TASK", 4):
+                    self.assertEqual(chunking.chunk_pdf(self.path), serial)
+        self.assertEqual(parallel, serial)
+        self.assertEqual([c.section for c in parallel], [f"Chapter {n}" for n in range(1, 10)])
+        self.assertIs(chunking._pool, pool)
+
+
+@unittest.skipUnless(isinstance(faiss, types.ModuleType), "faiss is stubbed by another test module")
+class TestFaissChunkMetadata(unittest.TestCase):
+    def setUp(self):
+        import vectorstore.faiss_store as fs
+        from vectorstore.bm25_index import BM25Index
+
+        self.fs = fs
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, "index")
+        self.patches = [
+            patch.object(fs, "FAISS_INDEX_PATH", path), patch.object(fs, "META_PATH", path + ".json"),
+            patch.object(fs, "VECTORS_PATH", path + ".vecs"), patch.object(fs, "_index", None),
+            patch.object(fs, "_meta", []), patch.object(fs, "_vecfile", None),
+            patch.object(fs, "_quantized", {}), patch.object(fs, "_tail", []), patch.object(fs, "_snapshot", None),
+            patch.object(fs, "_loaded_mtime", None), patch.object(fs, "_bm25", BM25Index()),
+            patch.object(fs, "_embed_docs", lambda texts: np.eye(len(texts), 8, dtype="float32")),
+            patch.object(fs, "_embed_query", lambda text: np.eye(1, 8, dtype="float32")[0]),
+            patch.object(fs.index_writer, "enabled", lambda: False),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def test_chunks_keep_their_pages_and_answers_cite_them(self):
+        from vectorstore.faiss_embed_and_store import ingest_chunks_to_faiss
+
+        blocks = [Block("Scope", 4, HEADING), Block("The audit covers payroll.", 4)]
+        ingest_chunks_to_faiss(chunking.chunk_blocks(blocks), "pdf", doc="audit.pdf")
+        meta = self.fs._meta[0]
+        self.assertEqual((meta["page"], meta["section"], meta["doc"], meta["source"]), (4, "Scope", "audit.pdf", "pdf"))
+        text, _ = self.fs.search_faiss_with_score("payroll", "pdf", k=1)
+        self.assertEqual(text, "[audit.pdf p. 4] Scope\n\nThe audit covers payroll.")
+
+
+class TestRagAgentUpload(unittest.TestCase):
+    def test_pdf_is_chunked_once_for_both_stores(self):
+        from agents import rag_agent
+
+        chunks = chunking.chunk_blocks([Block("Only page", 1)])
+        upload = types.SimpleNamespace(filename="notes.pdf", read=lambda: b"%PDF")
+        with patch.object(rag_agent.chunking, "chunk_pdf", return_value=chunks) as chunk_pdf, \
+                patch.object(rag_agent, "ingest_pdf_chunks_to_pinecone", side_effect=RuntimeError("down")) as pc, \
+                patch.object(rag_agent, "ingest_chunks_to_faiss") as local:
+            msg, sid = asyncio.run(rag_agent.process_file(upload, "sid"))
+        self.assertEqual(chunk_pdf.call_count, 1)
+        pc.assert_called_once_with(chunks, "pdf_sid", "notes.pdf")
+        local.assert_called_once_with(chunks, "pdf_sid", "notes.pdf")
+        self.assertEqual(sid, "sid")
+
+
+if __name__ == "__main__":
+    unittest.main()
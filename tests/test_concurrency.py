@@ -0,0 +1,261 @@
+import os
+import shutil
+import tempfile
+import threading
+import types
+import unittest
+import sys
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+import faiss
+from vectorstore import quantization
+
+WRITERS, BATCHES, BATCH = 4, 25, 8
+DIM = 16
+
+
+def _vectors(n, seed):
+    rng = np.random.default_rng(seed)
+    vecs = rng.standard_normal((n, DIM)).astype("float32")
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def _run(writers, readers=()):
+    """Run ``readers`` in a loop until every writer returned; return what they raised."""
+    errors, done = [], threading.Event()
+
+    def guard(fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:  # reported by the test
+            errors.append(e)
+
+    def loop(fn, *args):
+        while not done.is_set():
+            fn(*args)
+
+    background = [threading.Thread(target=guard, args=(loop, *r)) for r in readers]
+    foreground = [threading.Thread(target=guard, args=w) for w in writers]
+    for t in background + foreground:
+        t.start()
+    for t in foreground:
+        t.join(timeout=60)
+    done.set()
+    for t in background:
+        t.join(timeout=60)
+    return errors
+
+
+@unittest.skipUnless(isinstance(faiss, types.ModuleType), "faiss is stubbed by another test module")
+class TestConcurrentTextStore(unittest.TestCase):
+    def setUp(self):
+        import vectorstore.faiss_store as fs
+        from vectorstore.bm25_index import BM25Index
+
+        self.fs = fs
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, "index")
+        self.patches = [
+            patch.object(fs, "FAISS_INDEX_PATH", path), patch.object(fs, "META_PATH", path + ".json"),
+            patch.object(fs, "VECTORS_PATH", path + ".vecs"), patch.object(fs, "_index", None),
+            patch.object(fs, "_meta", []), patch.object(fs, "_vecfile", None),
+            patch.object(fs, "_quantized", {}), patch.object(fs, "_tail", []), patch.object(fs, "_snapshot", None),
+            patch.object(fs, "_loaded_mtime", None), patch.object(fs, "_bm25", BM25Index()),
+            patch.object(fs, "_embedder", lambda: self.fail("embedding call")),
+            patch.object(fs.settings, "FAISS_MERGE_SIZE", 40),
+            patch.object(quantization, "_rules", [("ns1", "sq8")]),
+            patch.dict(quantization.TRAIN_SIZE, {"sq8": 64}),
+        ]
+        for p in self.patches:
+            p.start()
+        self.vecs = _vectors(WRITERS * BATCHES * BATCH, 0)
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def _text(self, row):
+        return f"row{row}"
+
+    def test_concurrent_ingest_and_search(self):
+        added = []  # rows whose add returned, in completion order
+        mismatches = []
+
+        def writer(w):
+            for b in range(BATCHES):
+                rows = list(range((w * BATCHES + b) * BATCH, (w * BATCHES + b + 1) * BATCH))
+                ids = self.fs._apply_add(self.vecs[rows], [self._text(r) for r in rows], f"ns{w}")
+                self.assertEqual(len(ids), BATCH)
+                added.extend(rows)
+
+        def reader(rng):
+            if not added:
+                return
+            row = added[rng.integers(len(added))]
+            # a finished add is visible to every later search
+            text, score = self.fs._search_vec(self.vecs[row], None, k=1)[0]
+            if text != self._text(row) or score < 0.999:
+                mismatches.append((row, text, score))
+            self.fs._search_keywords(self._text(row), None, k=3)
+
+        errors = _run([(writer, w) for w in range(WRITERS)],
+                      [(reader, np.random.default_rng(s)) for s in range(4)])
+        self.assertEqual(errors, [])
+        self.assertEqual(mismatches, [])
+        total = WRITERS * BATCHES * BATCH
+        # every chunk got its own id, with its own row in the vectors file
+        self.assertEqual(len(self.fs._meta), total)
+        self.assertEqual(len(self.fs._vecfile), total)
+        by_text = {m["text"]: i for i, m in enumerate(self.fs._meta)}
+        self.assertEqual(len(by_text), total)
+        for row in range(0, total, 7):
+            np.testing.assert_allclose(self.fs._vectors([by_text[self._text(row)]]), self.vecs[[row]])
+        indexed = self.fs._index.ntotal + sum(i.ntotal for i in self.fs._quantized.values())
+        self.assertEqual(indexed + len(self.fs._tail), total)
+
+        # and the store reloads to the same state
+        self.fs._index = None
+        self.fs._load()
+        for row in range(0, total, 13):
+            self.assertEqual(self.fs._search_vec(self.vecs[row], None, k=1)[0][0], self._text(row))
+
+    def test_delete_while_searching(self):
+        for w in range(WRITERS):
+            rows = list(range(w * 100, (w + 1) * 100))
+            self.fs._apply_add(self.vecs[rows], [self._text(r) for r in rows], f"ns{w}")
+        deleted = threading.Event()
+        leaks = []
+
+        def reader():
+            was_deleted = deleted.is_set()
+            for text, _ in self.fs._search_vec(self.vecs[150], "ns1", k=5):
+                if was_deleted:
+                    leaks.append(text)
+
+        def delete():
+            self.fs.delete_namespace("ns1")
+            deleted.set()
+
+        errors = _run([(delete,), (self.fs._apply_add, self.vecs[:5], ["late"] * 5, "ns0")],
+                      [(reader,)] * 3)
+        self.assertEqual(errors, [])
+        self.assertEqual(leaks, [])
+        self.assertEqual(self.fs._search_vec(self.vecs[150], "ns1", k=5), [])
+        self.assertEqual(len(self.fs._meta), 4 * 100 + 5)
+
+
+@unittest.skipUnless(isinstance(faiss, types.ModuleType), "faiss is stubbed by another test module")
+class TestConcurrentImageStore(unittest.TestCase):
+    def setUp(self):
+        from agents import clip_faiss
+
+        self.cf = clip_faiss
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, "clip.index")
+        model = types.SimpleNamespace(projection_dim=DIM)
+        self.patches = [
+            patch.object(clip_faiss, "INDEX_PATH", path), patch.object(clip_faiss, "META_PATH", path + ".json"),
+            patch.object(clip_faiss, "IMAGE_STORE", self.tmpdir), patch.object(clip_faiss, "_index", None),
+            patch.object(clip_faiss, "_meta", []), patch.object(clip_faiss, "_loaded_mtime", None),
+            patch.object(clip_faiss, "_load_model", lambda: (None, model)),
+            patch.object(clip_faiss.settings, "CLIP_EMBED_DIM", DIM),
+        ]
+        for p in self.patches:
+            p.start()
+        self.vecs = _vectors(WRITERS * 30, 1)
+        for i in range(len(self.vecs)):
+            with open(os.path.join(self.tmpdir, f"{i}.png"), "wb") as f:
+                f.write(b"png")
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def test_concurrent_ingest_and_search(self):
+        added, mismatches = [], []
+
+        def writer(w):
+            for i in range(w * 30, (w + 1) * 30):
+                self.cf._apply_add(self.vecs[i], os.path.join(self.tmpdir, f"{i}.png"), "image")
+                added.append(i)
+
+        def reader():
+            if not added:
+                return
+            i = added[-1]
+            hits = self.cf.search_by_vector(self.vecs[i], "image", k=1)
+            if not hits or not hits[0]["url"].endswith(f"/{i}.png"):
+                mismatches.append((i, hits))
+
+        errors = _run([(writer, w) for w in range(WRITERS)], [(reader,)] * 3)
+        self.assertEqual(errors, [])
+        self.assertEqual(mismatches, [])
+        self.assertEqual(self.cf._index.ntotal + len(self.cf._tail_ids), len(self.vecs))
+        self.assertEqual(sorted(int(os.path.basename(m["path"])[:-4]) for m in self.cf._meta),
+                         list(range(len(self.vecs))))
+        ids = faiss.vector_to_array(self.cf._index.id_map).tolist() + self.cf._tail_ids.tolist()
+        self.assertEqual(sorted(ids), list(range(len(self.vecs))))
+
+    def test_opening_the_index_does_not_load_the_model(self):
+        with patch.object(self.cf, "_load_model", side_effect=AssertionError("model loaded")):
+            self.cf._load_index()
+        self.assertEqual(self.cf._index.d, DIM)
+
+    def test_adds_go_to_the_tail_until_merged(self):
+        index_path = self.cf.INDEX_PATH
+        with patch.object(self.cf.settings, "FAISS_MERGE_SIZE", 8):
+            for i in range(10):
+                self.cf._apply_add(self.vecs[i], os.path.join(self.tmpdir, f"{i}.png"), "image")
+                if i == 6:
+                    index, mtime = self.cf._index, os.stat(index_path).st_mtime_ns
+                    self.assertEqual(index.ntotal, 0)
+            # the eighth add merged the tail into a copy of the index
+            self.assertIsNot(self.cf._index, index)
+            self.assertEqual((self.cf._index.ntotal, self.cf._tail_ids.tolist()), (8, [8, 9]))
+            self.assertNotEqual(os.stat(index_path).st_mtime_ns, mtime)
+            self.cf._index = None
+            self.cf._load_index()
+        self.assertEqual((self.cf._index.ntotal, self.cf._tail_ids.tolist()), (8, [8, 9]))
+        for i in (3, 9):
+            self.assertTrue(self.cf.search_by_vector(self.vecs[i], "image", k=1)[0]["url"].endswith(f"/{i}.png"))
+        self.assertEqual(self.cf.delete_namespace("image"), 10)
+        self.assertEqual((self.cf._index.ntotal, len(self.cf._tail_ids)), (0, 0))
+        self.assertEqual(self.cf.search_by_vector(self.vecs[9], "image", k=1), [])
+
+    def test_first_laion_searches_build_the_graph_once(self):
+        index = faiss.IndexFlatIP(DIM)
+        index.add(self.vecs)
+        laion = os.path.join(self.tmpdir, "laion.index")
+        faiss.write_index(index, laion)
+        with open(laion + ".json", "w") as f:
+            f.write("[]")
+        hnsw = os.path.join(self.tmpdir, "laion.hnsw.index")
+        builds = []
+        real = faiss.IndexHNSWFlat
+
+        def counted(*args):
+            builds.append(args)
+            return real(*args)
+
+        with patch.object(self.cf, "LAION_INDEX_PATH", laion), patch.object(self.cf, "LAION_META_PATH", laion + ".json"), \
+                patch.object(self.cf, "LAION_HNSW_PATH", hnsw), patch.object(self.cf, "LAION_ANN", "hnsw"), \
+                patch.object(self.cf, "_laion_index", None), patch.object(self.cf, "_laion_meta", None), \
+                patch.object(self.cf.faiss, "IndexHNSWFlat", counted):
+            loaded = []
+            errors = _run([(lambda: loaded.append(self.cf._load_laion_index()),)] * 4)
+            self.assertEqual(errors, [])
+            self.assertEqual(len(builds), 1)
+            self.assertEqual({id(i) for i, _ in loaded}, {id(self.cf._laion_index)})
+        self.assertEqual(sorted(os.listdir(self.tmpdir)).count("laion.hnsw.index"), 1)
+        self.assertFalse([name for name in os.listdir(self.tmpdir) if name.endswith(".tmp")])
+        self.assertEqual(faiss.read_index(hnsw).ntotal, len(self.vecs))
+
+
+if __name__ == "__main__":
+    unittest.main()
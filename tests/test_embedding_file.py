@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+import types
+import unittest
+import sys
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+import faiss
+from vectorstore.embedding_file import EmbeddingFile
+
+
+class TestEmbeddingFile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "index.vecs")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_append_and_memory_map_by_id(self):
+        vf = EmbeddingFile(self.path, 3)
+        vf.append(0, np.eye(3, dtype="float32")[:2])
+        vf.append(2, np.ones((1, 3), dtype="float32"))
+        reopened = EmbeddingFile(self.path)
+        self.assertEqual((len(reopened), reopened.dim), (3, 3))
+        self.assertIsInstance(reopened.matrix(), np.memmap)
+        np.testing.assert_array_equal(reopened.get([2, 0]), [[1, 1, 1], [1, 0, 0]])
+        self.assertTrue(reopened.covers([0, 2]))
+        self.assertFalse(reopened.covers([3]))
+
+    def test_uncommitted_rows_are_overwritten(self):
+        vf = EmbeddingFile(self.path, 2)
+        vf.append(0, np.zeros((3, 2)))
+        vf.append(1, np.full((1, 2), 5.0))
+        self.assertEqual(len(vf), 2)
+        np.testing.assert_array_equal(vf.get([1]), [[5.0, 5.0]])
+        with self.assertRaises(ValueError):
+            vf.append(4, np.zeros((1, 2)))
+
+    def test_float16_storage(self):
+        vf = EmbeddingFile(self.path, 4, "float16")
+        vf.append(0, np.full((2, 4), 0.5, dtype="float32"))
+        self.assertEqual(os.path.getsize(self.path), 64 + 2 * 4 * 2)
+        reopened = EmbeddingFile(self.path, dtype="float32")
+        self.assertEqual(reopened.dtype, np.float16)
+        self.assertEqual(reopened.get([1]).dtype, np.float32)
+
+
+@unittest.skipUnless(isinstance(faiss, types.ModuleType), "faiss is stubbed by another test module")
+class TestStoreMaintenance(unittest.TestCase):
+    def setUp(self):
+        import vectorstore.faiss_store as fs
+        from vectorstore.bm25_index import BM25Index
+
+        self.fs = fs
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, "index")
+        self.patches = [
+            patch.object(fs, "FAISS_INDEX_PATH", path), patch.object(fs, "META_PATH", path + ".json"),
+            patch.object(fs, "VECTORS_PATH", path + ".vecs"), patch.object(fs, "_index", None),
+            patch.object(fs, "_meta", []), patch.object(fs, "_vecfile", None),
+            patch.object(fs, "_quantized", {}), patch.object(fs, "_tail", []), patch.object(fs, "_snapshot", None),
+            patch.object(fs, "_loaded_mtime", None), patch.object(fs, "_bm25", BM25Index()),
+            patch.object(fs, "_embedder", lambda: self.fail("embedding call")),
+            # indexed on every add, as stores were before the vectors file
+            patch.object(fs.settings, "FAISS_MERGE_SIZE", 1),
+        ]
+        for p in self.patches:
+            p.start()
+        rng = np.random.default_rng(0)
+        self.vecs = rng.standard_normal((300, 8)).astype("float32")
+        self.vecs /= np.linalg.norm(self.vecs, axis=1, keepdims=True)
+        fs._apply_add(self.vecs[:200], [f"t{i}" for i in range(200)], "ns")
+        fs._apply_add(self.vecs[200:], [f"t{i}" for i in range(200, 300)], "ns")
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def _reload(self):
+        self.fs._index = None
+        self.fs._load()
+
+    def test_vectors_are_stored_with_the_index(self):
+        self._reload()
+        np.testing.assert_allclose(self.fs._vectors([5, 250]), self.vecs[[5, 250]])
+
+    def test_rebuild_to_other_index_type_without_embedding(self):
+        from vectorstore import maintenance
+
+        maintenance.rebuild("IVF4,Flat", train_size=300)
+        self._reload()
+        self.assertIsInstance(faiss.downcast_index(self.fs._index.index), faiss.IndexIVFFlat)
+        faiss.extract_index_ivf(self.fs._index).nprobe = 4
+        self.assertEqual(self.fs._search_vec(self.vecs[42], "ns", k=1)[0][0], "t42")
+        np.testing.assert_allclose(self.fs._vectors([42]), self.vecs[[42]])
+
+    def test_backfill_and_convert(self):
+        from vectorstore import maintenance
+
+        os.remove(self.fs.VECTORS_PATH)
+        self._reload()
+        maintenance.backfill()
+        self.assertEqual(len(self.fs._vecfile), 300)
+        maintenance.convert("float16")
+        self._reload()
+        self.assertEqual(self.fs._vecfile.dtype, np.float16)
+        np.testing.assert_allclose(self.fs._vectors([7]), self.vecs[[7]], atol=1e-3)
+        # appending keeps working against the converted file
+        self.fs._apply_add(self.vecs[:1], ["again"], "ns")
+        self.assertEqual(len(self.fs._vecfile), 301)
+
+    def test_dimension_change_keeps_old_files(self):
+        self.fs._apply_add(np.ones((1, 4), dtype="float32"), ["new"], "ns")
+        self.assertEqual([m["text"] for m in self.fs._meta], ["new"])
+        self.assertTrue(os.path.exists(self.fs.VECTORS_PATH + ".dim8"))
+        self.assertEqual(EmbeddingFile(self.fs.VECTORS_PATH).dim, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,7 @@
 import os
 import sys
 import unittest
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 import types
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -52,6 +52,9 @@ mods = {
     "fitz": types.ModuleType("fitz"),
     "pinecone": types.SimpleNamespace(Pinecone=lambda *a, **k: None),
     "langchain_pinecone": types.SimpleNamespace(PineconeVectorStore=object),
+    "langgraph": types.ModuleType("langgraph"),
+    "langgraph.graph": types.SimpleNamespace(StateGraph=object),
+    "langchain_core.runnables": types.SimpleNamespace(RunnableLambda=lambda fn: fn),
 }
 for n,m in mods.items():
     sys.modules.setdefault(n,m)
@@ -59,6 +62,10 @@ for n,m in mods.items():
 from fastapi.testclient import TestClient
 from app.main import app
 import base64
+import io
+import json
+import wave
+import numpy as np
 
 client = TestClient(app)
 
@@ -96,6 +103,77 @@ class EndpointStubs(unittest.TestCase):
         self.assertIn("X-Confidence", res.headers)
         self.assertIn("X-Source", res.headers)
 
+    @patch("app.routes.chat.translate_agent.translate_stream", return_value=iter(["bonjour ", "monde"]))
+    @patch("app.routes.chat.rag_agent.handle_query", return_value=("hello world", 0.0, None))
+    def test_chat_translates_answer(self, mock_hq, mock_tr):
+        res = client.post("/chat", json={"session_id": "sid", "mode": "text", "content": "q", "lang": "fr"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.text, "bonjour monde")
+        mock_tr.assert_called_with("hello world", "fr")
+
+    @patch("app.routes.chat.translate_agent.translate_stream")
+    @patch("agents.mcp_server.aroute_with_langgraph", new_callable=AsyncMock, return_value={"input": "hola mundo"})
+    def test_chat_agent_mode_uses_the_graph(self, mock_graph, mock_tr):
+        res = client.post("/chat", json={"session_id": "sid", "mode": "agent", "content": "hello", "lang": "es"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.text.strip(), "hola mundo")
+        self.assertEqual(res.headers["X-Source"], "agent")
+        mock_graph.assert_awaited_once_with("hello", "es", "sid")
+        mock_tr.assert_not_called()  # the graph already translated
+
+    @patch("app.routes.chat._transcribe", return_value="hello")
+    @patch("app.routes.chat.rag_agent.handle_query", return_value=("ok", 0.0, None))
+    def test_chat_voice_multipart(self, mock_hq, mock_trans):
+        res = client.post(
+            "/chat",
+            data={"session_id": "sid", "lang": "en"},
+            files={"file": ("a.webm", b"\x00audio", "audio/webm")},
+        )
+        self.assertEqual(res.status_code, 200)
+        mock_trans.assert_called_with(b"\x00audio")
+        mock_hq.assert_called_with("text", "hello", "sid", "en")
+
+    @patch("app.routes.chat.rag_agent.handle_query", return_value=('{"ocr_text": "cat"}', 1.0, "ocr"))
+    def test_chat_image_raw_body(self, mock_hq):
+        res = client.post(
+            "/chat?session_id=sid",
+            content=b"\x89PNGraw",
+            headers={"Content-Type": "image/png", "X-Lang": "fr"},
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {"ocr_text": "cat"})
+        mock_hq.assert_called_with("image", b"\x89PNGraw", "sid", "fr")
+
+    @patch("agents.rag_agent.save_memory")
+    @patch("agents.rag_agent.analyze_image_content", return_value={"caption": "a cat", "method": "describe"})
+    def test_image_mode_accepts_bytes(self, mock_analyze, _):
+        import asyncio
+        from agents import rag_agent
+
+        text, conf, src = asyncio.run(rag_agent.handle_query("image", b"\x89PNGraw", "sid"))
+        self.assertEqual(json.loads(text), {"ocr_text": "a cat"})
+        self.assertEqual(src, "ocr")
+        mock_analyze.assert_called_with(image_bytes=b"\x89PNGraw")
+
+    def test_chat_raw_body_requires_session(self):
+        res = client.post("/chat", content=b"abc", headers={"Content-Type": "image/png"})
+        self.assertEqual(res.status_code, 400)
+
+    def test_chat_invalid_json_body_is_a_validation_error(self):
+        res = client.post("/chat", json={"session_id": "s"})
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual([e["loc"] for e in res.json()["detail"]], [["body", "content"]])
+
+        res = client.post("/chat", content=b"{not json", headers={"Content-Type": "application/json"})
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(res.json()["detail"][0]["type"], "json_invalid")
+
+    def test_chat_body_schema_is_documented(self):
+        body = client.get("/openapi.json").json()["paths"]["/chat"]["post"]["requestBody"]
+        schema = body["content"]["application/json"]["schema"]
+        self.assertEqual(set(schema["required"]), {"session_id", "content"})
+        self.assertIn("multipart/form-data", body["content"])
+
     @patch("agents.rag_agent.search_pinecone_with_score", return_value=("", 0.0))
     @patch("agents.clip_faiss.search_text", return_value=[])
     @patch("agents.clip_faiss._load_model", return_value=(None, types.SimpleNamespace(projection_dim=1)))
@@ -103,17 +181,123 @@ class EndpointStubs(unittest.TestCase):
         ans, conf, src = __import__("agents.rag_agent", fromlist=["query_pdf_image"]).query_pdf_image("q", session_id="s")
         self.assertIsInstance(ans, str)
 
+    def _image_upload(self):
+        """Point the upload stores at a temp dir and return an image to post."""
+        import shutil
+        import tempfile
+        from PIL import Image
+        from app.image_cache import ImageAnalysisCache
+        from app.routes import upload
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        cache = ImageAnalysisCache(os.path.join(tmpdir, "cache"), max_bytes=1 << 20)
+        blobs = upload.ImageBlobStore(os.path.join(tmpdir, "blobs"))
+        self.addCleanup(upload.registry.register, "upload_blobs", upload._init_upload_blobs, warm_up=False)
+        self.addCleanup(upload.registry.register, "image_analysis_cache", upload._init_analysis_cache, warm_up=False)
+        upload.registry.register("upload_blobs", lambda: blobs, warm_up=False)
+        upload.registry.register("image_analysis_cache", lambda: cache, warm_up=False)
+        buf = io.BytesIO()
+        Image.new("RGB", (4, 4), "red").save(buf, format="PNG")
+        return {"file": ("a.png", buf.getvalue(), "image/png")}
+
+    def test_image_analyze_caches_only_answered_searches(self):
+        from app.routes import upload
+
+        files = self._image_upload()
+        unavailable = {"results": [], "backend": None, "latency_ms": {}, "error": None}
+        answered = {"results": [], "backend": "local", "latency_ms": {"local": 1.0}, "error": None}
+
+        with patch.object(upload.clip_faiss, "encode_context", return_value=np.zeros(4, dtype="float32")), \
+                patch.object(upload, "analyze_image_content", return_value={"caption": "red", "method": "describe"}), \
+                patch.object(upload.knn_backends, "search_similar", side_effect=[unavailable, answered, answered]) as knn:
+            # no backend configured: the empty result is not cached
+            self.assertFalse(client.post("/image-analyze", files=files).json()["cached"])
+            self.assertFalse(client.post("/image-analyze", files=files).json()["cached"])
+            self.assertTrue(client.post("/image-analyze", files=files).json()["cached"])
+        self.assertEqual(knn.call_count, 2)
+
+    def test_image_routes_block_off_the_event_loop(self):
+        import asyncio
+        from app.routes import upload
+
+        files = self._image_upload()
+        on_loop = []
+
+        def blocking(result):
+            def call(*args, **kwargs):
+                try:
+                    asyncio.get_running_loop()
+                    on_loop.append(True)
+                except RuntimeError:
+                    on_loop.append(False)
+                return result
+            return call
+
+        answered = {"results": [], "backend": "local", "latency_ms": {}, "error": None}
+        with patch.object(upload.clip_faiss, "encode_context", blocking(np.zeros(4, dtype="float32"))), \
+                patch.object(upload, "analyze_image_content", blocking({"caption": "red", "method": "describe"})), \
+                patch.object(upload.knn_backends, "search_similar", blocking(answered)), \
+                patch.object(upload, "search_laion_by_image", blocking([])):
+            self.assertEqual(client.post("/image-analyze", files=files).status_code, 200)
+            self.assertEqual(client.post("/laion-search-image", files=files).json(), {"results": []})
+        self.assertEqual(on_loop, [False] * 4)
+
+    def test_translation_cache_is_not_served(self):
+        from app.main import settings
+        images = os.path.abspath(settings.IMAGE_STORE) + os.sep
+        self.assertFalse(os.path.abspath(settings.TRANSLATION_CACHE_PATH).startswith(images))
+        self.assertEqual(client.get("/images/translation_cache.sqlite3").status_code, 404)
+
+    def test_ready_reports_components(self):
+        res = client.get("/ready")
+        self.assertIn(res.status_code, (200, 503))
+        body = res.json()
+        self.assertIn("gemini", body["components"])
+        self.assertIn("openai_embeddings", body["components"])
+        self.assertEqual(body["ready"], res.status_code == 200)
+
+    @patch("models.whisper_runner._pool", None)
+    @patch("models.whisper_runner.model", None)
     @patch("models.whisper_runner.whisper")
-    @patch("models.whisper_runner.os.remove")
-    def test_transcribe_cleanup(self, mock_rm, mock_whisper):
+    @patch("tempfile.NamedTemporaryFile")
+    def test_transcribe_in_memory(self, mock_tmp, mock_whisper):
+        seen = []
         mock_whisper.load_model.return_value = type(
-            "D", (), {"transcribe": lambda self, p: {"text": "ok"}}
+            "D", (), {"transcribe": lambda self, audio, **k: seen.append(audio) or {"text": "ok"}}
         )()
         from models.whisper_runner import transcribe_audio
 
-        text = transcribe_audio(b"123")
+        text = transcribe_audio(_wav(np.full(8000, 0.5)))
         self.assertEqual(text, "ok")
-        self.assertTrue(mock_rm.called)
+        self.assertIsInstance(seen[0], np.ndarray)
+        mock_tmp.assert_not_called()
+
+    @patch("models.whisper_runner.transcribe_chunks")
+    def test_transcribe_route_streams_ndjson(self, mock_chunks):
+        mock_chunks.return_value = iter([
+            {"index": 0, "start": 0.0, "end": 1.0, "text": "hello"},
+            {"index": 1, "start": 1.5, "end": 2.0, "text": "world"},
+        ])
+        res = client.post("/transcribe?stream=true", files={"file": ("a.wav", _wav(np.zeros(160)), "audio/wav")})
+        self.assertEqual(res.status_code, 200)
+        lines = [json.loads(line) for line in res.text.splitlines()]
+        self.assertEqual([p.get("text") for p in lines], ["hello", "world", "hello world"])
+        self.assertTrue(lines[-1]["done"])
+
+    def test_transcribe_route_rejects_empty_file(self):
+        res = client.post("/transcribe", files={"file": ("a.wav", b"", "audio/wav")})
+        self.assertEqual(res.status_code, 400)
+
+
+def _wav(samples) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes((np.asarray(samples) * 32767).astype("<i2").tobytes())
+    return buf.getvalue()
 
 if __name__ == "__main__":
     unittest.main()
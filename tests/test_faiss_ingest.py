@@ -7,6 +7,8 @@ import unittest
 from unittest.mock import MagicMock
 import types
 
+import numpy as np
+
 fake_embed_mod = types.ModuleType("langchain_community.embeddings")
 
 class FakeEmbeddings:
@@ -77,16 +79,15 @@ class TestFaissIngest(unittest.TestCase):
 
     def test_search_with_score_concat_and_confidence(self):
         """search_faiss_with_score should join top k chunks and normalize score."""
-        self.fs._search_vec = MagicMock(
-            return_value=[
-                ("chunk1", 0.2),
-                ("chunk2", 0.3),
-                ("chunk3", 0.4),
-            ]
-        )
+        self.fs._meta = [{"text": f"chunk{i}", "source": "n"} for i in (1, 2, 3)]
+        self.fs._search_ids = MagicMock(return_value=[(0, 0.2), (1, 0.3), (2, 0.4)])
+        self.fs._search_keywords = MagicMock(return_value=[])
+        self.fs._embed_query = MagicMock(return_value=[0.0] * 3)
+        self.fs._vectors = MagicMock(return_value=np.eye(3, dtype="float32"))
         text, conf = self.fs.search_faiss_with_score("q", namespace="n", k=3)
         self.assertEqual(text, "chunk1\nchunk2\nchunk3")
-        self.assertAlmostEqual(conf, 1 / (1 + 0.2))
+        from vectorstore.calibration import calibrate
+        self.assertAlmostEqual(conf, calibrate("faiss", 0.2))
 
 if __name__ == "__main__":
     unittest.main()
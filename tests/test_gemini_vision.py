@@ -7,6 +7,7 @@ from PIL import Image
 import types
 import tempfile
 import importlib
+from unittest.mock import patch
 
 sys.modules["google"] = types.ModuleType("google")
 
@@ -59,5 +60,59 @@ class TestExtractImageText(unittest.TestCase):
             os.remove(bad_path)
 
 
+class JsonModel:
+    calls = 0
+
+    def __init__(self, *a, **k):
+        pass
+
+    def generate_content(self, parts, generation_config=None):
+        JsonModel.calls += 1
+        reply = '```json\n{"text": "SALE 50%", "summary": "A sale sign", "description": "A shop window"}\n```'
+        return type("R", (), {"text": reply})()
+
+
+class TestCombinedAnalysis(unittest.TestCase):
+    def create_image(self) -> bytes:
+        buf = BytesIO()
+        Image.new("RGB", (10, 10), color="blue").save(buf, format="PNG")
+        return buf.getvalue()
+
+    def test_single_call_structured_result(self):
+        JsonModel.calls = 0
+        with patch.object(genai_mod, "GenerativeModel", JsonModel):
+            result = gv.analyze_image(self.create_image())
+        self.assertEqual(JsonModel.calls, 1)
+        self.assertEqual(result, {"text": "SALE 50%", "summary": "A sale sign", "description": "A shop window"})
+
+    def test_analyze_image_content_uses_combined_call(self):
+        from app import image_rag_utils
+        JsonModel.calls = 0
+        with patch.object(genai_mod, "GenerativeModel", JsonModel):
+            result = image_rag_utils.analyze_image_content(image_bytes=self.create_image())
+        self.assertEqual(JsonModel.calls, 1)
+        self.assertEqual(result["method"], "ocr+summary")
+        self.assertEqual(result["caption"], "A sale sign")
+
+    def test_analyze_image_content_falls_back_to_cascade(self):
+        from app import image_rag_utils
+        with patch.object(gv, "analyze_image", side_effect=Exception("boom")), \
+                patch.object(gv, "extract_text_from_image", return_value=""), \
+                patch.object(gv, "describe_pil_image", return_value="a red square"):
+            result = image_rag_utils.analyze_image_content(image_bytes=self.create_image())
+        self.assertEqual(result, {"caption": "a red square", "method": "describe"})
+
+    def test_analyze_image_content_without_a_key_makes_no_calls(self):
+        from app import image_rag_utils
+        JsonModel.calls = 0
+        with patch.object(gv.settings, "GEMINI_API_KEY", "dummy-key"), \
+                patch.object(genai_mod, "GenerativeModel", JsonModel):
+            result = image_rag_utils.analyze_image_content(image_bytes=self.create_image())
+            with self.assertRaises(gv.HTTPException):
+                gv.describe_pil_image(Image.new("RGB", (4, 4)))
+        self.assertEqual(JsonModel.calls, 0)
+        self.assertEqual(result, {"caption": image_rag_utils.FALLBACK_CAPTION, "method": "none"})
+
+
 if __name__ == "__main__":
     unittest.main()
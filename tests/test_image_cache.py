@@ -0,0 +1,59 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.image_cache import ImageAnalysisCache, image_key
+
+
+class TestImageAnalysisCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_key_is_content_hash(self):
+        self.assertEqual(image_key(b"abc"), image_key(b"abc"))
+        self.assertNotEqual(image_key(b"abc"), image_key(b"abd"))
+
+    def test_roundtrip_persists_to_disk(self):
+        cache = ImageAnalysisCache(self.tmpdir, max_bytes=1 << 20)
+        entry = {"embedding": [0.1, 0.2], "caption": "cat", "caption_method": "describe", "similar_images": []}
+        cache.set("k1", entry)
+        self.assertEqual(cache.get("k1"), entry)
+        # a fresh instance only has the disk copy
+        reloaded = ImageAnalysisCache(self.tmpdir, max_bytes=1 << 20)
+        self.assertEqual(reloaded.get("k1"), entry)
+        self.assertIsNone(reloaded.get("missing"))
+
+    def test_size_based_eviction_drops_least_recent(self):
+        cache = ImageAnalysisCache(self.tmpdir, max_bytes=250)
+        payload = {"caption": "x" * 80}
+        cache.set("old", payload)
+        os.utime(os.path.join(self.tmpdir, "old.json"), (1, 1))
+        cache.set("mid", payload)
+        os.utime(os.path.join(self.tmpdir, "mid.json"), (2, 2))
+        cache.set("new", payload)
+        remaining = sorted(os.listdir(self.tmpdir))
+        self.assertEqual(remaining, ["mid.json", "new.json"])
+        self.assertIsNone(cache.get("old"))
+
+    def test_directory_is_scanned_only_past_the_limit(self):
+        cache = ImageAnalysisCache(self.tmpdir, max_bytes=1000)
+        payload = {"caption": "x" * 80}
+        with patch("app.image_cache.os.listdir", wraps=os.listdir) as listdir:
+            for i in range(10):
+                cache.set(f"k{i}", payload)
+            self.assertEqual(listdir.call_count, 1)  # the first write counts the directory
+            cache.set("k10", payload)  # past 1000 bytes: rescan and evict to 900
+            self.assertEqual(listdir.call_count, 2)
+        self.assertEqual(len(os.listdir(self.tmpdir)), 9)
+        self.assertLessEqual(sum(os.path.getsize(os.path.join(self.tmpdir, n)) for n in os.listdir(self.tmpdir)), 900)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import sys
+import unittest
+from io import BytesIO
+from unittest.mock import patch
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+from app.image_context import ImageContext
+from app.image_cache import image_key
+
+
+def _png(mode: str = "RGBA") -> bytes:
+    buf = BytesIO()
+    Image.new(mode, (8, 8)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class TestImageContext(unittest.TestCase):
+    def test_decodes_once(self):
+        ctx = ImageContext(_png())
+        ctx.image
+        ctx.rgb
+        ctx.image
+        self.assertEqual(ctx.decode_count, 1)
+        self.assertEqual(ctx.rgb.mode, "RGB")
+        self.assertEqual(ctx.image.format, "PNG")
+        self.assertEqual(ctx.sha256, image_key(ctx.data))
+
+    def test_embedding_computed_once(self):
+        from agents import clip_faiss
+        ctx = ImageContext(_png("RGB"))
+
+        class Model:
+            calls = 0
+
+            def __call__(self, img):
+                Model.calls += 1
+                return [[3.0, 4.0]]
+
+        with patch.object(clip_faiss, "_load_model", return_value=(None, Model())):
+            first = clip_faiss.encode_context(ctx)
+            second = clip_faiss.encode_context(ctx)
+        self.assertIs(first, second)
+        self.assertEqual(Model.calls, 1)
+        np.testing.assert_allclose(first, [0.6, 0.8])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
+import unittest
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+from vectorstore import index_writer
+
+
+class TestIndexWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        # outside tmpdir: the listener removes its socket at interpreter exit
+        self.address = os.path.join(tempfile.gettempdir(), f"index-writer-test-{os.getpid()}.sock")
+
+    def tearDown(self):
+        index_writer._is_writer = False
+        index_writer.settings.INDEX_WRITER_ADDRESS = ""
+        shutil.rmtree(self.tmpdir)
+
+    def test_write_atomic_replaces_without_leftovers(self):
+        path = os.path.join(self.tmpdir, "meta.json")
+
+        def write(p):
+            with open(p, "w") as f:
+                f.write("new")
+
+        index_writer.write_atomic(write, path)
+        with open(path) as f:
+            self.assertEqual(f.read(), "new")
+        self.assertEqual(os.listdir(self.tmpdir), ["meta.json"])
+
+    def test_submit_round_trip_and_errors(self):
+        calls = []
+        index_writer.register_op("test.append", lambda value: calls.append(value) or len(calls))
+        index_writer.register_op("test.fail", lambda: 1 / 0)
+        index_writer.settings.INDEX_WRITER_ADDRESS = self.address
+        index_writer.settings.INDEX_WRITER_AUTHKEY = "secret"
+        threading.Thread(target=index_writer.serve, args=(self.address, b"secret"), daemon=True).start()
+        deadline = time.monotonic() + 5
+        while not os.path.exists(self.address) and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(index_writer.submit("test.append", value="a"), 1)
+        self.assertEqual(index_writer.submit("test.append", value="b"), 2)
+        self.assertEqual(calls, ["a", "b"])
+        with self.assertRaises(RuntimeError):
+            index_writer.submit("test.fail")
+
+    def test_enabled_only_outside_writer(self):
+        self.assertFalse(index_writer.enabled())
+        index_writer.settings.INDEX_WRITER_ADDRESS = self.address
+        self.assertTrue(index_writer.enabled())
+        index_writer._is_writer = True
+        self.assertFalse(index_writer.enabled())
+
+
+@unittest.skipUnless(isinstance(faiss, types.ModuleType), "faiss is stubbed by another test module")
+class TestSharedTextIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        os.environ["FAISS_INDEX_PATH"] = os.path.join(self.tmpdir, "index")
+        import vectorstore.faiss_store as fs
+        self.fs = importlib.reload(fs)
+
+    def tearDown(self):
+        index_writer.settings.INDEX_WRITER_ADDRESS = ""
+        os.environ.pop("FAISS_INDEX_PATH", None)
+        shutil.rmtree(self.tmpdir)
+
+    def test_worker_reloads_index_written_by_writer(self):
+        vecs = np.eye(4, dtype="float32")
+        self.fs._apply_add(vecs[:2], ["a", "b"], "ns")
+
+        # A worker loads the saved index without any embedding call
+        index_writer.settings.INDEX_WRITER_ADDRESS = os.path.join(self.tmpdir, "writer.sock")
+        self.fs._index = None
+        self.fs._embedder = lambda: (_ for _ in ()).throw(AssertionError("embedded"))
+        self.assertEqual([t for t, _ in self.fs._search_vec(vecs[1], "ns", k=1)], ["b"])
+
+        # The writer replaces the files on disk; the worker picks them up
+        index = faiss.IndexIDMap(faiss.IndexFlatIP(4))
+        index.add_with_ids(vecs[:3], np.arange(3, dtype="int64"))
+        meta = [{"text": t, "source": "ns"} for t in "abc"]
+        index_writer.write_atomic(lambda p: self.fs._write_json(meta, p), self.fs.META_PATH)
+        index_writer.write_atomic(lambda p: faiss.write_index(index, p), self.fs.FAISS_INDEX_PATH)
+        self.fs._loaded_mtime = -1  # coarse filesystem timestamps
+        self.assertEqual([t for t, _ in self.fs._search_vec(vecs[2], "ns", k=1)], ["c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+from agents import knn_backends
+
+
+class FakeBackend:
+    def __init__(self, name, results=None, error=None):
+        self.name = name
+        self.results = results or []
+        self.error = error
+        self.calls = 0
+
+    def available(self):
+        return True
+
+    def search(self, vec, k):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.results[:k]
+
+
+class TestSearchSimilar(unittest.TestCase):
+    def test_prefers_first_backend(self):
+        local = FakeBackend("local", [{"url": "a", "score": 0.9}])
+        remote = FakeBackend("remote", [{"url": "b", "score": 0.8}])
+        with patch.dict(knn_backends.BACKENDS, {"local": local, "remote": remote}):
+            out = knn_backends.search_similar(np.zeros(4), k=5, order=["local", "remote"])
+        self.assertEqual(out["backend"], "local")
+        self.assertEqual(out["results"], [{"url": "a", "score": 0.9}])
+        self.assertEqual(remote.calls, 0)
+        self.assertIn("local", out["latency_ms"])
+
+    def test_falls_back_and_reports_latency(self):
+        local = FakeBackend("local", error=RuntimeError("no index"))
+        remote = FakeBackend("remote", [{"url": "b", "score": 0.8}])
+        with patch.dict(knn_backends.BACKENDS, {"local": local, "remote": remote}):
+            out = knn_backends.search_similar(np.zeros(4), k=5, order=["local", "remote"])
+        self.assertEqual(out["backend"], "remote")
+        self.assertEqual(set(out["latency_ms"]), {"local", "remote"})
+        self.assertIsNone(out["error"])
+
+    def test_remote_disabled_without_url(self):
+        backend = knn_backends.RemoteKnnBackend("", "laion5B-L-14", 15)
+        self.assertFalse(backend.available())
+
+
+class TestLocalBatching(unittest.TestCase):
+    def test_concurrent_queries_share_one_search(self):
+        backend = knn_backends.LocalLaionBackend(max_wait=0.05)
+        calls = []
+
+        def fake_search(vecs, k):
+            calls.append(vecs.shape)
+            return [[{"url": str(int(v[0])), "score": 1.0}] * k for v in vecs]
+
+        from concurrent.futures import ThreadPoolExecutor
+        with patch.object(knn_backends.clip_faiss, "search_laion_by_vectors", side_effect=fake_search), \
+                patch.object(knn_backends.clip_faiss, "_load_laion_index"):
+            with ThreadPoolExecutor(4) as ex:
+                outs = list(ex.map(lambda i: backend.search(np.full(4, i, dtype="float32"), 2), range(4)))
+        self.assertEqual([o[0]["url"] for o in outs], ["0", "1", "2", "3"])
+        self.assertTrue(all(len(o) == 2 for o in outs))
+        self.assertLess(len(calls), 4)
+
+    def test_cold_index_build_is_outside_the_timeout(self):
+        backend = knn_backends.LocalLaionBackend(timeout=0.05)
+        built = []
+
+        def slow_load():
+            if not built:
+                time.sleep(0.3)  # reading the slice and building the graph
+                built.append(1)
+
+        def fake_search(vecs, k):
+            knn_backends.clip_faiss._load_laion_index()
+            return [[{"url": "a", "score": 1.0}]] * len(vecs)
+
+        with patch.object(knn_backends.clip_faiss, "_load_laion_index", side_effect=slow_load), \
+                patch.object(knn_backends.clip_faiss, "search_laion_by_vectors", side_effect=fake_search):
+            self.assertEqual(backend.search(np.zeros(4, dtype="float32"), 1), [{"url": "a", "score": 1.0}])
+
+
+if __name__ == "__main__":
+    unittest.main()
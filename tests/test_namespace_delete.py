@@ -0,0 +1,208 @@
+import os
+import shutil
+import tempfile
+import types
+import unittest
+import sys
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+import faiss
+from vectorstore import quantization
+
+
+@unittest.skipUnless(isinstance(faiss, types.ModuleType), "faiss is stubbed by another test module")
+class TestNamespaceDelete(unittest.TestCase):
+    def setUp(self):
+        import vectorstore.faiss_store as fs
+        from vectorstore.bm25_index import BM25Index
+
+        self.fs = fs
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, "index")
+        self.patches = [
+            patch.object(fs, "FAISS_INDEX_PATH", path), patch.object(fs, "META_PATH", path + ".json"),
+            patch.object(fs, "VECTORS_PATH", path + ".vecs"), patch.object(fs, "_index", None),
+            patch.object(fs, "_meta", []), patch.object(fs, "_vecfile", None),
+            patch.object(fs, "_quantized", {}), patch.object(fs, "_tail", []), patch.object(fs, "_snapshot", None),
+            patch.object(fs, "_loaded_mtime", None), patch.object(fs, "_bm25", BM25Index()),
+            patch.object(fs, "_embedder", lambda: self.fail("embedding call")),
+            patch.object(fs.settings, "FAISS_MERGE_SIZE", 1),
+            patch.object(quantization, "_rules", [("memory_*", "sq8")]),
+        ]
+        for p in self.patches:
+            p.start()
+        rng = np.random.default_rng(0)
+        self.vecs = rng.standard_normal((600, 16)).astype("float32")
+        self.vecs /= np.linalg.norm(self.vecs, axis=1, keepdims=True)
+        # interleaved uploads: pdf_a spans two id ranges
+        self._add(range(0, 100), "pdf_a")
+        self._add(range(100, 200), "pdf_b")
+        self._add(range(200, 300), "pdf_a")
+        self._add(range(300, 600), "memory_a")
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def _add(self, rows, namespace):
+        self.fs._apply_add(self.vecs[rows], [f"{namespace} chunk{i}" for i in rows], namespace)
+
+    def _reload(self):
+        self.fs._index = None
+        self.fs._load()
+
+    def _top(self, row, namespace=None):
+        return self.fs._search_vec(self.vecs[row], namespace, k=1)[0][0]
+
+    def test_delete_removes_every_range_of_the_namespace(self):
+        self.assertEqual(self.fs._namespace_ranges("pdf_a"), [(0, 100), (200, 300)])
+        self.assertEqual(self.fs.delete_namespace("pdf_a"), 200)
+        self.assertEqual(self.fs._index.ntotal, 100)
+        self.assertEqual(self.fs._search_vec(self.vecs[50], "pdf_a", k=3), [])
+        texts = [t for t, _ in self.fs._search_vec(self.vecs[50], None, k=50)]
+        self.assertFalse([t for t in texts if t.startswith("pdf_a")])
+        self.assertEqual(self.fs._search_keywords("chunk250", None, k=5), [])
+        self.assertEqual(self.fs._meta[250], {"deleted": True})
+        self._reload()
+        self.assertEqual(self.fs._index.ntotal, 100)
+        self.assertEqual(self._top(150), "pdf_b chunk150")
+        self.assertEqual(self.fs.delete_namespace("pdf_a"), 0)
+
+    def test_delete_quantized_and_pending_namespaces(self):
+        self.assertEqual(self.fs._quantized["sq8"].ntotal, 300)
+        self.assertEqual(self.fs.delete_namespace("memory_a"), 300)
+        self.assertEqual(self.fs._quantized["sq8"].ntotal, 0)
+        self.assertEqual(self._top(400)[:3], "pdf")
+        with patch.object(quantization, "_rules", [("memory_*", "pq")]):
+            self._add(range(0, 10), "memory_b")
+            self.assertEqual(self.fs._tail, list(range(600, 610)))
+            self.fs.delete_namespace("memory_b")
+        self.assertEqual(self.fs._tail, [])
+
+    def test_delete_before_keeps_newer_chunks(self):
+        for m in self.fs._meta[:100]:
+            m["ts"] -= 600
+        evicted_at = self.fs._meta[0]["ts"] + 1
+        self.assertEqual(self.fs.delete_namespace("pdf_a", before=evicted_at), 100)
+        self.assertEqual(self.fs._meta[50], {"deleted": True})
+        self.assertEqual(self._top(250, "pdf_a"), "pdf_a chunk250")
+        self.assertEqual([i for i, _ in self.fs._search_keywords("chunk250", "pdf_a", k=5)], [250])
+
+    def test_expire_only_stale_namespaces(self):
+        for m in self.fs._meta:
+            if m["source"] == "pdf_b":
+                m["ts"] -= 7200
+        removed = self.fs.expire_namespaces(3600, ["pdf_*"])
+        self.assertEqual(removed, {"pdf_b": 100})
+        self.assertEqual(self.fs.expire_namespaces(0, ["nothing_*"]), {})
+
+    def test_compact_renumbers_and_reclaims_space(self):
+        from vectorstore import maintenance
+
+        self.fs.delete_namespace("pdf_a")
+        size = os.path.getsize(self.fs.VECTORS_PATH)
+        self.assertGreater(maintenance.compact_text(), 0)
+        self.assertLess(os.path.getsize(self.fs.VECTORS_PATH), size)
+        self._reload()
+        self.assertEqual(len(self.fs._meta), 400)
+        self.assertEqual(self.fs._index.ntotal + self.fs._quantized["sq8"].ntotal, 400)
+        self.assertEqual(self._top(150), "pdf_b chunk150")
+        self.assertEqual(self._top(450, "memory_a"), "memory_a chunk450")
+        np.testing.assert_allclose(self.fs._vectors([0]), self.vecs[[100]])
+        # new chunks continue after the compacted ids
+        self._add(range(0, 1), "pdf_c")
+        self.assertEqual(self.fs._namespace_ranges("pdf_c"), [(400, 401)])
+
+    def test_compact_rebuilds_index_types_without_removal(self):
+        from vectorstore import maintenance
+
+        maintenance.rebuild("HNSW8")
+        self._reload()
+        self.fs.delete_namespace("pdf_b")
+        # HNSW keeps the vectors, searches skip them
+        self.assertEqual(self.fs._index.ntotal, 300)
+        self.assertEqual(self._top(150)[:5], "pdf_a")
+        with self.assertRaises(SystemExit):
+            maintenance.compact_text()
+        self._reload()
+        maintenance.compact_text("HNSW8")
+        self._reload()
+        self.assertEqual(self.fs._index.ntotal, 200)
+        self.assertEqual(self._top(250), "pdf_a chunk250")
+
+    def test_compact_image_index(self):
+        from agents import clip_faiss
+        from vectorstore import maintenance
+
+        path = os.path.join(self.tmpdir, "clip.index")
+        index = faiss.IndexIDMap(faiss.IndexFlatIP(16))
+        # image 1 was deleted
+        index.add_with_ids(self.vecs[[0, 2]], np.array([0, 2], dtype="int64"))
+        faiss.write_index(index, path)
+        meta = [{"path": "a.png", "namespace": "image"}, {"deleted": True}, {"path": "c.png", "namespace": "image"},
+                {"path": "d.png", "namespace": "image"}]
+        self.fs._write_json(meta, path + ".json")
+        # image 3 is not merged yet
+        with open(path + ".tail.npz", "wb") as f:
+            np.savez(f, ids=np.array([3], dtype="int64"), vecs=self.vecs[3:4])
+        with patch.object(clip_faiss, "INDEX_PATH", path), patch.object(clip_faiss, "META_PATH", path + ".json"):
+            self.assertGreater(maintenance.compact_images(), 0)
+        compacted = faiss.read_index(path)
+        self.assertEqual(faiss.vector_to_array(compacted.id_map).tolist(), [0, 1, 2])
+        self.assertEqual(compacted.search(self.vecs[2:3], 1)[1][0][0], 1)
+        self.assertEqual(compacted.search(self.vecs[3:4], 1)[1][0][0], 2)
+        self.assertFalse(os.path.exists(path + ".tail.npz"))
+
+
+class TestSessionEviction(unittest.TestCase):
+    def test_expired_and_pushed_out_sessions_are_reported(self):
+        from agents.rag_agent import SessionCache
+
+        evicted, now = [], [0.0]
+        cache = SessionCache(maxsize=2, ttl=10, on_evict=evicted.append, timer=lambda: now[0])
+        cache["a"] = cache["b"] = {}
+        cache["c"] = {}
+        self.assertEqual(evicted, ["a"])
+        cache["c"] = {"text": "updated"}
+        self.assertEqual(evicted, ["a"])
+        now[0] = 11
+        self.assertNotIn("b", cache)
+        cache.expire()
+        self.assertEqual(sorted(evicted), ["a", "b", "c"])
+
+    def test_eviction_deletes_session_namespaces(self):
+        from agents import rag_agent
+
+        rag_agent.memory_cache["s1"].append("Q:x")
+        with patch.object(rag_agent.faiss_store, "delete_namespace") as delete:
+            rag_agent._drop_session_data("s1", 100.0)
+        self.assertEqual([c.args[0] for c in delete.call_args_list], ["pdf_s1", "memory_s1"])
+        self.assertEqual({c.kwargs["before"] for c in delete.call_args_list}, {100.0})
+        self.assertNotIn("s1", rag_agent.memory_cache)
+
+    def test_expired_session_set_again_keeps_its_data(self):
+        from agents import rag_agent
+
+        evicted, now = [], [0.0]
+        cache = rag_agent.SessionCache(maxsize=4, ttl=10, on_evict=evicted.append, timer=lambda: now[0])
+        cache["s1"] = cache["s2"] = {}
+        now[0] = 11
+        # e.g. process_file storing the session after ingesting a new upload
+        cache["s1"] = {"last_upload_type": "pdf"}
+        self.assertEqual(evicted, ["s2"])
+        self.assertIn("s1", cache)
+
+        # recreated by another request before the background delete runs
+        with patch.object(rag_agent, "session_store", cache), \
+                patch.object(rag_agent.faiss_store, "delete_namespace") as delete:
+            rag_agent._drop_session_data("s1", 11.0)
+        delete.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from agents import plugin_loader
+
+
+class TestPluginLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.patches = [
+            patch.object(plugin_loader, "PLUGIN_DIR", self.tmpdir),
+            patch.object(plugin_loader, "PLUGIN_RELOAD_INTERVAL", 0),
+            patch.object(plugin_loader, "_version", None),
+            patch.object(plugin_loader, "_plugins", []),
+        ]
+        for p in self.patches:
+            p.start()
+        self._write("alpha.py", "VALUE = 1\n")
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, name, source):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "w") as f:
+            f.write(source)
+        # make the change visible even with coarse mtimes
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    def test_plugins_loaded_once_until_files_change(self):
+        with patch.object(plugin_loader, "_exec_plugins", wraps=plugin_loader._exec_plugins) as execs:
+            version, plugins = plugin_loader.plugin_set()
+            self.assertEqual([p.VALUE for p in plugins], [1])
+            self.assertEqual(plugin_loader.plugin_set()[0], version)
+            plugin_loader.load_plugins()
+            self.assertEqual(execs.call_count, 1)
+
+            self._write("alpha.py", "VALUE = 22\n")
+            new_version, plugins = plugin_loader.plugin_set()
+            self.assertNotEqual(new_version, version)
+            self.assertEqual([p.VALUE for p in plugins], [22])
+
+            self._write("beta.py", "VALUE = 3\n")
+            self.assertEqual(len(plugin_loader.load_plugins()), 2)
+            self.assertEqual(execs.call_count, 3)
+
+    def test_check_interval_skips_rescans(self):
+        plugin_loader.plugin_set()
+        with patch.object(plugin_loader, "PLUGIN_RELOAD_INTERVAL", 3600), \
+                patch.object(plugin_loader, "_signature") as sig:
+            plugin_loader.load_plugins()
+            sig.assert_not_called()
+
+
+class FakeGraph:
+    """StateGraph stand-in whose compile() is counted."""
+    compiles = 0
+
+    def __init__(self, state):
+        self.nodes = []
+
+    def add_node(self, name, fn):
+        self.nodes.append(name)
+
+    def add_edge(self, start, end):
+        pass
+
+    def set_entry_point(self, name):
+        pass
+
+    def set_finish_point(self, name):
+        pass
+
+    def compile(self):
+        FakeGraph.compiles += 1
+        nodes = list(self.nodes)
+
+        async def ainvoke(state):
+            return {"input": state["input"], "nodes": nodes}
+        return types.SimpleNamespace(invoke=lambda state: {"input": state["input"], "nodes": nodes}, ainvoke=ainvoke)
+
+
+class TestCompiledRouter(unittest.TestCase):
+    _write = TestPluginLoader._write
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        os.environ.setdefault("ENV", "dev")
+        # langgraph is only needed to build the real graph, which is replaced here
+        sys.modules.setdefault("langgraph", types.ModuleType("langgraph"))
+        sys.modules.setdefault("langgraph.graph", types.SimpleNamespace(StateGraph=FakeGraph))
+        sys.modules.setdefault("langchain_core.runnables", types.SimpleNamespace(RunnableLambda=lambda fn: fn))
+        from agents import mcp_server
+
+        self.mcp_server = mcp_server
+        FakeGraph.compiles = 0
+        for p in (patch.object(mcp_server, "StateGraph", FakeGraph), patch.object(mcp_server, "_compiled", None),
+                  patch.object(mcp_server, "_compiled_version", None),
+                  patch.object(plugin_loader, "PLUGIN_DIR", self.tmpdir),
+                  patch.object(plugin_loader, "PLUGIN_RELOAD_INTERVAL", 0),
+                  patch.object(plugin_loader, "_version", None), patch.object(plugin_loader, "_plugins", [])):
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_graph_compiled_once_per_plugin_set(self):
+        self._write("alpha.py", "def get_langgraph_node():\n    return 'alpha', lambda state: state\n")
+        first = self.mcp_server.route_with_langgraph("hi")
+        again = asyncio.run(self.mcp_server.aroute_with_langgraph("hi"))
+        self.assertEqual(FakeGraph.compiles, 1)
+        self.assertEqual(first["nodes"], ["route", "translate", "alpha"])
+        self.assertEqual(again, first)
+
+        self._write("beta.py", "def get_langgraph_node():\n    return 'beta', lambda state: state\n")
+        changed = self.mcp_server.route_with_langgraph("hi")
+        self.assertEqual(FakeGraph.compiles, 2)
+        self.assertEqual(changed["nodes"], ["route", "translate", "alpha", "beta"])
+
+
+if __name__ == "__main__":
+    unittest.main()
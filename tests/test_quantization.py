@@ -0,0 +1,162 @@
+import os
+import shutil
+import tempfile
+import types
+import unittest
+import sys
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+import faiss
+from vectorstore import quantization
+from vectorstore.embedding_file import EmbeddingFile
+
+
+def _corpus(n, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    vecs = rng.standard_normal((n, dim)).astype("float32")
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+class TestRules(unittest.TestCase):
+    def test_first_matching_pattern_wins(self):
+        rules = quantization.parse_rules("memory_*:sq8, pdf_*:PQ,*:fp16")
+        self.assertEqual(rules, [("memory_*", "sq8"), ("pdf_*", "pq"), ("*", "fp16")])
+        with patch.object(quantization, "_rules", rules[:2]):
+            self.assertEqual(quantization.mode_for("memory_42"), "sq8")
+            self.assertEqual(quantization.mode_for("pdf_report"), "pq")
+            self.assertEqual(quantization.mode_for(None), "flat")
+
+    def test_invalid_rules(self):
+        for spec in ("pdf_*", "pdf_*:int4", ":sq8"):
+            with self.assertRaises(ValueError):
+                quantization.parse_rules(spec)
+
+    def test_pq_code_size_divides_dimension(self):
+        self.assertEqual(quantization.pq_subquantizers(1536), 96)
+        with patch.object(quantization.settings, "FAISS_PQ_M", 100):
+            self.assertEqual(quantization.pq_subquantizers(1536), 96)
+            self.assertEqual(quantization.pq_subquantizers(8), 8)
+
+
+@unittest.skipUnless(isinstance(faiss, types.ModuleType), "faiss is stubbed by another test module")
+class TestModes(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.vecs = _corpus(2000, 32)
+        cls.ids = np.arange(1000, 3000)
+        cls.stored = EmbeddingFile(os.path.join(cls.tmpdir, "x.vecs"))
+        cls.stored.append(0, np.vstack([np.zeros((1000, 32), "float32"), cls.vecs]))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def _recall(self, mode, vectors=None, k=10):
+        index = quantization.build(mode, self.vecs, self.ids)
+        hits = 0
+        for q in range(0, 200, 10):
+            exact = set(self.ids[np.argsort(-(self.vecs @ self.vecs[q]))[:k]].tolist())
+            found = quantization.search(index, mode, self.vecs[q], k, vectors)
+            self.assertEqual(len(found), k)
+            hits += len(exact & {i for i, _ in found})
+        return hits / (20 * k)
+
+    def test_every_mode_maps_external_ids(self):
+        for mode in quantization.MODES:
+            index = quantization.build(mode, self.vecs, self.ids)
+            self.assertEqual(index.ntotal, 2000)
+            self.assertEqual(quantization.search(index, mode, self.vecs[7], 1, self.stored)[0][0], 1007)
+
+    def test_rescoring_restores_exact_scores(self):
+        index = quantization.build(quantization.PQ, self.vecs, self.ids)
+        (idx, score), = quantization.search(index, quantization.PQ, self.vecs[3], 1, self.stored)
+        self.assertAlmostEqual(score, float(self.vecs[idx - 1000] @ self.vecs[3]), places=5)
+        self.assertGreater(self._recall(quantization.PQ, self.stored), self._recall(quantization.PQ))
+
+    def test_lossy_modes_stay_close_to_exact(self):
+        self.assertEqual(self._recall(quantization.FLAT), 1.0)
+        self.assertGreaterEqual(self._recall(quantization.FP16), 0.99)
+        self.assertGreaterEqual(self._recall(quantization.SQ8, self.stored), 0.95)
+
+
+@unittest.skipUnless(isinstance(faiss, types.ModuleType), "faiss is stubbed by another test module")
+class TestQuantizedNamespaces(unittest.TestCase):
+    def setUp(self):
+        import vectorstore.faiss_store as fs
+        from vectorstore.bm25_index import BM25Index
+
+        self.fs = fs
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, "index")
+        self.patches = [
+            patch.object(fs, "FAISS_INDEX_PATH", path), patch.object(fs, "META_PATH", path + ".json"),
+            patch.object(fs, "VECTORS_PATH", path + ".vecs"), patch.object(fs, "_index", None),
+            patch.object(fs, "_meta", []), patch.object(fs, "_vecfile", None),
+            patch.object(fs, "_quantized", {}), patch.object(fs, "_tail", []), patch.object(fs, "_snapshot", None),
+            patch.object(fs, "_loaded_mtime", None), patch.object(fs, "_bm25", BM25Index()),
+            patch.object(fs, "_embedder", lambda: self.fail("embedding call")),
+            patch.object(fs.settings, "FAISS_MERGE_SIZE", 1),
+            patch.object(quantization, "_rules", [("pdf_*", "pq")]),
+            patch.dict(quantization.TRAIN_SIZE, {"pq": 300}),
+        ]
+        for p in self.patches:
+            p.start()
+        self.vecs = _corpus(500, 16)
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def _add(self, rows, namespace):
+        self.fs._apply_add(self.vecs[rows], [f"{namespace}{i}" for i in rows], namespace)
+
+    def _reload(self):
+        self.fs._index = None
+        self.fs._load()
+
+    def test_namespace_is_searched_exactly_until_trained(self):
+        self._add(range(0, 100), "chat")
+        self._add(range(100, 200), "pdf_a")
+        self.assertEqual(self.fs._tail, list(range(100, 200)))
+        self.assertEqual(self.fs._index.ntotal, 100)
+        self.assertEqual(self.fs._search_vec(self.vecs[150], "pdf_a", k=1)[0][0], "pdf_a150")
+        self.assertEqual(self.fs._search_vec(self.vecs[150], "chat", k=1)[0][0][:4], "chat")
+
+        self._add(range(200, 400), "pdf_b")
+        self.assertEqual(self.fs._tail, [])
+        self.assertEqual(self.fs._quantized["pq"].ntotal, 300)
+        self.assertEqual(self.fs._search_vec(self.vecs[250], "pdf_b", k=1)[0][0], "pdf_b250")
+        self.assertEqual(self.fs._meta[250]["mode"], "pq")
+        self.assertNotIn("mode", self.fs._meta[0])
+
+    def test_quantized_index_is_saved_and_reloaded(self):
+        self._add(range(0, 100), "chat")
+        self._add(range(100, 450), "pdf_a")
+        self._add(range(450, 500), "pdf_a")
+        self._reload()
+        self.assertEqual(self.fs._quantized["pq"].ntotal, 400)
+        self.assertEqual(self.fs._search_vec(self.vecs[480], "pdf_a", k=1)[0][0], "pdf_a480")
+        self.assertEqual(self.fs._search_vec(self.vecs[20], None, k=1)[0][0], "chat20")
+
+    def test_maintenance_moves_namespace_between_modes(self):
+        from vectorstore import maintenance
+
+        self._add(range(0, 400), "chat")
+        with patch.object(quantization, "_rules", []):
+            self._add(range(400, 500), "pdf_a")
+        maintenance.quantize("chat", "sq8")
+        self._reload()
+        self.assertEqual(self.fs._index.ntotal, 100)
+        self.assertEqual(self.fs._quantized["sq8"].ntotal, 400)
+        self.assertEqual(self.fs._search_vec(self.vecs[42], "chat", k=1)[0][0], "chat42")
+        self.assertEqual(self.fs._search_vec(self.vecs[442], None, k=1)[0][0], "pdf_a442")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+from agents import query_expansion
+
+
+class FakeLLM:
+    def __init__(self, reply, delay=0.0):
+        self.reply, self.delay = reply, delay
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        time.sleep(self.delay)
+        return SimpleNamespace(content=self.reply)
+
+
+class TestQueryExpansion(unittest.TestCase):
+    def setUp(self):
+        self.llm = FakeLLM("1. refund policy for orders\n2) How do I get my money back?\n- return an item\n\n* return an item")
+        self.patches = [
+            patch.object(query_expansion.registry, "get", lambda name: self.llm),
+            patch.object(query_expansion.settings, "QUERY_EXPANSION", query_expansion.MULTI),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+
+    def test_rewrites_are_parsed_from_one_reply(self):
+        rewrites = query_expansion.expand("how do I get my money back?", n=3)
+        self.assertEqual(rewrites, ["refund policy for orders", "return an item"])
+        self.assertEqual(len(self.llm.prompts), 1)
+        self.assertIn("3 different ways", self.llm.prompts[0])
+        self.llm.reply = "  Refunds are issued within 14 days.\nContact support.  "
+        self.assertEqual(query_expansion.expand("q", mode=query_expansion.HYDE),
+                         ["Refunds are issued within 14 days.\nContact support."])
+
+    def test_namespaces_are_searched_in_parallel_and_best_wins(self):
+        calls, started = [], threading.Barrier(2, timeout=5)
+
+        def fused(queries, namespace, k):
+            calls.append((queries, namespace))
+            started.wait()  # both namespaces are in flight at once
+            return (f"from {namespace}", 0.8 if namespace == "memory_s" else 0.6)
+
+        with patch.object(query_expansion.faiss_store, "search_faiss_fused", side_effect=fused):
+            best = query_expansion.search("money back?", [("pdf", "pdf_s"), ("memory", "memory_s")])
+        self.assertEqual(best, ("from memory_s", 0.8, "memory"))
+        self.assertEqual(calls[0][0], ["money back?", "refund policy for orders", "How do I get my money back?",
+                                       "return an item"])
+
+    def test_budget_bounds_the_whole_attempt(self):
+        self.llm.delay = 0.5
+        with patch.object(query_expansion.faiss_store, "search_faiss_fused") as fused:
+            t0 = time.monotonic()
+            self.assertIsNone(query_expansion.search("q", [("pdf", "pdf_s")], budget=0.1))
+            self.assertLess(time.monotonic() - t0, 0.4)
+        fused.assert_not_called()
+
+        self.llm.delay = 0.0
+
+        def slow(queries, namespace, k):
+            time.sleep(0.5)
+            return "late", 0.9
+
+        with patch.object(query_expansion.faiss_store, "search_faiss_fused", side_effect=slow):
+            self.assertIsNone(query_expansion.search("q", [("pdf", "pdf_s")], budget=0.1))
+
+    def test_abandoned_work_does_not_delay_later_requests(self):
+        self.llm.delay = 0.5
+        for _ in range(6):
+            self.assertIsNone(query_expansion.search("q", [("pdf", "pdf_s")], budget=0.02))
+        self.llm.delay = 0.0
+        with patch.object(query_expansion.faiss_store, "search_faiss_fused", return_value=("found", 0.7)):
+            self.assertEqual(query_expansion.search("q", [("pdf", "pdf_s")], budget=0.3), ("found", 0.7, "pdf"))
+
+    def test_failures_fall_back_quietly(self):
+        self.llm.invoke = lambda prompt: (_ for _ in ()).throw(RuntimeError("rate limited"))
+        self.assertIsNone(query_expansion.search("q", [("pdf", "pdf_s")]))
+
+
+class TestRagAgentExpansion(unittest.TestCase):
+    def test_low_confidence_answer_is_retried_before_web_search(self):
+        from agents import rag_agent
+
+        with patch.object(rag_agent, "query_with_confidence", return_value=("weak", 0.1, "pdf")), \
+                patch.object(query_expansion, "enabled", return_value=True), \
+                patch.object(query_expansion, "search", return_value=("refund policy", 0.9, "pdf")) as expand, \
+                patch.object(rag_agent, "rewrite_answer", side_effect=lambda excerpts, q, lang: excerpts), \
+                patch.object(rag_agent, "save_memory"), \
+                patch.object(rag_agent.search_agent, "search_web") as web:
+            answer, conf, src = asyncio.run(rag_agent.handle_query("text", "money back?", "sid"))
+        self.assertEqual((answer, conf, src), ("refund policy", 0.9, "pdf"))
+        self.assertEqual(expand.call_args.args[0], "money back?")
+        self.assertEqual(expand.call_args.args[1], [("pdf", "pdf_sid"), ("memory", "memory_sid")])
+        web.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+os.environ.setdefault("ENV", "dev")
+from agents import query_router
+from bench_query_router import evaluate, keyword_route, load_eval
+
+
+class TestQueryRouter(unittest.TestCase):
+    def test_eval_set_accuracy(self):
+        rows = load_eval()
+        accuracy, _ = evaluate(lambda q: query_router.route(q, default=query_router.WEB).label, rows)
+        baseline, _ = evaluate(keyword_route, rows)
+        self.assertGreaterEqual(accuracy, 0.85)
+        self.assertGreater(accuracy, baseline)
+
+    def test_routing_is_local(self):
+        query_router.get_router()
+        query_router.embed.cache_clear()
+        loaded = set(sys.modules)
+        with patch("socket.socket", side_effect=AssertionError("network call")):
+            labels = [query_router.route(q).label for q in (
+                "summarize the report I uploaded", "what is shown in this photo",
+                "arxiv preprints on speech recognition", "stock price of microsoft")]
+        self.assertEqual(labels, [query_router.RAG, query_router.IMAGE, query_router.ARXIV, query_router.WEB])
+        # no model library (or anything else) was imported to route
+        self.assertEqual(set(sys.modules) - loaded, set())
+
+    def test_label_subset_and_default(self):
+        route = query_router.route("describe the photo", labels=query_router.SEARCH_ROUTES)
+        self.assertIn(route.label, query_router.SEARCH_ROUTES)
+        self.assertEqual(set(route.scores), set(query_router.SEARCH_ROUTES))
+        self.assertEqual(query_router.route("zzz qqq", default=query_router.WEB).label, query_router.WEB)
+
+    def test_search_agent_routes_by_intent(self):
+        from agents import search_agent
+
+        with patch.object(search_agent, "search_arxiv", return_value="arxiv") as arxiv, \
+                patch.object(search_agent, "search_semantic_scholar", return_value="scholar"), \
+                patch.object(search_agent, "search_web", return_value="web"):
+            self.assertEqual(search_agent.handle_query("recent preprints on speech recognition"), "arxiv")
+            self.assertEqual(search_agent.handle_query("peer reviewed studies on meditation"), "scholar")
+            self.assertEqual(search_agent.handle_query("weather in berlin tomorrow"), "web")
+            arxiv.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+import faiss
+from vectorstore import rerank
+
+
+class TestRerank(unittest.TestCase):
+    def test_mmr_prefers_diverse_chunks(self):
+        query = np.array([1.0, 1.0, 0.0])
+        docs = np.array([[1.0, 0.9, 0.0], [1.0, 0.88, 0.05], [0.6, 1.0, 0.0]])
+        self.assertEqual(rerank.mmr(query, docs, 2, lambda_=1.0), [0, 1])
+        self.assertEqual(rerank.mmr(query, docs, 2, lambda_=0.5), [0, 2])
+
+    def test_mmr_drops_near_duplicates(self):
+        docs = np.array([[1.0, 0.0], [0.999, 0.01], [0.0, 1.0]])
+        self.assertEqual(rerank.mmr(np.array([1.0, -0.1]), docs, 3, dedupe=0.95), [0, 2])
+
+    def test_mmr_uses_given_relevance(self):
+        docs = np.eye(3)
+        self.assertEqual(rerank.mmr(np.array([1.0, 0, 0]), docs, 3, relevance=[0.1, 0.9, 0.5]), [1, 2, 0])
+
+    def test_stitch_merges_overlapping_chunks(self):
+        text = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu nu xi omicron pi rho"
+        first, second = text[:60], text[30:]
+        self.assertEqual(rerank.stitch([second, "unrelated", first], min_overlap=20), [text, "unrelated"])
+        self.assertEqual(rerank.stitch([text, text[10:40]]), [text])
+        self.assertEqual(rerank.stitch(["a" * 10, "b" * 10]), ["a" * 10, "b" * 10])
+
+    def test_cross_encoder_disabled_without_model(self):
+        with patch.object(rerank.settings, "RERANK_MODEL", ""):
+            self.assertIsNone(rerank.cross_encoder_scores("q", ["a"]))
+
+    def test_cross_encoder_scores_bounded(self):
+        model = types.SimpleNamespace(predict=lambda pairs, batch_size: [len(p[1]) - 3 for p in pairs])
+        with patch.object(rerank.settings, "RERANK_MODEL", "local"), \
+                patch.object(rerank.registry, "get", return_value=model):
+            scores = rerank.cross_encoder_scores("q", ["abc", "x" * 5000])
+        self.assertAlmostEqual(float(scores[0]), 0.5)
+        self.assertGreater(scores[1], 0.99)
+
+
+@unittest.skipUnless(isinstance(faiss, types.ModuleType), "faiss is stubbed by another test module")
+class TestFaissRerank(unittest.TestCase):
+    def test_overlapping_chunks_reach_prompt_once(self):
+        import vectorstore.faiss_store as fs
+        from vectorstore.bm25_index import BM25Index
+
+        doc = ("The pump needs priming before first use. Fill the housing with water through the "
+               "top port, close the cap and run it briefly. Never run it dry for more than ten seconds.")
+        chunks = [doc[:110], doc[40:], "Store the unit in a frost free room."]
+        vecs = {chunks[0]: [1.0, 0.1, 0.0], chunks[1]: [0.8, 0.5, 0.0], chunks[2]: [0.0, 0.0, 1.0], "q": [1.0, 0.1, 0.0]}
+        embedder = types.SimpleNamespace(embed_query=lambda t: vecs.get(t, vecs["q"]),
+                                         embed_documents=lambda ts: [vecs[t] for t in ts])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index")
+            with patch.object(fs, "FAISS_INDEX_PATH", path), patch.object(fs, "META_PATH", path + ".json"), \
+                    patch.object(fs, "VECTORS_PATH", path + ".vecs"), patch.object(fs, "_vecfile", None), \
+                    patch.object(fs, "_embedder", lambda: embedder), patch.object(fs, "_index", None), \
+                    patch.object(fs, "_meta", []), patch.object(fs, "_bm25", BM25Index()):
+                fs.add_texts(chunks, namespace="pdf_s")
+                text = fs.search_faiss("q", namespace="pdf_s", k=2)
+                self.assertEqual(text, doc)
+                with patch.object(fs.settings, "RERANK", False):
+                    self.assertEqual(fs.search_faiss("q", namespace="pdf_s", k=2), f"{chunks[0]}\n{chunks[1]}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.services import ServiceRegistry
+
+
+class TestServiceRegistry(unittest.TestCase):
+    def test_builds_once_on_first_use(self):
+        reg = ServiceRegistry()
+        calls = []
+        reg.register("svc", lambda: calls.append(1) or "client")
+        self.assertEqual(reg.status()["svc"]["state"], "pending")
+        self.assertEqual(reg.get("svc"), "client")
+        self.assertEqual(reg.get("svc"), "client")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(reg.status()["svc"]["state"], "ready")
+
+    def test_failure_is_reported_and_retried(self):
+        reg = ServiceRegistry()
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("network down")
+            return "ok"
+
+        reg.register("svc", flaky)
+        reg.warm_up()
+        status = reg.status()["svc"]
+        self.assertEqual(status["state"], "failed")
+        self.assertIn("network down", status["error"])
+        self.assertEqual(reg.get("svc"), "ok")
+        self.assertTrue(reg.is_ready("svc"))
+
+    def test_warm_up_selection_and_probe(self):
+        reg = ServiceRegistry()
+        loaded = {}
+        reg.register("cheap", lambda: "c")
+        reg.register("model", lambda: loaded.setdefault("m", "m"), warm_up=False, probe=lambda: "m" in loaded)
+        reg.start_warm_up().join()
+        self.assertTrue(reg.is_ready("cheap"))
+        self.assertFalse(reg.is_ready("model"))
+        loaded["m"] = "m"  # loaded outside the registry
+        self.assertTrue(reg.is_ready("model"))
+
+    def test_warm_up_state(self):
+        reg = ServiceRegistry()
+        reg.register("a", lambda: "a")
+        reg.register("b", lambda: "b")
+        self.assertEqual(reg.warm_up_state()["phase"], "idle")
+        reg.start_warm_up(["b"]).join()
+        state = reg.warm_up_state()
+        self.assertEqual(state["phase"], "done")
+        self.assertEqual(state["services"], ["b"])
+        self.assertIsNotNone(state["seconds"])
+        self.assertFalse(reg.is_ready("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
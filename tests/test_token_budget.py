@@ -0,0 +1,82 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+from app import token_budget
+
+
+class TestTokenBudget(unittest.TestCase):
+    def setUp(self):
+        # deterministic counts: four characters per token
+        self.patches = [
+            patch.object(token_budget, "_encoding", lambda model: None),
+            patch.object(token_budget, "_stats", {}),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+
+    def test_estimate(self):
+        self.assertEqual(token_budget.count(""), 0)
+        self.assertEqual(token_budget.count("abcd"), 1)
+        self.assertEqual(token_budget.count("abcde"), 2)
+
+    def test_context_within_budget_is_untouched(self):
+        text = "first excerpt\nsecond excerpt"
+        self.assertEqual(token_budget.fit(text, budget=100), text)
+        self.assertEqual(token_budget.stats()["prompt"]["trimmed"], 0)
+
+    def test_leading_lines_are_kept_and_the_last_cut_at_a_word(self):
+        text = "best excerpt here\n" + "next excerpt with many more words in it\n" + "x" * 400
+        fitted = token_budget.fit(text, budget=12, site="rewrite_answer")
+        self.assertEqual(fitted, "best excerpt here\nnext excerpt with many")
+        self.assertLessEqual(token_budget.count(fitted), 12)
+        s = token_budget.stats()["rewrite_answer"]
+        self.assertEqual((s["requests"], s["trimmed"]), (1, 1))
+        self.assertGreater(s["tokens_dropped"], 100)
+
+    def test_transcript_keeps_the_latest_turns(self):
+        raw = "\n".join(f"User: question {i}\nBot: answer {i}" for i in range(50))
+        fitted = token_budget.fit(raw, budget=20, keep_end=True)
+        self.assertTrue(fitted.endswith("Bot: answer 49"))
+        self.assertNotIn("question 0", fitted)
+        self.assertLessEqual(token_budget.count(fitted), 20)
+
+    def test_reserve_is_counted_not_trimmed(self):
+        question = "q" * 40  # 10 tokens
+        fitted = token_budget.fit("a b c d e f g h", budget=12, reserve=question)
+        self.assertEqual(fitted, "a b c d")
+        self.assertEqual(token_budget.stats()["prompt"]["max_tokens"], 12)
+
+    def test_per_model_budgets(self):
+        self.assertEqual(token_budget.parse_budgets(" gemini-1.5-flash:6000, gpt-4:2000 "),
+                         {"gemini-1.5-flash": 6000, "gpt-4": 2000})
+        for spec in ("gpt-4", "gpt-4:many", ":100"):
+            with self.assertRaises(ValueError):
+                token_budget.parse_budgets(spec)
+        with patch.object(token_budget, "_budgets", {"gpt-4": 2}):
+            self.assertEqual(token_budget.fit("one two three", "gpt-4"), "one two")
+            self.assertEqual(token_budget.budget_for("other"), token_budget.settings.PROMPT_TOKEN_BUDGET)
+
+
+class TestPromptSites(unittest.TestCase):
+    def test_rewrite_answer_sends_trimmed_excerpts(self):
+        from agents import rag_agent
+
+        excerpts = "\n".join(f"excerpt {i} " + "word " * 50 for i in range(100))
+        with patch.object(token_budget, "_budgets", {rag_agent.SUMMARY_MODEL: 200}), \
+                patch.object(rag_agent, "summarize_text_gemini", side_effect=lambda text, q: text) as gemini:
+            sent = rag_agent.rewrite_answer(excerpts, "what?", "en")
+        self.assertTrue(sent.startswith("excerpt 0 "))
+        self.assertLessEqual(token_budget.count(sent) + token_budget.count("what?"), 200)
+        self.assertEqual(gemini.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+from agents import translate_agent
+
+
+class FakeLLM:
+    def __init__(self, fail_on=None):
+        self.prompts = []
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def invoke(self, prompt):
+        text = prompt.split("\n\n", 1)[1]
+        with self.lock:
+            self.prompts.append(text)
+        if self.fail_on and self.fail_on in text:
+            raise RuntimeError("rate limited")
+        return SimpleNamespace(content=f"<{text}>")
+
+
+class TestTranslateAgent(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = translate_agent.TranslationCache(os.path.join(self.tmpdir, "t.sqlite3"))
+        self.llm = FakeLLM()
+        self.patches = [
+            patch.object(translate_agent, "cache", self.cache),
+            patch.object(translate_agent.registry, "get", lambda name: self.llm),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def test_segment_round_trips_and_respects_chunk_size(self):
+        text = "  First sentence. Second one!\n\nA third line\nand a fourth? Done."
+        chunks = translate_agent.segment(text, max_chars=20)
+        self.assertEqual("".join(c + tail for c, tail in chunks), text)
+        self.assertTrue(all(len(c) <= 20 for c, _ in chunks if " " in c))
+
+    def test_english_is_passed_through(self):
+        self.assertEqual(translate_agent.translate_response("Hello.", "en-US"), "Hello.")
+        self.assertEqual(self.llm.prompts, [])
+
+    def test_long_text_is_chunked_not_truncated(self):
+        text = " ".join(f"Sentence number {i}." for i in range(400))
+        with patch.object(translate_agent.settings, "TRANSLATION_CHUNK_CHARS", 500):
+            out = translate_agent.translate_response(text, "fr")
+        self.assertGreater(len(self.llm.prompts), 1)
+        self.assertIn("Sentence number 399.", out)
+        self.assertTrue(out.startswith("<Sentence number 0."))
+
+    def test_cached_chunks_skip_the_model(self):
+        translate_agent.translate_response("Hello there. General Kenobi.", "de")
+        calls = len(self.llm.prompts)
+        again = translate_agent.TranslationCache(self.cache.path)  # survives restarts
+        with patch.object(translate_agent, "cache", again):
+            out = translate_agent.translate_response("Hello there. General Kenobi.", "de")
+        self.assertEqual(len(self.llm.prompts), calls)
+        self.assertEqual(out, "<Hello there. General Kenobi.>")
+
+    def test_cache_defaults_to_the_data_directory(self):
+        settings = translate_agent.Settings()
+        self.assertEqual(os.path.dirname(settings.TRANSLATION_CACHE_PATH), settings.DATA_DIR)
+        cache = translate_agent.TranslationCache(os.path.join(self.tmpdir, "data", "t.sqlite3"))
+        cache.set("Hi.", "fr", "Salut.")
+        self.assertEqual(cache.get_many(["Hi."], "fr"), {"Hi.": "Salut."})
+
+    def test_stream_keeps_order_and_passes_failed_chunks_through(self):
+        self.llm.fail_on = "two"
+        with patch.object(translate_agent.settings, "TRANSLATION_CHUNK_CHARS", 10):
+            parts = list(translate_agent.translate_stream("One one. Two two. Three.", "es"))
+        self.assertEqual(parts, ["<One one.> ", "Two two. ", "<Three.>"])
+
+
+if __name__ == "__main__":
+    unittest.main()
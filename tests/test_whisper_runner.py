@@ -0,0 +1,130 @@
+import io
+import os
+import sys
+import threading
+import time
+import unittest
+import wave
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENV", "dev")
+from models import whisper_runner
+
+SR = whisper_runner.SAMPLE_RATE
+
+
+def _tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * SR)) / SR
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def _silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SR), dtype=np.float32)
+
+
+class TestSplitOnSilence(unittest.TestCase):
+    def test_drops_silence_and_keeps_short_gaps(self):
+        audio = np.concatenate([_silence(1), _tone(2), _silence(0.1), _tone(1), _silence(1)])
+        spans = whisper_runner.split_on_silence(audio, max_seconds=30)
+        self.assertEqual(len(spans), 1)
+        start, end = spans[0]
+        self.assertAlmostEqual(start / SR, 1.0, delta=0.2)
+        self.assertAlmostEqual(end / SR, 4.1, delta=0.2)
+
+    def test_packs_speech_up_to_max_length_and_cuts_at_pauses(self):
+        audio = np.concatenate([_tone(3), _silence(1), _tone(3), _silence(1), _tone(3)])
+        spans = whisper_runner.split_on_silence(audio, max_seconds=8)
+        self.assertEqual(len(spans), 2)
+        self.assertTrue(all((e - s) / SR <= 8.5 for s, e in spans))
+        # the cut falls inside the second pause
+        self.assertTrue(7.0 <= spans[0][1] / SR <= 8.0)
+
+    def test_long_speech_without_pauses_is_split(self):
+        spans = whisper_runner.split_on_silence(_tone(25), max_seconds=10)
+        self.assertEqual(len(spans), 3)
+        self.assertTrue(all((e - s) / SR <= 10.5 for s, e in spans))
+        # forced cuts are not padded: consecutive chunks meet without overlapping
+        self.assertEqual([e for _, e in spans[:-1]], [s for s, _ in spans[1:]])
+        self.assertEqual((spans[0][0], spans[-1][1]), (0, len(_tone(25))))
+
+    def test_all_silence(self):
+        self.assertEqual(whisper_runner.split_on_silence(_silence(3)), [])
+
+
+class TestDecodeAudio(unittest.TestCase):
+    def test_stereo_wav_is_mixed_down_and_resampled(self):
+        left = (_tone(1) * 32767).astype("<i2")
+        stereo = np.stack([left, left], axis=1)
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(2)
+            w.setsampwidth(2)
+            w.setframerate(8000)
+            w.writeframes(stereo[:8000].tobytes())
+        audio = whisper_runner.decode_audio(buf.getvalue())
+        self.assertEqual(audio.dtype, np.float32)
+        self.assertEqual(len(audio), SR)
+
+    def test_empty(self):
+        with self.assertRaises(ValueError):
+            whisper_runner.decode_audio(b"")
+
+
+class FakeModel:
+    """Records how many threads use the instance at the same time."""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def transcribe(self, audio, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return {"text": f"{len(audio) / SR:.0f}s"}
+
+
+class TestTranscribeChunks(unittest.TestCase):
+    def test_chunks_in_order_and_model_never_shared(self):
+        replicas = [FakeModel(), FakeModel()]
+        fake_whisper = type("W", (), {"load_model": staticmethod(lambda name: replicas.pop())})
+        audio = np.concatenate([_tone(3), _silence(1), _tone(5), _silence(1), _tone(2)])
+        with patch.object(whisper_runner, "whisper", fake_whisper), \
+                patch.object(whisper_runner, "model", None), \
+                patch.object(whisper_runner, "_pool", None), \
+                patch.object(whisper_runner.settings, "WHISPER_POOL_SIZE", 2), \
+                patch.object(whisper_runner.settings, "WHISPER_CHUNK_SECONDS", 6):
+            models = [whisper_runner._load_model()]
+            models.append(replicas[0])
+            parts = list(whisper_runner.transcribe_chunks(audio))
+        self.assertEqual([p["index"] for p in parts], [0, 1, 2])
+        self.assertEqual([p["text"] for p in parts], ["3s", "5s", "2s"])
+        self.assertTrue(all(m.max_active == 1 for m in models))
+
+    def test_warm_up_checks_the_model_out(self):
+        replica = FakeModel(delay=0.1)
+        fake_whisper = type("W", (), {"load_model": staticmethod(lambda name: replica)})
+        with patch.object(whisper_runner, "whisper", fake_whisper), \
+                patch.object(whisper_runner, "model", None), \
+                patch.object(whisper_runner, "_pool", None), \
+                patch.object(whisper_runner.settings, "WHISPER_POOL_SIZE", 1):
+            warm = threading.Thread(target=whisper_runner._warm_model)
+            warm.start()
+            while replica.active == 0 and warm.is_alive():
+                time.sleep(0.001)
+            # a request arriving during the warm-up waits for the replica
+            self.assertEqual(whisper_runner._transcribe_chunk(_tone(1)), "1s")
+            warm.join(timeout=5)
+        self.assertEqual(replica.max_active, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
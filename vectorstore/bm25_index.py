@@ -0,0 +1,136 @@
+"""In-memory BM25 inverted index, partitioned by namespace.
+
+Dense retrieval misses exact identifiers, part numbers and rare terms; this
+index catches them. It is keyed by the same ids as the FAISS text index and
+is maintained alongside it: documents are added incrementally at ingest and
+the whole index is rebuilt from the FAISS metadata when that is loaded, so
+nothing extra is persisted.
+
+Tokens are lowercased alphanumeric runs; compound identifiers such as
+``XJ-9000`` or ``v2.3.1`` are indexed both whole and by their parts.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./:][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an the of in on at to for and or is are was were be been it its this that "
+    "these those with from by as what which who how when where why do does did "
+    "can could would should will i me my you your we our they their there".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for tok in _TOKEN.findall(text.lower()):
+        if tok in _STOPWORDS:
+            continue
+        tokens.append(tok)
+        if not tok.isalnum():
+            tokens.extend(p for p in _PART.findall(tok) if p not in _STOPWORDS)
+    return tokens
+
+
+class _Partition:
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.lengths: Dict[int, int] = {}
+        self.total_length = 0
+
+    def add(self, doc_id: int, tokens: List[str]) -> None:
+        counts: Dict[str, int] = defaultdict(int)
+        for tok in tokens:
+            counts[tok] += 1
+        for tok, tf in counts.items():
+            self.postings[tok][doc_id] = tf
+        self.lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def idf(self, term: str) -> float:
+        n = len(self.lengths)
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, terms: List[str], k1: float, b: float) -> Dict[int, Tuple[float, float]]:
+        """Return ``{doc_id: (bm25, idf_weight_of_matched_terms)}``."""
+        if not self.lengths:
+            return {}
+        avg_len = self.total_length / len(self.lengths) or 1.0
+        hits: Dict[int, List[float]] = {}
+        for term in set(terms):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf(term)
+            for doc_id, tf in docs.items():
+                norm = tf + k1 * (1 - b + b * self.lengths[doc_id] / avg_len)
+                hit = hits.setdefault(doc_id, [0.0, 0.0])
+                hit[0] += idf * tf * (k1 + 1) / norm
+                hit[1] += idf
+        return {doc_id: (s, w) for doc_id, (s, w) in hits.items()}
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._partitions: Dict[str, _Partition] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(p.lengths) for p in self._partitions.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._partitions = {}
+
+    def drop(self, namespace: str) -> None:
+        with self._lock:
+            self._partitions.pop(namespace, None)
+
+    def add(self, docs: Iterable[Tuple[int, str]], namespace: str) -> None:
+        """Index ``(doc_id, text)`` pairs under ``namespace``."""
+        tokenized = [(doc_id, tokenize(text)) for doc_id, text in docs]
+        with self._lock:
+            part = self._partitions.setdefault(namespace, _Partition())
+            for doc_id, tokens in tokenized:
+                part.add(doc_id, tokens)
+
+    def search(self, query: str, namespace: Optional[str] = None, k: int = 10) -> List[Tuple[int, float, float]]:
+        """Return up to ``k`` ``(doc_id, score, coverage)`` tuples, best first.
+
+        ``coverage`` is the IDF-weighted share of the query terms found in the
+        document (1.0 when every term, rare ones included, matched).
+        ``namespace=None`` searches every namespace.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        results = []
+        with self._lock:
+            if namespace is None:
+                parts = list(self._partitions.values())
+            else:
+                parts = [self._partitions[namespace]] if namespace in self._partitions else []
+            for part in parts:
+                total_idf = sum(part.idf(t) for t in set(terms)) or 1.0
+                for doc_id, (score, matched) in part.search(terms, self.k1, self.b).items():
+                    results.append((doc_id, score, matched / total_idf))
+        results.sort(key=lambda r: r[1], reverse=True)
+        return results[:k]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List], k: int = 60) -> List:
+    """Fuse ranked lists of keys; items ranked high in any list come first."""
+    scores: Dict = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
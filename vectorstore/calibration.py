@@ -0,0 +1,118 @@
+"""Calibrated confidence for retrieval scores.
+
+Each retriever reports scores on its own scale: FAISS and Pinecone return
+cosine similarities (higher is better, relevant matches crowd a narrow band
+near the top), BM25 reports the share of query terms a chunk covers. The RAG
+agent compares these across retrievers and against ``MIN_RAG_CONFIDENCE``,
+so each raw score is mapped through a per-retriever Platt sigmoid onto the
+estimated probability that the returned chunks answer the query.
+
+The defaults below are priors for OpenAI embeddings and BM25 coverage. Fit
+parameters for the deployed embedding model with
+``benchmarks/bench_calibration.py --fit`` and point ``CALIBRATION_PATH`` at
+the resulting JSON file (``{"faiss": [a, b], ...}``) to override them.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+from typing import Dict, Iterable, NamedTuple, Optional
+
+import numpy as np
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+settings = Settings()
+
+FAISS, PINECONE, KEYWORD = "faiss", "pinecone", "keyword"
+
+
+class Calibrator(NamedTuple):
+    """Platt scaling ``p = sigmoid(a * score + b)``."""
+
+    a: float
+    b: float
+
+    def __call__(self, score: float) -> float:
+        z = self.a * float(score) + self.b
+        if z < -50:
+            return 0.0
+        return 1.0 / (1.0 + math.exp(-z))
+
+
+DEFAULTS: Dict[str, Calibrator] = {
+    # OpenAI embeddings: unrelated text still scores ~0.7, answers ~0.8 and up
+    FAISS: Calibrator(30.0, -23.5),
+    PINECONE: Calibrator(30.0, -23.5),
+    # Half the (IDF-weighted) query terms matched is weak evidence on its own
+    KEYWORD: Calibrator(8.0, -5.0),
+}
+
+
+def fit_platt(scores: Iterable[float], labels: Iterable[int], iters: int = 100) -> Calibrator:
+    """Fit Platt scaling to raw ``scores`` and binary relevance ``labels``.
+
+    Uses Newton's method on the log-loss with Platt's smoothed targets, which
+    keeps the fit finite when the classes are perfectly separable.
+    """
+    x = np.asarray(list(scores), dtype=np.float64)
+    y = np.asarray(list(labels), dtype=np.float64)
+    n_pos = float(y.sum())
+    n_neg = float(len(y) - n_pos)
+    if not n_pos or not n_neg:
+        raise ValueError("fit_platt needs both relevant and irrelevant examples")
+    t = np.where(y > 0, (n_pos + 1) / (n_pos + 2), 1 / (n_neg + 2))
+    a, b = 0.0, math.log((n_pos + 1) / (n_neg + 1))
+    for _ in range(iters):
+        p = 1.0 / (1.0 + np.exp(-(a * x + b)))
+        w = np.maximum(p * (1 - p), 1e-12)
+        g = np.array([np.dot(p - t, x), np.sum(p - t)])
+        h = np.array([[np.dot(w, x * x), np.dot(w, x)], [np.dot(w, x), np.sum(w)]])
+        h += np.eye(2) * 1e-9
+        step = np.linalg.solve(h, g)
+        a, b = a - step[0], b - step[1]
+        if np.abs(step).max() < 1e-9:
+            break
+    return Calibrator(float(a), float(b))
+
+
+def load(path: str) -> Dict[str, Calibrator]:
+    with open(path) as f:
+        data = json.load(f)
+    return {name: Calibrator(*params) for name, params in data.items()}
+
+
+def save(calibrators: Dict[str, Calibrator], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump({name: list(c) for name, c in calibrators.items()}, f, indent=2)
+
+
+_calibrators: Optional[Dict[str, Calibrator]] = None
+_lock = threading.Lock()
+
+
+def get_calibrators() -> Dict[str, Calibrator]:
+    """Defaults overlaid with the fitted parameters from ``CALIBRATION_PATH``."""
+    global _calibrators
+    if _calibrators is None:
+        with _lock:
+            if _calibrators is None:
+                calibrators = dict(DEFAULTS)
+                path = settings.CALIBRATION_PATH
+                if path and os.path.exists(path):
+                    try:
+                        calibrators.update(load(path))
+                    except (OSError, ValueError, TypeError) as e:
+                        logger.warning(f"Ignoring calibration file {path}: {e}")
+                _calibrators = calibrators
+    return _calibrators
+
+
+def calibrate(retriever: str, score: float) -> float:
+    """Probability that a result with raw ``score`` from ``retriever`` is relevant."""
+    return get_calibrators()[retriever](score)
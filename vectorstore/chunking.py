@@ -0,0 +1,350 @@
+"""Chunking of documents for the FAISS and Pinecone text stores.
+
+Both stores index the chunks produced here, once per document. PDFs are
+read with PyMuPDF, whose layout information turns each page into blocks:
+headings (larger or bold short lines), paragraphs and tables (detected
+with ``page.find_tables``, one row per line). Chunks never span two
+sections: a heading starts a new chunk, and consecutive paragraphs and
+tables of a section are packed into chunks of up to ``CHUNK_CHARS``
+characters. Longer blocks are split at paragraph, line, sentence and
+finally word boundaries; a table split across chunks repeats its header
+row. There is no overlap between chunks.
+
+Every :class:`Chunk` carries the page(s) it comes from, its section
+heading and its character offsets in :func:`document_text`, so answers
+can cite pages (see :func:`cite`). Plain text (chat memory) goes through
+:func:`split_text`, the same boundaries without layout.
+
+Extraction is CPU-bound Python work: long PDFs are split into ranges of
+``PDF_PAGES_PER_TASK`` pages extracted in a pool of ``PDF_WORKERS``
+processes, and the blocks are chunked in page order as ranges complete
+(see ``benchmarks/bench_pdf_extract.py``). Without PyMuPDF, PDFs are read
+with ``pypdf`` and chunked by paragraphs only.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+settings = Settings()
+
+HEADING, TEXT, TABLE = "heading", "text", "table"
+# Blocks are joined with a blank line in the document text
+BLOCK_SEP = "\n\n"
+# Tried in order when a block has to be split
+_SEPARATORS = ("\n\n", "\n", ". ", " ")
+# Headings: at least this much larger than body text, or bold and short
+HEADING_SCALE = 1.15
+HEADING_MAX_CHARS = 120
+_PAGE_NUMBER = re.compile(r"^(?:page\s*)?\d+(?:\s*(?:/|of)\s*\d+)?$", re.IGNORECASE)
+
+
+class Block(NamedTuple):
+    text: str
+    page: int
+    kind: str = TEXT
+
+
+class Chunk(NamedTuple):
+    text: str
+    page: int
+    end_page: int
+    start: int
+    end: int
+    section: Optional[str] = None
+
+    def metadata(self) -> dict:
+        """Metadata stored with the chunk (no ``None`` values: Pinecone rejects them)."""
+        meta = {"page": self.page, "end_page": self.end_page, "start": self.start, "end": self.end}
+        if self.section:
+            meta["section"] = self.section
+        return meta
+
+
+def _spans(text: str, max_chars: int, start: int = 0, end: Optional[int] = None,
+           separators: Sequence[str] = _SEPARATORS) -> List[Tuple[int, int]]:
+    """``(start, end)`` spans of ``text[start:end]`` of at most ``max_chars``.
+
+    Units between separators are packed greedily; units that are still too
+    long are split at the next separator, and cut hard without one.
+    """
+    end = len(text) if end is None else end
+    if end - start <= max_chars:
+        return [(start, end)]
+    sep = next((s for s in separators if text.find(s, start, end) != -1), None)
+    if sep is None:
+        return [(i, min(i + max_chars, end)) for i in range(start, end, max_chars)]
+    rest = separators[separators.index(sep) + 1:]
+    units, i = [], start
+    while i < end:
+        j = text.find(sep, i, end)
+        j = end if j == -1 else j + len(sep)
+        units.append((i, j))
+        i = j
+    spans: List[Tuple[int, int]] = []
+    for u0, u1 in units:
+        if u1 - u0 > max_chars:
+            spans.extend(_spans(text, max_chars, u0, u1, rest))
+        elif spans and u1 - spans[-1][0] <= max_chars and spans[-1][1] == u0:
+            spans[-1] = (spans[-1][0], u1)
+        else:
+            spans.append((u0, u1))
+    return spans
+
+
+def _strip(text: str, start: int, end: int) -> Tuple[int, int]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def split_text(text: str, max_chars: Optional[int] = None) -> List[str]:
+    """Split plain ``text`` into chunks of at most ``max_chars`` characters."""
+    max_chars = max_chars or settings.CHUNK_CHARS
+    chunks = []
+    for s, e in _spans(text, max_chars):
+        s, e = _strip(text, s, e)
+        if s < e:
+            chunks.append(text[s:e])
+    return chunks
+
+
+def document_text(blocks: Iterable[Block]) -> str:
+    """The text :attr:`Chunk.start` and :attr:`Chunk.end` refer to."""
+    return BLOCK_SEP.join(b.text for b in blocks)
+
+
+def chunk_blocks(blocks: Iterable[Block], max_chars: Optional[int] = None) -> List[Chunk]:
+    """Pack layout ``blocks`` (in reading order) into section-aligned chunks."""
+    max_chars = max_chars or settings.CHUNK_CHARS
+    chunks: List[Chunk] = []
+    # pieces of the chunk being built: (text, page, start, end, is_heading)
+    current: List[Tuple[str, int, int, int, bool]] = []
+    section: Optional[str] = None
+
+    def flush():
+        if any(not heading for *_, heading in current):
+            chunks.append(Chunk(BLOCK_SEP.join(p[0] for p in current), current[0][1], current[-1][1],
+                                current[0][2], current[-1][3], section))
+            current.clear()
+
+    offset = 0
+    for block in blocks:
+        start, offset = offset, offset + len(block.text) + len(BLOCK_SEP)
+        if not block.text.strip():
+            continue
+        if block.kind == HEADING:
+            flush()
+            if not current:  # a heading that directly follows another one stays with it
+                section = block.text.strip()
+            current.append((block.text, block.page, start, start + len(block.text), True))
+            continue
+        # leave room for the headings waiting for their first content
+        lead = sum(len(p[0]) + len(BLOCK_SEP) for p in current) if all(p[4] for p in current) else 0
+        limit = max(max_chars // 2, max_chars - lead)
+        header = ""
+        if block.kind == TABLE:
+            header = block.text.split("\n", 1)[0]
+            spans = _spans(block.text, max(limit // 2, limit - len(header) - 1), separators=("\n",))
+        else:
+            spans = _spans(block.text, limit)
+        for n, (s, e) in enumerate(spans):
+            s, e = _strip(block.text, s, e)
+            if s == e:
+                continue
+            text = block.text[s:e]
+            if n and header:
+                text = f"{header}\n{text}"
+            size = sum(len(p[0]) + len(BLOCK_SEP) for p in current)
+            if current and size + len(text) > max_chars:
+                flush()
+            current.append((text, block.page, start + s, start + e, False))
+    flush()
+    return chunks
+
+
+def _table_text(table) -> str:
+    rows = []
+    for row in table.extract():
+        cells = [" ".join((c or "").split()) for c in row]
+        if any(cells):
+            rows.append(" | ".join(cells))
+    return "\n".join(rows)
+
+
+def _line_text(line: dict) -> str:
+    return "".join(span["text"] for span in line["spans"]).strip()
+
+
+def _block_text(block: dict) -> str:
+    text = ""
+    for line in block["lines"]:
+        part = _line_text(line)
+        if not part:
+            continue
+        if text.endswith("-") and part[:1].islower():  # hyphenated line break
+            text = text[:-1] + part
+        else:
+            text = f"{text} {part}" if text else part
+    return text
+
+
+# A raw block, before headings are told apart: (text, font size, bold, kind)
+_Raw = Tuple[str, float, bool, str]
+# Pages of a range, (number, raw blocks), and the characters per font size
+_Range = Tuple[List[Tuple[int, List[_Raw]]], Dict[float, int]]
+
+
+def _pymupdf_range(path: str, first: int, last: int) -> _Range:
+    import fitz
+
+    pages, weights = [], {}
+    with fitz.open(path) as doc:
+        for number in range(first, last + 1):
+            page = doc[number - 1]
+            tables = []
+            try:
+                tables = [(fitz.Rect(t.bbox), _table_text(t)) for t in page.find_tables().tables]
+            except Exception as e:  # PyMuPDF before 1.23, or a page it cannot analyse
+                logger.debug(f"Table detection failed on page {number} of {path}: {e}")
+            raw: List[_Raw] = []
+            emitted = set()
+            for b in page.get_text("dict")["blocks"]:
+                if b.get("type") != 0:
+                    continue
+                rect = fitz.Rect(b["bbox"])
+                inside = next((i for i, (t, _) in enumerate(tables)
+                               if rect.intersect(t).get_area() > 0.5 * rect.get_area()), None)
+                if inside is not None:
+                    if inside not in emitted:
+                        emitted.add(inside)
+                        raw.append((tables[inside][1], 0.0, False, TABLE))
+                    continue
+                spans = [s for line in b["lines"] for s in line["spans"] if s["text"].strip()]
+                for span in spans:
+                    size = round(span["size"], 1)
+                    weights[size] = weights.get(size, 0) + len(span["text"].strip())
+                text = _block_text(b)
+                if text and not _PAGE_NUMBER.match(text):
+                    raw.append((text, max(s["size"] for s in spans), all(s["flags"] & 16 for s in spans), TEXT))
+            raw.extend((text, 0.0, False, TABLE) for i, (_, text) in enumerate(tables) if i not in emitted and text)
+            pages.append((number, raw))
+    return pages, weights
+
+
+def _pypdf_range(path: str, first: int, last: int) -> _Range:
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    pages = []
+    for number in range(first, last + 1):
+        raw: List[_Raw] = []
+        for para in re.split(r"\n\s*\n", reader.pages[number - 1].extract_text() or ""):
+            text = " ".join(para.split())
+            if text and not _PAGE_NUMBER.match(text):
+                raw.append((text, 0.0, False, TEXT))
+        pages.append((number, raw))
+    return pages, {}
+
+
+_EXTRACTORS = {"pymupdf": _pymupdf_range, "pypdf": _pypdf_range}
+
+
+def _extract_range(backend: str, path: str, first: int, last: int) -> _Range:
+    """Raw blocks of pages ``first``..``last`` (1-based); runs in the pool."""
+    return _EXTRACTORS[backend](path, first, last)
+
+
+def _open(path: str) -> Tuple[str, int]:
+    """The extraction backend for ``path`` and its number of pages."""
+    try:
+        import fitz
+    except ImportError:
+        logger.warning("PyMuPDF is not installed; chunking PDFs by paragraphs only")
+        from pypdf import PdfReader
+
+        return "pypdf", len(PdfReader(path).pages)
+    with fitz.open(path) as doc:
+        return "pymupdf", doc.page_count
+
+
+def page_ranges(pages: int, size: int) -> List[Tuple[int, int]]:
+    """``(first, last)`` ranges of at most ``size`` pages covering ``1..pages``."""
+    size = max(1, size)
+    return [(first, min(first + size - 1, pages)) for first in range(1, pages + 1, size)]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _workers() -> int:
+    return settings.PDF_WORKERS or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """The extraction pool shared by all uploads, started on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawned, not forked: the parent holds model and FAISS threads
+                _pool = ProcessPoolExecutor(max_workers=_workers(), mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _kind(text: str, size: float, bold: bool, kind: str, body: float) -> str:
+    if kind != TEXT or len(text) > HEADING_MAX_CHARS or text.endswith((".", ",", ";")):
+        return kind
+    return HEADING if (size and size >= body * HEADING_SCALE) or bold else TEXT
+
+
+def pdf_blocks(path: str) -> Iterator[Block]:
+    """Headings, paragraphs and tables of the PDF at ``path``, in reading order.
+
+    Documents longer than ``PDF_PAGES_PER_TASK`` pages are extracted by the
+    pool of ``PDF_WORKERS`` processes, one page range per task; blocks are
+    yielded in page order as the ranges complete. The body font size
+    headings are measured against is that of the first range.
+    """
+    backend, pages = _open(path)
+    ranges = page_ranges(pages, settings.PDF_PAGES_PER_TASK)
+    args = ([backend] * len(ranges), [path] * len(ranges), [r[0] for r in ranges], [r[1] for r in ranges])
+    if len(ranges) > 1 and _workers() > 1:
+        results = _get_pool().map(_extract_range, *args)
+    else:
+        results = map(_extract_range, *args)
+    body = None
+    for extracted, weights in results:
+        if body is None:  # the size most text is set in
+            body = max(weights, key=weights.get) if weights else 0.0
+        for number, raw in extracted:
+            for text, size, bold, kind in raw:
+                yield Block(text, number, _kind(text, size, bold, kind, body))
+
+
+def chunk_pdf(path: str, max_chars: Optional[int] = None) -> List[Chunk]:
+    return chunk_blocks(pdf_blocks(path), max_chars)
+
+
+def cite(meta: dict) -> str:
+    """``"[report.pdf p. 3] "`` for a chunk's metadata, ``""`` without a page."""
+    page = meta.get("page")
+    if page is None:
+        return ""
+    end = meta.get("end_page", page)
+    pages = f"p. {page}" if end == page else f"pp. {page}-{end}"
+    doc = meta.get("doc")
+    return f"[{doc} {pages}] " if doc else f"[{pages}] "
@@ -0,0 +1,113 @@
+"""Raw chunk embeddings on disk, one row per vector id.
+
+The FAISS index is derived data: its vectors may be quantized, and a flat
+index is the only type that can hand them back. Keeping every embedding in
+a plain matrix next to the index means the index can be rebuilt,
+re-quantized or migrated to another FAISS type offline (see
+``vectorstore/maintenance.py``) without a single embedding call, and
+re-ranking can read exact vectors whatever the index type.
+
+Layout: a 64-byte header (magic, dtype, dimension) followed by rows of
+``dim`` float32 or float16 values, row ``i`` holding vector id ``i``.
+Readers memory-map the rows, so workers share the pages.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+from typing import Optional, Sequence
+
+import numpy as np
+
+MAGIC = b"EMBV1\0"
+HEADER_SIZE = 64
+DTYPES = ("float32", "float16")
+
+
+class EmbeddingFile:
+    def __init__(self, path: str, dim: Optional[int] = None, dtype: str = "float32"):
+        self.path = path
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._map: Optional[np.ndarray] = None
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                self.dim, self.dtype = _parse_header(f.read(HEADER_SIZE), path)
+        elif self.dtype.name not in DTYPES:
+            raise ValueError(f"Unsupported embedding dtype {dtype!r}")
+
+    @property
+    def row_bytes(self) -> int:
+        return self.dim * self.dtype.itemsize
+
+    def __len__(self) -> int:
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+        return max(0, size - HEADER_SIZE) // self.row_bytes
+
+    def append(self, start: int, vecs: np.ndarray) -> None:
+        """Store ``vecs`` as ids ``start, start + 1, ...``.
+
+        Rows at or past ``start`` (left behind by an interrupted write whose
+        ids were never committed to the metadata) are overwritten; starting
+        at id 0 replaces the file, dimension included.
+        """
+        vecs = np.ascontiguousarray(vecs, dtype=self.dtype)
+        if start == 0 or not os.path.exists(self.path):
+            self.dim = vecs.shape[1]
+            with open(self.path, "wb") as f:
+                f.write(_header(self.dim, self.dtype))
+        if vecs.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vecs.shape[1]} does not match {self.dim}")
+        if start > len(self):
+            raise ValueError(f"Cannot store id {start} after {len(self)} rows")
+        with open(self.path, "r+b") as f:
+            f.truncate(HEADER_SIZE + start * self.row_bytes)
+            f.seek(0, os.SEEK_END)
+            f.write(vecs.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self._map = None
+
+    def matrix(self) -> np.ndarray:
+        """Read-only memory map of every stored row (``(n, dim)``)."""
+        n = len(self)
+        # one read of ``_map``: appends from another thread reset it
+        rows = self._map
+        if rows is None or len(rows) != n:
+            if not n:
+                return np.empty((0, self.dim or 0), dtype=self.dtype)
+            rows = self._map = np.memmap(self.path, dtype=self.dtype, mode="r", offset=HEADER_SIZE,
+                                         shape=(n, self.dim))
+        return rows
+
+    def get(self, ids: Sequence[int]) -> np.ndarray:
+        """float32 rows for ``ids``."""
+        return np.asarray(self.matrix()[np.asarray(ids, dtype=np.int64)], dtype=np.float32)
+
+    def covers(self, ids: Sequence[int]) -> bool:
+        return self.dim is not None and len(ids) > 0 and max(ids) < len(self)
+
+
+def write(path: str, vecs: np.ndarray, dtype: str = "float32") -> None:
+    """Write a complete embedding file (used for offline conversions)."""
+    vecs = np.ascontiguousarray(vecs, dtype=dtype)
+    with open(path, "wb") as f:
+        f.write(_header(vecs.shape[1], vecs.dtype))
+        f.write(vecs.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _header(dim: int, dtype: np.dtype) -> bytes:
+    return (MAGIC + struct.pack("<8sI", dtype.name.encode(), dim)).ljust(HEADER_SIZE, b"\0")
+
+
+def _parse_header(raw: bytes, path: str):
+    if len(raw) < HEADER_SIZE or not raw.startswith(MAGIC):
+        raise ValueError(f"{path} is not an embedding file")
+    name, dim = struct.unpack_from("<8sI", raw, len(MAGIC))
+    return dim, np.dtype(name.rstrip(b"\0").decode())
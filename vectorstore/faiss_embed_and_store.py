@@ -1,8 +1,10 @@
 # --- vectorstore/faiss_embed_and_store.py ---
 import os
 import logging
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from typing import List
+
 from app.config import Settings
+from vectorstore import chunking
 
 logger = logging.getLogger(__name__)
 
@@ -11,8 +13,7 @@ settings = Settings()
 
 # path retained for backward compatibility
 FAISS_INDEX_PATH = settings.FAISS_INDEX_PATH
-# Use slightly larger chunks with overlap for better contextual retrieval
-splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+
 
 def ingest_text_to_faiss(text: str, namespace: str = None):
     """Embed ``text`` and persist to the FAISS index.
@@ -26,8 +27,18 @@ def ingest_text_to_faiss(text: str, namespace: str = None):
     if not text.strip():
         return
 
-    chunks = splitter.split_text(text)
+    chunks = chunking.split_text(text)
     try:
         faiss_store.add_texts(chunks, namespace)
     except Exception as e:
         logger.exception("\u274c FAISS ingest failed: %s", e)
+
+
+def ingest_chunks_to_faiss(chunks: List[chunking.Chunk], namespace: str = None, doc: str = ""):
+    """Embed document ``chunks`` with their page and section metadata."""
+    from vectorstore import faiss_store
+    if not chunks:
+        return
+
+    metadatas = [{**c.metadata(), "doc": doc} for c in chunks]
+    faiss_store.add_texts([c.text for c in chunks], namespace, metadatas)
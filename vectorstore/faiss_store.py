@@ -2,118 +2,675 @@ from __future__ import annotations
 
 import os
 import json
-from typing import Tuple, List, Optional
+import logging
+import threading
+import time
+from collections import Counter
+from fnmatch import fnmatchcase
+from typing import NamedTuple, Tuple, List, Optional, Sequence
 
 import numpy as np
 import faiss
-from langchain_openai import OpenAIEmbeddings
 from app.config import Settings
+from app.services import registry
+from vectorstore import chunking, index_writer, quantization, rerank
+from vectorstore.calibration import FAISS, KEYWORD, calibrate
+from vectorstore.embedding_file import EmbeddingFile
+from vectorstore.bm25_index import BM25Index, reciprocal_rank_fusion
 
+logger = logging.getLogger(__name__)
 settings = Settings()
 FAISS_INDEX_PATH = settings.FAISS_INDEX_PATH
 META_PATH = FAISS_INDEX_PATH + ".json"
-embedding_model = OpenAIEmbeddings(api_key=settings.OPENAI_API_KEY)
+# Raw embeddings by id, so the index can be rebuilt without re-embedding
+VECTORS_PATH = FAISS_INDEX_PATH + ".vecs"
+# Built on first use (or by the startup warm-up); tests may assign a fake
+embedding_model = None
 
 _index: faiss.IndexIDMap | None = None
 _meta: List[dict] = []
+# mtime of the index file currently loaded, used by workers to pick up
+# changes made by the index writer process
+_loaded_mtime: int | None = None
+# Keyword index over the same ids, rebuilt from ``_meta`` whenever it is loaded
+_bm25 = BM25Index()
+_vecfile: EmbeddingFile | None = None
+# Namespaces stored quantized (see vectorstore/quantization.py) live in one
+# index per mode
+_quantized: dict = {}
+# Ids in no index yet: appended since the last merge, or of a quantized
+# mode without enough vectors to train. Searched exactly from ``_vecfile``
+_tail: List[int] = []
+# Writes (ingestion, deletion, reloads) go one at a time. Searches take no
+# lock: they run on the ``_snapshot`` published after each write, whose
+# indexes are never modified again. Appends only extend ``_meta`` and the
+# tail; merging the tail into the indexes (every FAISS_MERGE_SIZE chunks)
+# and deletions work on copies that the next snapshot swaps in.
+_write_lock = threading.RLock()
+
+
+class _Snapshot(NamedTuple):
+    index: faiss.Index
+    quantized: Tuple[Tuple[str, faiss.Index], ...]
+    tail: np.ndarray
+    vectors: EmbeddingFile
+    meta: List[dict]
+    size: int
+
+
+_snapshot: _Snapshot | None = None
+
+
+def _publish() -> None:
+    global _snapshot
+    _snapshot = _Snapshot(_index, tuple(_quantized.items()), np.array(_tail, dtype="int64"),
+                          _vecfile, _meta, len(_meta))
+
+
+def _mode_path(mode: str) -> str:
+    return f"{FAISS_INDEX_PATH}.{mode}"
+
+
+def _init_embeddings():
+    from langchain_openai import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(api_key=settings.OPENAI_API_KEY)
+
+
+registry.register("openai_embeddings", _init_embeddings)
+
+
+def _embedder():
+    global embedding_model
+    if embedding_model is None:
+        embedding_model = registry.get("openai_embeddings")
+    return embedding_model
 
 
 def _embed_query(text: str) -> List[float]:
-    func = getattr(embedding_model, "embed_query", None)
+    func = getattr(_embedder(), "embed_query", None)
     if callable(func):
         return func(text)
     return [0.0]
 
 
 def _embed_docs(texts: List[str]) -> List[List[float]]:
-    func = getattr(embedding_model, "embed_documents", None)
+    func = getattr(_embedder(), "embed_documents", None)
     if callable(func):
         return func(texts)
     dim = len(_embed_query("x"))
     return [[0.0] * dim for _ in texts]
 
 
+def _embed_queries(texts: List[str]) -> List[List[float]]:
+    """Embed several queries, in one request when the model supports it."""
+    func = getattr(_embedder(), "embed_documents", None)
+    if callable(func):
+        return func(texts)
+    return [_embed_query(t) for t in texts]
+
+
 def _emb_dim() -> int:
     return len(_embed_query("dim"))
 
 
-def _load() -> None:
-    global _index, _meta
-    if _index is not None:
+def _load(dim: int | None = None) -> None:
+    """Load the index from disk or create an empty one.
+
+    An existing index file is trusted as-is unless ``dim`` (the dimension of
+    vectors about to be added) disagrees with it; only a brand new index
+    needs an embedding call to learn the dimension.
+    """
+    if _index is not None and _snapshot is not None and (dim is None or _index.d == dim):
+        return
+    with _write_lock:
+        _load_locked(dim)
+
+
+def _load_locked(dim: int | None) -> None:
+    global _index, _meta, _loaded_mtime, _vecfile, _quantized, _tail, _bm25
+    if _index is not None and (dim is None or _index.d == dim):
+        if _snapshot is None:
+            _publish()
         return
     dirpath = os.path.dirname(FAISS_INDEX_PATH)
     if dirpath:
         os.makedirs(dirpath, exist_ok=True)
-    dim = _emb_dim()
-    if os.path.exists(FAISS_INDEX_PATH):
-        _index = faiss.read_index(FAISS_INDEX_PATH)
-        if not isinstance(_index, faiss.IndexIDMap):
-            _index = faiss.IndexIDMap(_index)
-        if _index.d != dim:
-            _index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
-            _meta = []
-        if os.path.exists(META_PATH):
-            with open(META_PATH, "r") as f:
-                _meta = json.load(f)
+    if _index is None and os.path.exists(FAISS_INDEX_PATH):
+        _read()
+        if dim is None or _index.d == dim:
+            return
+    if _index is not None:
+        _set_aside(_index.d)
+    dim = dim or _emb_dim()
+    _index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+    _meta = []
+    _loaded_mtime = None
+    _vecfile = EmbeddingFile(VECTORS_PATH, dim, settings.FAISS_VECTOR_DTYPE)
+    _quantized, _tail = {}, []
+    _bm25 = BM25Index()
+    _publish()
+
+
+def _set_aside(old_dim: int) -> None:
+    """Keep the files of an index built with another embedding model.
+
+    Its chunks cannot be searched with the new embeddings, but their texts
+    and vectors stay on disk for an offline migration.
+    """
+    suffix = f".dim{old_dim}"
+    logger.warning(f"Embedding dimension changed from {old_dim}; starting a new text index "
+                   f"({len(_meta)} chunks moved to *{suffix})")
+    for path in (FAISS_INDEX_PATH, META_PATH, VECTORS_PATH, *map(_mode_path, quantization.QUANTIZED)):
+        if os.path.exists(path):
+            os.replace(path, path + suffix)
+
+
+def _read() -> None:
+    global _index, _meta, _loaded_mtime, _vecfile, _quantized, _tail, _bm25
+    mtime = _mtime()
+    meta: List[dict] = []
+    if os.path.exists(META_PATH):
+        with open(META_PATH, "r") as f:
+            meta = json.load(f)
+    index = _read_index(FAISS_INDEX_PATH)
+    _index, _meta, _loaded_mtime = index, meta, mtime
+    _vecfile = EmbeddingFile(VECTORS_PATH, index.d, settings.FAISS_VECTOR_DTYPE)
+    _quantized = {mode: _read_index(_mode_path(mode)) for mode in quantization.QUANTIZED
+                  if os.path.exists(_mode_path(mode))}
+    _tail = _unindexed()
+    _bm25 = _build_bm25()
+    _publish()
+
+
+def _mtime() -> int:
+    """Last change on disk: appends rewrite the metadata, merges the indexes."""
+    mtime = os.stat(FAISS_INDEX_PATH).st_mtime_ns
+    if os.path.exists(META_PATH):
+        mtime = max(mtime, os.stat(META_PATH).st_mtime_ns)
+    return mtime
+
+
+def _read_index(path: str) -> faiss.IndexIDMap:
+    if index_writer.enabled():
+        index = index_writer.read_index_shared(path)
     else:
-        _index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
-        _meta = []
+        index = faiss.read_index(path)
+    if not isinstance(index, faiss.IndexIDMap):
+        index = faiss.IndexIDMap(index)
+    return index
+
+
+def _unindexed() -> List[int]:
+    """Live ids missing from every index."""
+    missing = np.ones(len(_meta), dtype=bool)
+    for index in (_index, *_quantized.values()):
+        ids = faiss.vector_to_array(index.id_map)
+        missing[ids[ids < len(_meta)]] = False
+    missing[[i for i, m in enumerate(_meta) if m.get("deleted")]] = False
+    return np.flatnonzero(missing).tolist()
+
+
+def _build_bm25() -> BM25Index:
+    by_ns: dict = {}
+    for doc_id, m in enumerate(_meta):
+        if m.get("deleted"):
+            continue
+        by_ns.setdefault(m.get("source") or "generic", []).append((doc_id, m.get("text", "")))
+    bm25 = BM25Index()
+    for ns, docs in by_ns.items():
+        bm25.add(docs, ns)
+    return bm25
+
+
+def _refresh() -> None:
+    """Reload the store if the writer process changed it on disk."""
+    if not index_writer.enabled():
+        return
+    try:
+        mtime = _mtime()
+    except FileNotFoundError:
+        return
+    if mtime != _loaded_mtime:
+        with _write_lock:
+            if _mtime() != _loaded_mtime:
+                _read()
 
 
 def _save() -> None:
+    """Persist the metadata; the index files are written when the tail is merged."""
     if _index is None:
         return
-    faiss.write_index(_index, FAISS_INDEX_PATH)
-    with open(META_PATH, "w") as f:
-        json.dump(_meta, f)
+    if not os.path.exists(FAISS_INDEX_PATH):
+        _save_indexes()
+    index_writer.write_atomic(lambda p: _write_json(_meta, p), META_PATH)
+
 
+def _save_indexes() -> None:
+    for mode, index in _quantized.items():
+        index_writer.write_atomic(lambda p: faiss.write_index(index, p), _mode_path(mode))
+    index_writer.write_atomic(lambda p: faiss.write_index(_index, p), FAISS_INDEX_PATH)
 
-def add_texts(texts: List[str], namespace: Optional[str] = None) -> None:
+
+def _write_json(data, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def add_texts(texts: List[str], namespace: Optional[str] = None,
+              metadatas: Optional[List[dict]] = None) -> None:
+    """Embed and index ``texts``; ``metadatas`` (e.g. the page and section of
+    a PDF chunk, see :mod:`vectorstore.chunking`) is stored with each one."""
     if not texts:
         return
-    _load()
     vecs = _embed_docs(texts)
     vecs = np.array(vecs, dtype="float32")
+    if index_writer.enabled():
+        index_writer.submit("faiss_text.add", vecs=vecs, texts=texts, namespace=namespace, metadatas=metadatas)
+        return
+    _apply_add(vecs, texts, namespace, metadatas)
+
+
+def _apply_add(vecs: np.ndarray, texts: List[str], namespace: Optional[str] = None,
+               metadatas: Optional[List[dict]] = None) -> List[int]:
+    """Append embedded ``texts`` to the index and persist it (writer side)."""
+    with _write_lock:
+        return _add_locked(vecs, texts, namespace, metadatas)
+
+
+def _add_locked(vecs: np.ndarray, texts: List[str], namespace: Optional[str],
+                metadatas: Optional[List[dict]] = None) -> List[int]:
+    _load(vecs.shape[1])
     start = len(_meta)
     ids = np.arange(start, start + len(texts), dtype="int64")
-    _index.add_with_ids(vecs, ids)
-    for t in texts:
-        _meta.append({"text": t, "source": namespace or "generic"})
+    # vectors, then metadata: every committed id has a row
+    if len(_vecfile) < start:
+        _backfill_vectors()
+    _vecfile.append(start, vecs)
+    mode = quantization.mode_for(namespace)
+    now = int(time.time())
+    for t, extra in zip(texts, metadatas or [{}] * len(texts)):
+        entry = {**extra, "text": t, "source": namespace or "generic", "ts": now}
+        if mode != quantization.FLAT:
+            entry["mode"] = mode
+        _meta.append(entry)
+    _bm25.add(zip(ids.tolist(), texts), namespace or "generic")
+    _tail.extend(ids.tolist())
     _save()
+    if _mergeable() >= settings.FAISS_MERGE_SIZE:
+        _merge()
+    _publish()
+    return ids.tolist()
 
 
-def _search_vec(vec: np.ndarray, namespace: Optional[str], k: int = 3, window: int = 50) -> List[Tuple[str, float]]:
-    """Return top ``k`` texts with scores filtered by namespace."""
+index_writer.register_op("faiss_text.add", _apply_add)
+
+
+def delete_namespace(namespace: str, before: Optional[float] = None) -> int:
+    """Remove every chunk of ``namespace``; return how many were removed.
+
+    With ``before`` (a ``time.time()`` value), only chunks stored at or
+    before it are removed, so writes made since then survive.
+
+    Ids are never reused: deleted chunks leave a ``{"deleted": true}``
+    tombstone in the metadata (and their row in the vectors file) until
+    ``python -m vectorstore.maintenance compact`` renumbers the store.
+    """
+    if index_writer.enabled():
+        return index_writer.submit("faiss_text.delete", namespace=namespace, before=before)
+    return _apply_delete(namespace, before)
+
+
+def _apply_delete(namespace: str, before: Optional[float] = None) -> int:
+    with _write_lock:
+        if _index is None and not os.path.exists(FAISS_INDEX_PATH):
+            return 0
+        _load()
+        ranges = _namespace_ranges(namespace, before)
+        if not ranges:
+            return 0
+        removed = 0
+        for start, end in ranges:
+            _meta[start:end] = [{"deleted": True}] * (end - start)
+            removed += end - start
+        _tail[:] = [i for i in _tail if not _meta[i].get("deleted")]
+        _bm25.drop(namespace)
+        kept = [(i, m.get("text", "")) for i, m in enumerate(_meta)
+                if m.get("source") == namespace and not m.get("deleted")]
+        if kept:
+            _bm25.add(kept, namespace)
+        _save()
+        _merge(ranges)
+        _publish()
+    logger.info(f"Deleted {removed} chunks of namespace {namespace!r}")
+    return removed
+
+
+index_writer.register_op("faiss_text.delete", _apply_delete)
+
+
+def _namespace_ranges(namespace: str, before: Optional[float] = None) -> List[Tuple[int, int]]:
+    """``[start, end)`` id ranges of the live chunks of ``namespace``
+    (stored at or before ``before``, when given).
+
+    Chunks are appended one upload at a time, so a namespace usually spans
+    a handful of ranges however many chunks it has.
+    """
+    ranges: List[List[int]] = []
+    for i, m in enumerate(_meta):
+        if m.get("source") != namespace or m.get("deleted"):
+            continue
+        if before is not None and m.get("ts", 0) > before:
+            continue
+        if ranges and ranges[-1][1] == i:
+            ranges[-1][1] = i + 1
+        else:
+            ranges.append([i, i + 1])
+    return [(start, end) for start, end in ranges]
+
+
+def _remove_ranges(index: faiss.IndexIDMap, ranges: List[Tuple[int, int]]) -> None:
+    try:
+        for start, end in ranges:
+            index.remove_ids(faiss.IDSelectorRange(start, end))
+    except RuntimeError as e:
+        # e.g. HNSW: the vectors stay until compaction, searches skip them
+        logger.warning(f"{type(faiss.downcast_index(index.index)).__name__} cannot remove ids ({e}); "
+                       f"deleted chunks stay in the index until it is compacted")
+
+
+def expire_namespaces(ttl: float, patterns: List[str]) -> dict:
+    """Delete namespaces matching ``patterns`` not written to for ``ttl`` seconds.
+
+    Covers data whose session was never evicted in-process (e.g. across a
+    restart). Returns ``{namespace: removed}``.
+    """
+    with _write_lock:
+        if _index is None and not os.path.exists(FAISS_INDEX_PATH):
+            return {}
+        _load()
+        _refresh()
+        newest: dict = {}
+        for m in _meta:
+            ns = m.get("source")
+            if m.get("deleted") or not any(fnmatchcase(ns, p) for p in patterns):
+                continue
+            # chunks stored before timestamps were kept never expire
+            newest[ns] = max(newest.get(ns, 0), m.get("ts", float("inf")))
+        cutoff = time.time() - ttl
+        return {ns: delete_namespace(ns, before=cutoff) for ns, ts in newest.items() if ts < cutoff}
+
+
+def _tail_by_mode() -> dict:
+    groups: dict = {}
+    for i in _tail:
+        groups.setdefault(_meta[i].get("mode", quantization.FLAT), []).append(i)
+    return groups
+
+
+def _mergeable() -> int:
+    """Tail ids that a merge would move into an index."""
+    counts = Counter(_meta[i].get("mode", quantization.FLAT) for i in _tail)
+    return sum(n for mode, n in counts.items()
+               if mode == quantization.FLAT or mode in _quantized or n >= quantization.TRAIN_SIZE[mode])
+
+
+def _merge(removed: Sequence[Tuple[int, int]] = ()) -> None:
+    """Fold the tail into copies of the indexes, dropping the ``removed`` id ranges.
+
+    Searches still running on the current snapshot keep the old indexes;
+    the caller publishes the new ones.
+    """
+    global _index, _quantized, _tail
+
+    def updated(index, ids):
+        if not ids and not removed:
+            return index
+        index = faiss.clone_index(index)
+        _remove_ranges(index, removed)
+        if ids:
+            index.add_with_ids(_vecfile.get(ids), np.array(ids, dtype="int64"))
+        return index
+
+    groups = _tail_by_mode()
+    index = updated(_index, groups.get(quantization.FLAT, []))
+    quantized, tail = {}, []
+    for mode in quantization.QUANTIZED:
+        ids = groups.get(mode, [])
+        if mode in _quantized:
+            quantized[mode] = updated(_quantized[mode], ids)
+        elif ids and len(ids) >= quantization.TRAIN_SIZE[mode]:
+            logger.info(f"Training the {mode} index on {len(ids)} vectors")
+            quantized[mode] = quantization.build(mode, _vecfile.get(ids), np.array(ids))
+        else:
+            tail.extend(ids)
+    _index, _quantized, _tail = index, quantized, sorted(tail)
+    _save_indexes()
+
+
+def _backfill_vectors() -> None:
+    """Write the vectors file for an index saved before it was kept.
+
+    Only a flat index holds the exact vectors to copy out.
+    """
+    logger.info(f"Copying {_index.ntotal} embeddings out of the FAISS index into {VECTORS_PATH}")
+    ids = faiss.vector_to_array(_index.id_map)
+    vecs = np.zeros((len(_meta), _index.d), dtype="float32")
+    keep = ids < len(_meta)
+    vecs[ids[keep]] = _index.index.reconstruct_n(0, _index.ntotal)[keep]
+    _vecfile.append(0, vecs)
+
+
+def _search_ids(vec: np.ndarray, namespace: Optional[str], k: int = 3, window: int = 50) -> List[Tuple[int, float]]:
+    """Return top ``k`` ids with scores filtered by namespace."""
+    return _search_ids_batch(vec[np.newaxis, :], namespace, k, window)[0]
+
+
+def _search_ids_batch(vecs: np.ndarray, namespace: Optional[str], k: int = 3,
+                      window: int = 50) -> List[List[Tuple[int, float]]]:
+    """:func:`_search_ids` for each row of ``vecs``, one FAISS call per index."""
     _load()
-    if _index.ntotal == 0:
-        return []
-    D, I = _index.search(vec[np.newaxis, :], min(window, _index.ntotal))
-    results: List[Tuple[str, float]] = []
-    for idx, score in zip(I[0], D[0]):
-        if idx == -1:
+    _refresh()
+    snap = _snapshot
+    vecs = np.ascontiguousarray(vecs, dtype="float32")
+    hits: List[List[Tuple[int, float]]] = [[] for _ in vecs]
+    if not len(vecs):
+        return hits
+    if snap.index.ntotal:
+        D, labels = snap.index.search(vecs, min(window, snap.index.ntotal))
+        for row, row_ids, row_scores in zip(hits, labels.tolist(), D.tolist()):
+            row.extend(zip(row_ids, row_scores))
+    for mode, index in snap.quantized:
+        for row, found in zip(hits, quantization.search_batch(index, mode, vecs, window, snap.vectors)):
+            row.extend(found)
+    tail = snap.tail.tolist()
+    if namespace:
+        tail = [i for i in tail if snap.meta[i].get("source") == namespace]
+    if tail:
+        scores = snap.vectors.get(tail) @ vecs.T
+        for row, row_scores in zip(hits, scores.T.tolist()):
+            row.extend(zip(tail, row_scores))
+    return [_filter_hits(row, snap, namespace, k) for row in hits]
+
+
+def _filter_hits(hits: List[Tuple[int, float]], snap: _Snapshot, namespace: Optional[str],
+                 k: int) -> List[Tuple[int, float]]:
+    results: List[Tuple[int, float]] = []
+    for idx, score in hits:
+        if idx == -1 or idx >= snap.size:
             continue
-        meta = _meta[idx]
+        meta = snap.meta[idx]
         if namespace and meta.get("source") != namespace:
             continue
-        results.append((meta.get("text", ""), float(score)))
+        if meta.get("deleted"):
+            continue
+        results.append((int(idx), float(score)))
     results.sort(key=lambda x: x[1], reverse=True)
     return results[:k]
 
 
-def search_faiss(query: str, namespace: Optional[str] = None, k: int = 3) -> str:
+def _search_vec(vec: np.ndarray, namespace: Optional[str], k: int = 3, window: int = 50) -> List[Tuple[str, float]]:
+    """Return top ``k`` texts with scores filtered by namespace."""
+    return [(_meta[i].get("text", ""), s) for i, s in _search_ids(vec, namespace, k, window)]
+
+
+def _vectors(ids: List[int]) -> np.ndarray:
+    """Stored embeddings of ``ids``."""
+    if _vecfile is not None and _vecfile.covers(ids):
+        return _vecfile.get(ids)
+    # Index saved before embeddings were kept alongside it (run
+    # ``python -m vectorstore.maintenance backfill``); ids are assigned in
+    # increasing order, so the id map is sorted
+    positions = np.searchsorted(faiss.vector_to_array(_index.id_map), ids)
+    return _index.index.reconstruct_batch(positions.astype("int64"))
+
+
+def _warm_index():
+    """Load the text index and run one search so the first query is cheap."""
+    _load()
+    if _meta:
+        _search_vec(np.zeros(_index.d, dtype="float32"), None, k=1)
+    return _index
+
+
+registry.register("faiss_text", _warm_index, warm_up=settings.MODEL_WARMUP, probe=lambda: _index is not None)
+
+
+def _search_keywords(query: str, namespace: Optional[str], k: int) -> List[Tuple[int, float]]:
+    """Return ``(id, coverage)`` for the top BM25 matches of ``query``."""
+    _load()
+    _refresh()
+    return [(doc_id, coverage) for doc_id, _, coverage in _bm25.search(query, namespace, k=k)
+            if doc_id < len(_meta)]
+
+
+def _rerank(query: str, vec: np.ndarray, candidates: List[int], keyword: List[Tuple[int, float]],
+            k: int) -> List[int]:
+    """Pick up to ``k`` of the ranked ``candidates``: relevant, but not redundant."""
+    if not settings.RERANK or len(candidates) < 2:
+        return candidates[:k]
+    candidates = candidates[:max(k, settings.RERANK_CANDIDATES)]
+    vecs = _vectors(candidates)
+    relevance = rerank.cross_encoder_scores(query, [_meta[i].get("text", "") for i in candidates])
+    if relevance is None and keyword:
+        # dense and keyword evidence on the same (calibrated) scale
+        coverages = dict(keyword)
+        sims = rerank.cosine(vecs, vec)
+        relevance = [max(calibrate(FAISS, s), calibrate(KEYWORD, coverages.get(i, 0.0)))
+                     for i, s in zip(candidates, sims)]
+    order = rerank.mmr(vec, vecs, k, lambda_=settings.RERANK_MMR_LAMBDA,
+                       relevance=relevance, dedupe=settings.RERANK_DEDUPE)
+    return [candidates[i] for i in order]
+
+
+def _search_hybrid(query: str, namespace: Optional[str], k: int, window: int = 20):
+    """Fuse dense and keyword rankings and re-rank; return ``(ids, dense, keyword)``.
+
+    ``dense`` and ``keyword`` are the raw ``(id, score)`` candidate lists
+    that confidence is derived from.
+    """
     vec = np.array(_embed_query(query), dtype="float32")
-    results = _search_vec(vec, namespace, k=k)
-    if not results:
+    dense = _search_ids(vec, namespace, k=max(k, window))
+    return _fuse(query, vec, dense, namespace, k, window)
+
+
+def _search_hybrid_batch(queries: List[str], namespace: Optional[str], k: int, window: int = 20):
+    """:func:`_search_hybrid` for each of ``queries``: one embedding request
+    and one dense search over the query matrix."""
+    if not queries:
+        return []
+    vecs = np.array(_embed_queries(list(queries)), dtype="float32")
+    return _search_vecs_batch(queries, vecs, namespace, k, window)
+
+
+def _search_vecs_batch(queries: List[str], vecs: np.ndarray, namespace: Optional[str], k: int, window: int = 20):
+    dense = _search_ids_batch(vecs, namespace, k=max(k, window))
+    return [_fuse(query, vec, hits, namespace, k, window) for query, vec, hits in zip(queries, vecs, dense)]
+
+
+def _fuse(query: str, vec: np.ndarray, dense: List[Tuple[int, float]], namespace: Optional[str], k: int,
+          window: int):
+    keyword: List[Tuple[int, float]] = []
+    candidates = [i for i, _ in dense]
+    if settings.HYBRID_SEARCH:
+        keyword = _search_keywords(query, namespace, k=max(k, window))
+        candidates = reciprocal_rank_fusion([candidates, [i for i, _ in keyword]], k=settings.RRF_K)
+    return _rerank(query, vec, candidates, keyword, k), dense, keyword
+
+
+def _join(ids: List[int]) -> str:
+    texts = [chunking.cite(_meta[i]) + _meta[i].get("text", "") for i in ids]
+    if settings.RERANK:
+        texts = rerank.stitch(texts)
+    return "\n".join(texts)
+
+
+def search_faiss(query: str, namespace: Optional[str] = None, k: int = 3) -> str:
+    ids, _, _ = _search_hybrid(query, namespace, k)
+    return _answer(ids)
+
+
+def search_faiss_batch(queries: List[str], namespace: Optional[str] = None, k: int = 3) -> List[str]:
+    """:func:`search_faiss` for each of ``queries``, embedded and searched together."""
+    return [_answer(ids) for ids, _, _ in _search_hybrid_batch(queries, namespace, k)]
+
+
+def _answer(ids: List[int]) -> str:
+    if not ids:
         return "No FAISS match found"
-    return "\n".join(t for t, _ in results).strip()
+    return _join(ids).strip()
 
 
 def search_faiss_with_score(query: str, namespace: Optional[str] = None, k: int = 3) -> Tuple[Optional[str], float]:
-    vec = np.array(_embed_query(query), dtype="float32")
-    results = _search_vec(vec, namespace, k=k)
-    if not results:
+    return _scored_answer(*_search_hybrid(query, namespace, k))
+
+
+def search_faiss_with_score_batch(queries: List[str], namespace: Optional[str] = None,
+                                  k: int = 3) -> List[Tuple[Optional[str], float]]:
+    """:func:`search_faiss_with_score` for each of ``queries``, embedded and
+    searched together; results are in the order of ``queries``."""
+    return [_scored_answer(*found) for found in _search_hybrid_batch(queries, namespace, k)]
+
+
+def search_faiss_fused(queries: List[str], namespace: Optional[str] = None,
+                       k: int = 3) -> Tuple[Optional[str], float]:
+    """Search with several phrasings of one question and fuse the rankings.
+
+    ``queries[0]`` is the question, the others rewrites of it. The queries
+    are embedded and searched as one batch and their re-ranked results
+    merged with reciprocal-rank fusion. The confidence is that of the fused
+    results for the question itself: the calibration was fitted on
+    question-to-passage scores, and a rewrite (a HyDE passage especially)
+    scores higher against passages than any question would.
+    """
+    if not queries:
+        return None, 0.0
+    vecs = np.array(_embed_queries(list(queries)), dtype="float32")
+    found = _search_vecs_batch(queries, vecs, namespace, k)
+    ids = reciprocal_rank_fusion([ids for ids, _, _ in found], k=settings.RRF_K)[:k]
+    if not ids:
+        return None, 0.0
+    scores = _vectors(ids) @ vecs[0]
+    dense = sorted(zip(ids, scores.tolist()), key=lambda hit: -hit[1])
+    return _join(ids).strip(), _confidence(ids, dense, found[0][2])
+
+
+def _scored_answer(ids: List[int], dense: List[Tuple[int, float]],
+                   keyword: List[Tuple[int, float]]) -> Tuple[Optional[str], float]:
+    if not ids:
         return None, 0.0
-    top_text = "\n".join(t for t, _ in results[:k])
-    best_score = results[0][1]
-    confidence = 1 / (1 + best_score)
-    return top_text.strip(), confidence
+    return _join(ids).strip(), _confidence(ids, dense, keyword)
+
+
+def _confidence(ids: List[int], dense: List[Tuple[int, float]], keyword: List[Tuple[int, float]]) -> float:
+    if not ids:
+        return 0.0
+    # Inner product of normalized embeddings: higher is better
+    confidence = calibrate(FAISS, dense[0][1]) if dense else 0.0
+    # A returned chunk containing (nearly) every query term, rare identifiers
+    # included, is a confident answer even when the embedding match is weak
+    coverages = dict(keyword)
+    coverage = max((coverages.get(i, 0.0) for i in ids), default=0.0)
+    if coverage:
+        confidence = max(confidence, calibrate(KEYWORD, coverage))
+    return confidence
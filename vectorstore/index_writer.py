@@ -0,0 +1,114 @@
+"""Single writer process for the FAISS stores in pre-fork deployments.
+
+With several workers sharing one index file, letting each worker mutate its
+own in-memory copy would make them diverge and race on ``len(_meta)`` ids.
+When ``INDEX_WRITER_ADDRESS`` is set, workers compute embeddings themselves
+but send the resulting vectors to one writer process (started by the
+gunicorn master, see ``gunicorn.conf.py``) that owns all index mutations and
+persists them atomically. Workers keep read-only (mmap where FAISS supports
+it) copies and reload them when the index file changes on disk.
+
+Without ``INDEX_WRITER_ADDRESS`` writes are applied in-process as before.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+settings = Settings()
+
+_OPS: Dict[str, Callable[..., Any]] = {}
+_is_writer = False
+
+
+def register_op(name: str, fn: Callable[..., Any]) -> None:
+    """Expose ``fn`` to remote callers as write operation ``name``."""
+    _OPS[name] = fn
+
+
+def enabled() -> bool:
+    """True in workers that must route writes through the writer process."""
+    return bool(settings.INDEX_WRITER_ADDRESS) and not _is_writer
+
+
+def submit(op: str, **kwargs: Any) -> Any:
+    """Run write ``op`` in the writer process and return its result."""
+    with Client(settings.INDEX_WRITER_ADDRESS, authkey=settings.INDEX_WRITER_AUTHKEY.encode()) as conn:
+        conn.send((op, kwargs))
+        ok, result = conn.recv()
+    if not ok:
+        raise RuntimeError(f"Index writer failed {op}: {result}")
+    return result
+
+
+def serve(address: str, authkey: bytes) -> None:
+    """Writer loop: apply write operations one at a time, in arrival order."""
+    global _is_writer
+    _is_writer = True
+    # Importing the stores registers their write operations
+    import vectorstore.faiss_store  # noqa: F401
+    import agents.clip_faiss  # noqa: F401
+
+    with Listener(address, authkey=authkey) as listener:
+        logger.info(f"Index writer listening on {address} (pid {os.getpid()})")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                logger.warning(f"Index writer rejected connection: {e}")
+                continue
+            with conn:
+                try:
+                    op, kwargs = conn.recv()
+                    conn.send((True, _OPS[op](**kwargs)))
+                except Exception as e:
+                    logger.exception(f"Index writer op failed: {e}")
+                    try:
+                        conn.send((False, str(e)))
+                    except Exception:
+                        pass
+
+
+def start_writer_process(timeout: float = 30.0) -> multiprocessing.Process:
+    """Spawn the writer and wait until it accepts connections."""
+    address = settings.INDEX_WRITER_ADDRESS
+    if os.path.exists(address):
+        os.remove(address)
+    ctx = multiprocessing.get_context("spawn")
+    proc = ctx.Process(
+        target=serve, args=(address, settings.INDEX_WRITER_AUTHKEY.encode()), name="index-writer", daemon=True
+    )
+    proc.start()
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(address):
+        if not proc.is_alive() or time.monotonic() > deadline:
+            raise RuntimeError("Index writer process failed to start")
+        time.sleep(0.05)
+    return proc
+
+
+def read_index_shared(path: str):
+    """Read an index for searching only, memory-mapping it when possible."""
+    import faiss
+
+    flags = getattr(faiss, "IO_FLAG_MMAP", 0) | getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+    try:
+        return faiss.read_index(path, flags)
+    except Exception:
+        return faiss.read_index(path)
+
+
+def write_atomic(write: Callable[[str], None], path: str) -> None:
+    """Write ``path`` via a temp file so readers never see a partial file."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
@@ -0,0 +1,309 @@
+"""Offline maintenance of the FAISS text index from its stored embeddings.
+
+The embedding of every chunk is kept in ``<FAISS_INDEX_PATH>.vecs`` (see
+``vectorstore/embedding_file.py``), so none of these commands calls the
+embedding API:
+
+* ``info``: chunk count, index type and vectors file of the store
+* ``backfill``: write the vectors file for an index saved before it was
+  kept (copied out of the flat index)
+* ``rebuild [--factory SPEC]``: build a fresh index of any FAISS type
+  (``Flat``, ``HNSW32``, ``IVF1024,PQ32``...) from the stored vectors
+* ``convert --dtype float16``: rewrite the stored vectors at another precision
+* ``quantize PATTERN MODE``: move the chunks of the namespaces matching
+  ``PATTERN`` to another storage mode (see ``vectorstore/quantization.py``);
+  keep ``FAISS_QUANTIZATION`` in line so new chunks follow them
+* ``expire [--ttl SECONDS] [--pattern P ...]``: delete session namespaces
+  (``pdf_*``, ``memory_*``) not written to for ``SESSION_TTL`` seconds
+* ``compact [--factory SPEC]``: drop the tombstones deleted namespaces leave
+  behind, renumbering the text and image stores, and report reclaimed bytes
+
+Files are replaced atomically; run the commands while the API is stopped,
+as a single-process server would keep serving (and later save) the index
+it has in memory.
+
+Usage: python -m vectorstore.maintenance {info,backfill,rebuild,convert,quantize,expire,compact} [options]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+from typing import List, Optional
+from fnmatch import fnmatchcase
+
+import faiss
+import numpy as np
+
+from vectorstore import embedding_file, faiss_store, index_writer, quantization
+
+logger = logging.getLogger(__name__)
+
+
+def build_index(vecs: np.ndarray, factory: str = "Flat", train_size: int = 100_000,
+                batch: int = 65_536, ids: np.ndarray | None = None) -> faiss.Index:
+    """Inner-product index described by ``factory`` holding rows ``ids`` of ``vecs``.
+
+    ``ids`` defaults to every row, 0..n-1.
+    """
+    dim = vecs.shape[1]
+    ids = np.arange(len(vecs), dtype="int64") if ids is None else np.asarray(ids, dtype="int64")
+    index = faiss.IndexIDMap(faiss.index_factory(dim, factory, faiss.METRIC_INNER_PRODUCT))
+    if not index.is_trained and len(ids):
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(ids, size=min(len(ids), train_size), replace=False))
+        index.train(np.asarray(vecs[sample], dtype="float32"))
+    for start in range(0, len(ids), batch):
+        chunk = ids[start:start + batch]
+        index.add_with_ids(np.asarray(vecs[chunk], dtype="float32"), chunk)
+    return index
+
+
+def _ids_by_mode() -> dict:
+    groups: dict = {mode: [] for mode in quantization.MODES}
+    for i, m in enumerate(faiss_store._meta):
+        if not m.get("deleted"):
+            groups[m.get("mode", quantization.FLAT)].append(i)
+    return groups
+
+
+def _write_quantized(vecs: np.ndarray, groups: dict) -> None:
+    for mode in quantization.QUANTIZED:
+        path = faiss_store._mode_path(mode)
+        ids = groups[mode]
+        if len(ids) < max(1, quantization.TRAIN_SIZE[mode]):
+            # too few to train: the store searches them exactly
+            if os.path.exists(path):
+                os.remove(path)
+            continue
+        index = quantization.build(mode, vecs[ids], np.array(ids))
+        index_writer.write_atomic(lambda p: faiss.write_index(index, p), path)
+        print(f"rebuilt {path} with {index.ntotal} vectors")
+
+
+def _stored_vectors() -> np.ndarray:
+    faiss_store._load()
+    n, stored = len(faiss_store._meta), len(faiss_store._vecfile)
+    if stored < n:
+        raise SystemExit(f"{faiss_store.VECTORS_PATH} holds {stored} of {n} embeddings; run `backfill` first")
+    return faiss_store._vecfile.matrix()[:n]
+
+
+def info() -> None:
+    faiss_store._load()
+    index, vecfile = faiss_store._index, faiss_store._vecfile
+    print(f"index:   {faiss_store.FAISS_INDEX_PATH} ({type(faiss.downcast_index(index.index)).__name__}, "
+          f"{index.ntotal} vectors, dim {index.d})")
+    for mode, ids in _ids_by_mode().items():
+        if mode == quantization.FLAT or not ids:
+            continue
+        qindex = faiss_store._quantized.get(mode)
+        size = os.path.getsize(faiss_store._mode_path(mode)) if qindex is not None else 0
+        print(f"{mode + ':':9}{len(ids)} chunks, "
+              f"{qindex.ntotal if qindex is not None else 0} indexed ({size / 2**20:.1f} MiB)")
+    deleted = sum(1 for m in faiss_store._meta if m.get("deleted"))
+    print(f"chunks:  {len(faiss_store._meta) - deleted} ({deleted} deleted, reclaimed by `compact`)")
+    size = os.path.getsize(vecfile.path) if os.path.exists(vecfile.path) else 0
+    print(f"vectors: {vecfile.path} ({len(vecfile)} rows, {vecfile.dtype.name}, {size / 2**20:.1f} MiB)")
+
+
+def backfill() -> None:
+    faiss_store._load()
+    if len(faiss_store._vecfile) >= len(faiss_store._meta):
+        print("vectors file is up to date")
+        return
+    faiss_store._backfill_vectors()
+    print(f"wrote {len(faiss_store._vecfile)} embeddings to {faiss_store.VECTORS_PATH}")
+
+
+def rebuild(factory: str = "Flat", train_size: int = 100_000) -> None:
+    vecs = _stored_vectors()
+    groups = _ids_by_mode()
+    _write_quantized(vecs, groups)
+    index = build_index(vecs, factory, train_size, ids=groups[quantization.FLAT])
+    index_writer.write_atomic(lambda p: faiss.write_index(index, p), faiss_store.FAISS_INDEX_PATH)
+    print(f"rebuilt {faiss_store.FAISS_INDEX_PATH} as {factory!r} with {index.ntotal} vectors")
+
+
+def quantize(pattern: str, mode: str, factory: str = "Flat") -> None:
+    if mode not in quantization.MODES:
+        raise SystemExit(f"mode must be one of {', '.join(quantization.MODES)}")
+    _stored_vectors()
+    moved = 0
+    for m in faiss_store._meta:
+        if m.get("deleted") or m.get("mode", quantization.FLAT) == mode:
+            continue
+        if fnmatchcase(m.get("source", "generic"), pattern):
+            m.pop("mode", None)
+            if mode != quantization.FLAT:
+                m["mode"] = mode
+            moved += 1
+    if not moved:
+        print(f"no chunks to move to {mode}")
+        return
+    index_writer.write_atomic(lambda p: faiss_store._write_json(faiss_store._meta, p), faiss_store.META_PATH)
+    print(f"moved {moved} chunks to {mode}")
+    rebuild(factory)
+
+
+def convert(dtype: str) -> None:
+    if dtype not in embedding_file.DTYPES:
+        raise SystemExit(f"dtype must be one of {', '.join(embedding_file.DTYPES)}")
+    vecs = _stored_vectors()
+    index_writer.write_atomic(lambda p: embedding_file.write(p, vecs, dtype), faiss_store.VECTORS_PATH)
+    print(f"stored {len(vecs)} embeddings as {dtype}")
+
+
+def expire(ttl: Optional[float] = None, patterns: Optional[List[str]] = None) -> None:
+    ttl = faiss_store.settings.SESSION_TTL if ttl is None else ttl
+    removed = faiss_store.expire_namespaces(ttl, patterns or ["pdf_*", "memory_*"])
+    for ns, n in sorted(removed.items()):
+        print(f"expired {ns}: {n} chunks")
+    print(f"expired {len(removed)} namespaces")
+
+
+def _sizes(paths) -> int:
+    return sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+
+
+def _renumber(index: faiss.IndexIDMap, new_ids: np.ndarray) -> bool:
+    """Drop ids mapped to -1 from ``index`` and renumber the rest in place.
+
+    Returns False when the index type cannot remove vectors.
+    """
+    ids = faiss.vector_to_array(index.id_map)
+    dead = ids[new_ids[ids] < 0]
+    if len(dead):
+        try:
+            index.remove_ids(faiss.IDSelectorBatch(dead))
+        except RuntimeError:
+            return False
+        ids = faiss.vector_to_array(index.id_map)
+    # live ids keep their order, so the id map stays sorted
+    faiss.copy_array_to_vector(new_ids[ids].astype("int64"), index.id_map)
+    return True
+
+
+def _live_ids(meta: List[dict]) -> tuple:
+    live = np.array([i for i, m in enumerate(meta) if not m.get("deleted")], dtype="int64")
+    new_ids = np.full(len(meta), -1, dtype="int64")
+    new_ids[live] = np.arange(len(live))
+    return live, new_ids
+
+
+def compact_text(factory: Optional[str] = None) -> int:
+    """Rewrite the text store without tombstones; return the bytes reclaimed."""
+    vecs = _stored_vectors()
+    meta = faiss_store._meta
+    live, new_ids = _live_ids(meta)
+    if len(live) == len(meta):
+        print(f"{faiss_store.FAISS_INDEX_PATH}: nothing to compact")
+        return 0
+    paths = [faiss_store.FAISS_INDEX_PATH, faiss_store.META_PATH, faiss_store.VECTORS_PATH,
+             *map(faiss_store._mode_path, quantization.QUANTIZED)]
+    before = _sizes(paths)
+    index = faiss_store._index
+    if not _renumber(index, new_ids):
+        if not factory:
+            raise SystemExit(f"{type(faiss.downcast_index(index.index)).__name__} cannot remove vectors; "
+                             f"pass --factory to rebuild the index")
+        flat = [new_ids[i] for i in live if meta[i].get("mode", quantization.FLAT) == quantization.FLAT]
+        index = build_index(vecs[live], factory, ids=np.array(flat, dtype="int64"))
+    for qindex in faiss_store._quantized.values():
+        _renumber(qindex, new_ids)
+    dtype = faiss_store._vecfile.dtype.name
+    index_writer.write_atomic(lambda p: embedding_file.write(p, vecs[live], dtype), faiss_store.VECTORS_PATH)
+    faiss_store._index = index
+    faiss_store._meta = [meta[i] for i in live]
+    faiss_store._save_indexes()
+    faiss_store._save()
+    faiss_store._index = None
+    reclaimed = before - _sizes(paths)
+    print(f"{faiss_store.FAISS_INDEX_PATH}: dropped {len(meta) - len(live)} deleted chunks, "
+          f"{len(live)} left, reclaimed {reclaimed / 2**20:.1f} MiB")
+    return reclaimed
+
+
+def compact_images() -> int:
+    """Rewrite the CLIP image index without tombstones; return the bytes reclaimed."""
+    from agents import clip_faiss
+
+    if not (os.path.exists(clip_faiss.INDEX_PATH) and os.path.exists(clip_faiss.META_PATH)):
+        return 0
+    with open(clip_faiss.META_PATH) as f:
+        meta = json.load(f)
+    live, new_ids = _live_ids(meta)
+    if len(live) == len(meta):
+        print(f"{clip_faiss.INDEX_PATH}: nothing to compact")
+        return 0
+    paths = [clip_faiss.INDEX_PATH, clip_faiss.META_PATH, clip_faiss._tail_path()]
+    before = _sizes(paths)
+    index = faiss.read_index(clip_faiss.INDEX_PATH)
+    if not isinstance(index, faiss.IndexIDMap):
+        raise SystemExit(f"{clip_faiss.INDEX_PATH} cannot be compacted in place")
+    # images not merged yet go into the compacted index
+    tail_ids, tail_vecs = clip_faiss._read_tail(index, meta)
+    if len(tail_ids):
+        index.add_with_ids(tail_vecs, tail_ids)
+    if not _renumber(index, new_ids):
+        raise SystemExit(f"{clip_faiss.INDEX_PATH} cannot be compacted in place")
+    index_writer.write_atomic(lambda p: faiss.write_index(index, p), clip_faiss.INDEX_PATH)
+    if os.path.exists(clip_faiss._tail_path()):
+        os.remove(clip_faiss._tail_path())
+    index_writer.write_atomic(lambda p: faiss_store._write_json([meta[i] for i in live], p), clip_faiss.META_PATH)
+    reclaimed = before - _sizes(paths)
+    print(f"{clip_faiss.INDEX_PATH}: dropped {len(meta) - len(live)} deleted images, "
+          f"{len(live)} left, reclaimed {reclaimed / 2**20:.2f} MiB")
+    return reclaimed
+
+
+def compact(factory: Optional[str] = None) -> None:
+    reclaimed = 0
+    if os.path.exists(faiss_store.FAISS_INDEX_PATH):
+        reclaimed += compact_text(factory)
+    reclaimed += compact_images()
+    print(f"reclaimed {reclaimed} bytes")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m vectorstore.maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("info")
+    commands.add_parser("backfill")
+    rebuild_cmd = commands.add_parser("rebuild")
+    rebuild_cmd.add_argument("--factory", default="Flat", help="faiss.index_factory description")
+    rebuild_cmd.add_argument("--train-size", type=int, default=100_000)
+    convert_cmd = commands.add_parser("convert")
+    convert_cmd.add_argument("--dtype", required=True)
+    quantize_cmd = commands.add_parser("quantize")
+    quantize_cmd.add_argument("pattern", help="namespace pattern, e.g. 'pdf_*'")
+    quantize_cmd.add_argument("mode", help=f"one of {', '.join(quantization.MODES)}")
+    quantize_cmd.add_argument("--factory", default="Flat", help="faiss.index_factory description of the main index")
+    expire_cmd = commands.add_parser("expire")
+    expire_cmd.add_argument("--ttl", type=float, help="seconds since the last write (default SESSION_TTL)")
+    expire_cmd.add_argument("--pattern", action="append", help="namespace pattern (default pdf_* and memory_*)")
+    compact_cmd = commands.add_parser("compact")
+    compact_cmd.add_argument("--factory", help="rebuild the text index as this type if it cannot remove vectors")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "info":
+        info()
+    elif args.command == "backfill":
+        backfill()
+    elif args.command == "rebuild":
+        rebuild(args.factory, args.train_size)
+    elif args.command == "quantize":
+        quantize(args.pattern, args.mode, args.factory)
+    elif args.command == "expire":
+        expire(args.ttl, args.pattern)
+    elif args.command == "compact":
+        compact(args.factory)
+    else:
+        convert(args.dtype)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,73 +1,83 @@
 # --- vectorstore/pinecone_store.py ---
 import os
 import logging
-import fitz
 from app.config import Settings
-from pinecone import Pinecone
-from langchain_pinecone import PineconeVectorStore
-from langchain_openai import OpenAIEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
+from app.services import registry
+from vectorstore import chunking
+from vectorstore.calibration import PINECONE, calibrate
 
 logger = logging.getLogger(__name__)
 
 # Load environment settings
 settings = Settings()
 
-# Init Pinecone client using config
-pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-
 index_name = settings.PINECONE_INDEX_NAME
 default_namespace = os.getenv("PINECONE_NAMESPACE", "default")
-embedding_model = OpenAIEmbeddings(api_key=settings.OPENAI_API_KEY)
-# Match FAISS chunk strategy for consistency
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
 
 
-def search_pinecone(query, namespace=None):
-    """Search Pinecone and return the best matching chunk."""
-    vectorstore = PineconeVectorStore.from_existing_index(
+def _init_pinecone():
+    """Build the Pinecone client and embeddings on first use."""
+    from pinecone import Pinecone
+    from langchain_openai import OpenAIEmbeddings
+
+    return {
+        "client": Pinecone(api_key=settings.PINECONE_API_KEY),
+        "embeddings": OpenAIEmbeddings(api_key=settings.OPENAI_API_KEY),
+    }
+
+
+registry.register("pinecone", _init_pinecone)
+
+
+def _vectorstore(namespace=None):
+    from langchain_pinecone import PineconeVectorStore
+
+    return PineconeVectorStore.from_existing_index(
         index_name=index_name,
-        embedding=embedding_model,
+        embedding=registry.get("pinecone")["embeddings"],
         namespace=namespace or default_namespace
     )
+
+
+def search_pinecone(query, namespace=None):
+    """Search Pinecone and return the best matching chunk."""
+    vectorstore = _vectorstore(namespace)
     docs_and_scores = vectorstore.similarity_search_with_score(query, k=5)
     if not docs_and_scores:
         return "No match found"
 
-    best_doc, _ = min(docs_and_scores, key=lambda x: x[1])
+    # Pinecone returns cosine similarities, best match first
+    best_doc, _ = docs_and_scores[0]
     return best_doc.page_content.strip()
 
 
 def search_pinecone_with_score(query, namespace=None, k: int = 3):
     """Return concatenated top ``k`` texts and confidence score from Pinecone."""
-    vectorstore = PineconeVectorStore.from_existing_index(
-        index_name=index_name,
-        embedding=embedding_model,
-        namespace=namespace or default_namespace
-    )
+    vectorstore = _vectorstore(namespace)
     docs_and_scores = vectorstore.similarity_search_with_score(query, k=k)
     if not docs_and_scores:
         return None, 0.0
 
-    # Assume results are ordered by similarity (lower score is better)
-    top_text = "\n".join(doc.page_content for doc, _ in docs_and_scores[:k])
+    # Results are ordered by cosine similarity (higher score is better)
+    top_text = "\n".join(chunking.cite(getattr(doc, "metadata", {})) + doc.page_content for doc, _ in docs_and_scores[:k])
     best_score = docs_and_scores[0][1]
-    confidence = 1 / (1 + best_score)
+    confidence = calibrate(PINECONE, best_score)
     return top_text.strip(), confidence
 
 
 def upsert_document(text, namespace=None, metadata=None):
+    from langchain_core.documents import Document
+
+    # Chunked like the FAISS store for consistency
     docs = [Document(page_content=chunk, metadata=metadata or {})
-            for chunk in text_splitter.split_text(text)]
+            for chunk in chunking.split_text(text)]
+    _add_documents(docs, namespace)
 
-    vectorstore = PineconeVectorStore.from_existing_index(
-        index_name=index_name,
-        embedding=embedding_model,
-        namespace=namespace or default_namespace
-    )
+
+def _add_documents(docs, namespace=None):
+    vectorstore = _vectorstore(namespace)
     vectorstore.add_documents(documents=docs)
-    stats = pc.Index(index_name).describe_index_stats()
+    stats = registry.get("pinecone")["client"].Index(index_name).describe_index_stats()
     logger.info("Pinecone count: %s", stats['total_vector_count'])
 
 
@@ -75,8 +85,18 @@ def ingest_pdf_text_to_pinecone(text, namespace=None, source=""):
     upsert_document(text, namespace=namespace, metadata={"source": source})
 
 
+def ingest_pdf_chunks_to_pinecone(chunks, namespace=None, source=""):
+    """Upsert PDF ``chunks`` (see :func:`vectorstore.chunking.chunk_pdf`) with
+    their page and section metadata."""
+    from langchain_core.documents import Document
+
+    if not chunks:
+        return
+    docs = [Document(page_content=c.text, metadata={**c.metadata(), "source": source, "doc": source})
+            for c in chunks]
+    _add_documents(docs, namespace)
+
+
 def ingest_pdf_file_to_pinecone(file_path, namespace=None):
-    doc = fitz.open(file_path)
-    text = "\n".join(page.get_text() for page in doc)
     source = os.path.basename(file_path)
-    ingest_pdf_text_to_pinecone(text, namespace=namespace, source=source)
+    ingest_pdf_chunks_to_pinecone(chunking.chunk_pdf(file_path), namespace=namespace, source=source)
@@ -0,0 +1,129 @@
+"""Storage modes for the FAISS text index, selectable per namespace.
+
+A full-precision 1536-dim OpenAI embedding takes 6 KB in a flat index, in
+the RAM of every worker. Namespaces can instead be kept in a quantized
+index, one per mode:
+
+* ``flat``: exact float32 (the main index, default)
+* ``fp16``: half precision, 2x smaller, practically exact
+* ``sq8``: 8-bit scalar quantization, 4x smaller
+* ``pq``: product quantization, ``dim / FAISS_PQ_M`` x smaller (64x with the
+  default 96-byte codes for 1536 dims)
+
+The lossy ``sq8`` and ``pq`` modes fetch ``FAISS_RESCORE_FACTOR`` times more
+candidates than asked for and re-score them exactly against the raw
+embeddings kept next to the index (``vectorstore/embedding_file.py``), so
+their ranking stays close to exact at a fraction of the resident memory.
+
+``FAISS_QUANTIZATION`` maps namespace patterns to modes, first match wins,
+e.g. ``memory_*:sq8,pdf_*:pq``; other namespaces use ``flat``. Compare the
+modes with ``benchmarks/bench_quantization.py``.
+"""
+
+from __future__ import annotations
+
+from fnmatch import fnmatchcase
+from typing import List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from app.config import Settings
+
+settings = Settings()
+
+FLAT, FP16, SQ8, PQ = "flat", "fp16", "sq8", "pq"
+MODES = (FLAT, FP16, SQ8, PQ)
+QUANTIZED = (FP16, SQ8, PQ)
+RESCORED = (SQ8, PQ)
+# Vectors needed before an index of the mode can be trained (PQ learns 256
+# centroids per sub-vector, from ~40 points each); until then the
+# namespace is searched exactly from the raw vectors
+TRAIN_SIZE = {FLAT: 0, FP16: 0, SQ8: 256, PQ: 10_000}
+
+
+def parse_rules(spec: str) -> List[Tuple[str, str]]:
+    rules = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        pattern, _, mode = item.strip().rpartition(":")
+        mode = mode.strip().lower()
+        if not pattern or mode not in MODES:
+            raise ValueError(f"Invalid FAISS_QUANTIZATION rule {item.strip()!r}")
+        rules.append((pattern.strip(), mode))
+    return rules
+
+
+_rules: Optional[List[Tuple[str, str]]] = None
+
+
+def mode_for(namespace: Optional[str]) -> str:
+    """Storage mode for new chunks of ``namespace``."""
+    global _rules
+    if _rules is None:
+        _rules = parse_rules(settings.FAISS_QUANTIZATION)
+    for pattern, mode in _rules:
+        if fnmatchcase(namespace or "generic", pattern):
+            return mode
+    return FLAT
+
+
+def pq_subquantizers(dim: int) -> int:
+    """Code size in bytes: ``FAISS_PQ_M`` (or dim / 16), rounded to a divisor of ``dim``."""
+    target = settings.FAISS_PQ_M or max(1, dim // 16)
+    return max(m for m in range(1, min(target, dim) + 1) if dim % m == 0)
+
+
+def new_index(mode: str, dim: int) -> faiss.IndexIDMap:
+    """Empty inner-product index of ``mode`` mapping external ids."""
+    if mode == FLAT:
+        inner = faiss.IndexFlatIP(dim)
+    elif mode == FP16:
+        inner = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+    elif mode == SQ8:
+        inner = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+    elif mode == PQ:
+        inner = faiss.IndexPQ(dim, pq_subquantizers(dim), 8, faiss.METRIC_INNER_PRODUCT)
+    else:
+        raise ValueError(f"Unknown FAISS storage mode {mode!r}")
+    return faiss.IndexIDMap(inner)
+
+
+def build(mode: str, vecs: np.ndarray, ids: np.ndarray) -> faiss.IndexIDMap:
+    """Index of ``mode`` trained on and holding ``vecs`` under ``ids``."""
+    vecs = np.ascontiguousarray(vecs, dtype="float32")
+    index = new_index(mode, vecs.shape[1])
+    if not index.is_trained:
+        index.train(vecs)
+    index.add_with_ids(vecs, np.asarray(ids, dtype="int64"))
+    return index
+
+
+def search(index: faiss.Index, mode: str, vec: np.ndarray, n: int, vectors=None) -> List[Tuple[int, float]]:
+    """Top ``n`` ``(id, score)`` of ``index``, re-scored exactly when lossy.
+
+    ``vectors`` provides ``get(ids)`` returning the raw embeddings; without
+    it the quantized scores are returned as they are.
+    """
+    return search_batch(index, mode, vec[np.newaxis, :], n, vectors)[0]
+
+
+def search_batch(index: faiss.Index, mode: str, vecs: np.ndarray, n: int,
+                 vectors=None) -> List[List[Tuple[int, float]]]:
+    """:func:`search` for each row of ``vecs``, with one ``index.search`` call."""
+    if not index.ntotal:
+        return [[] for _ in vecs]
+    rescore = vectors is not None and mode in RESCORED
+    fetch = n * settings.FAISS_RESCORE_FACTOR if rescore else n
+    D, labels = index.search(vecs, min(fetch, index.ntotal))
+    batch = []
+    for vec, row_ids, row_scores in zip(vecs, labels, D):
+        found = row_ids >= 0
+        ids, scores = row_ids[found], row_scores[found]
+        if rescore and len(ids):
+            scores = vectors.get(ids) @ vec
+            order = np.argsort(-scores, kind="stable")[:n]
+            ids, scores = ids[order], scores[order]
+        batch.append([(int(i), float(s)) for i, s in zip(ids[:n], scores[:n])])
+    return batch
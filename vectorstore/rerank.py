@@ -0,0 +1,132 @@
+"""Re-ranking of retrieved chunks before they reach the LLM prompt.
+
+Chunks are split with overlap, so the nearest neighbours of a query are
+often near-copies of each other. Maximal marginal relevance picks chunks
+that are relevant but unlike the ones already picked, chunks nearly
+identical to a picked one are dropped outright, and picked neighbours that
+share the splitter overlap are stitched back into one passage, so fewer
+(and more useful) chunks end up in the prompt. Selection works on the
+stored embeddings of a small candidate set in a handful of matrix products.
+
+A local cross-encoder (``RERANK_MODEL``, e.g.
+``cross-encoder/ms-marco-MiniLM-L-6-v2``) can replace embedding similarity
+as the relevance signal. It runs on CPU over at most ``RERANK_CANDIDATES``
+truncated chunks, keeping its cost bounded per query.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.config import Settings
+from app.services import registry
+
+logger = logging.getLogger(__name__)
+settings = Settings()
+
+MAX_PASSAGE_CHARS = 2000
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.where(norms == 0, 1.0, norms)
+
+
+def cosine(doc_vecs: np.ndarray, query_vec: np.ndarray) -> np.ndarray:
+    return _normalize(np.asarray(doc_vecs, dtype=np.float32)) @ _normalize(np.asarray(query_vec, dtype=np.float32))
+
+
+def mmr(query_vec: np.ndarray, doc_vecs: np.ndarray, k: int, lambda_: float = 0.7,
+        relevance: Optional[Sequence[float]] = None, dedupe: Optional[float] = None) -> List[int]:
+    """Indices of up to ``k`` rows of ``doc_vecs`` in maximal marginal relevance order.
+
+    ``relevance`` replaces the query/document cosine similarity when given
+    (e.g. cross-encoder scores). Documents whose cosine similarity to an
+    already selected one reaches ``dedupe`` are never selected, so fewer
+    than ``k`` indices may come back.
+    """
+    docs = _normalize(np.asarray(doc_vecs, dtype=np.float32))
+    n = len(docs)
+    if not n or k <= 0:
+        return []
+    if relevance is None:
+        rel = cosine(docs, query_vec)
+    else:
+        rel = np.asarray(relevance, dtype=np.float32)
+    sim = docs @ docs.T
+    redundancy = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected: List[int] = []
+    while len(selected) < k and available.any():
+        scores = np.where(available, lambda_ * rel - (1 - lambda_) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, sim[best]) if len(selected) > 1 else sim[best].copy()
+        if dedupe is not None:
+            available &= sim[best] < dedupe
+    return selected
+
+
+def _init_cross_encoder():
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder(settings.RERANK_MODEL, device="cpu", max_length=256)
+
+
+registry.register("cross_encoder", _init_cross_encoder,
+                  warm_up=settings.MODEL_WARMUP and bool(settings.RERANK_MODEL))
+
+
+def cross_encoder_scores(query: str, texts: Sequence[str]) -> Optional[np.ndarray]:
+    """Relevance of each text to ``query`` in [0, 1], or None without a model."""
+    if not settings.RERANK_MODEL or not texts:
+        return None
+    try:
+        model = registry.get("cross_encoder")
+        logits = model.predict([(query, t[:MAX_PASSAGE_CHARS]) for t in texts], batch_size=len(texts))
+    except Exception as e:
+        logger.warning(f"Cross-encoder re-ranking failed: {e}")
+        return None
+    return 1.0 / (1.0 + np.exp(-np.asarray(logits, dtype=np.float32)))
+
+
+def stitch(texts: Sequence[str], min_overlap: int = 50) -> List[str]:
+    """Merge chunks whose end repeats the start of another (splitter overlap).
+
+    Adjacent chunks of the same document share up to the splitter's overlap;
+    sending both verbatim repeats that text in the prompt. The merged chunk
+    takes the position of the first of its parts.
+    """
+    merged = [t for t in texts if t]
+    i = 0
+    while i < len(merged):
+        for j in range(len(merged)):
+            if j == i:
+                continue
+            joined = _join_overlapping(merged[i], merged[j], min_overlap) \
+                or _join_overlapping(merged[j], merged[i], min_overlap)
+            if joined:
+                merged[min(i, j)] = joined
+                del merged[max(i, j)]
+                i = -1
+                break
+        i += 1
+    return merged
+
+
+def _join_overlapping(a: str, b: str, min_overlap: int) -> Optional[str]:
+    """``a`` extended by ``b`` when ``b`` starts with a suffix of ``a``, or ``b`` is inside ``a``."""
+    if b in a:
+        return a
+    if len(b) < min_overlap:
+        return None
+    pos = a.find(b[:min_overlap])
+    while pos != -1:
+        if b.startswith(a[pos:]):
+            return a[:pos] + b
+        pos = a.find(b[:min_overlap], pos + 1)
+    return None
@@ -38,14 +38,20 @@ export async function sendMessage(
   }
 
   // Everything else streams from /chat endpoint
-  const payload = typeof content === 'string'
-    ? content
-    : await blobToBase64(content);
+  if (typeof content !== 'string') {
+    // Audio/image blobs go as the raw body instead of base64 inside JSON
+    const params = new URLSearchParams({ session_id: sessionId, mode, lang });
+    return fetch(`${getApiBase()}/chat?${params}`, {
+      method: 'POST',
+      headers: { 'Content-Type': content.type || 'application/octet-stream' },
+      body: content,
+    });
+  }
 
   const res = await fetch(`${getApiBase()}/chat`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ session_id: sessionId, mode, lang, content: payload }),
+    body: JSON.stringify({ session_id: sessionId, mode, lang, content }),
   });
 
   return res;
@@ -62,12 +68,3 @@ export async function laionSearchImage(file: File, topK: number = 5) {
   if (!res.ok) throw new Error('LAION search failed');
   return res.json();
 }
-
-function blobToBase64(b: Blob): Promise<string> {
-  return new Promise(resolve => {
-    const reader = new FileReader();
-    reader.onloadend = () =>
-      resolve((reader.result as string).split(',')[1]);
-    reader.readAsDataURL(b);
-  });
-}